@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+import gc
+import os
+import sys
+import re
+import json
+import time
+
+import lumbermill.utils.DictUtils as DictUtils
+
+from tests.ModuleBaseTestCase import ModuleBaseTestCase
+
+BENCHMARK_PATH = os.path.dirname(os.path.realpath(__file__))
+SAMPLE_DATA_PATH = os.path.join(BENCHMARK_PATH, 'sample_data')
+
+# Patterns used to parse the sample data, e.g. to create the input of modifier benchmarks.
+APACHE_COMBINED_PATTERN = r'(?P<remote_ip>\d+\.\d+\.\d+\.\d+)\s+(?P<identd>\w+|-)\s+(?P<user>\w+|-)\s+\[(?P<datetime>\d+\/\w+\/\d+:\d+:\d+:\d+\s.\d+)\]\s+\"(?P<method>\w+)\s+(?P<uri>\S+)\s+(?P<protocol>[^\"]+)\"\s+(?P<http_status>\d+)\s+(?P<bytes_send>\d+)\s+\"(?P<referer>[^\"]*)\"\s+\"(?P<user_agent>[^\"]*)\"'
+NGINX_MAIN_PATTERN = APACHE_COMBINED_PATTERN + r'\s+\"(?P<x_forwarded_for>[^\"]*)\"\s+(?P<request_time>\d+\.\d+)'
+SYSLOG_PATTERN = r'<(?P<syslog_prival>\d+)>(?P<log_timestamp>\w+\s+\d+\s+\d+:\d+:\d+)\s+(?P<host>\S+)\s+((?P<program>[^\[:\s]+)(\[(?P<pid>\d+)\])?:\s+)?(?P<message>.*)'
+
+# Set by run_benchmarks.py. The defaults are used, if the benchmarks are run by another test runner.
+settings = {'events': 10000,
+            'repeat': 5,
+            'threshold': 0.2,
+            'baseline': os.path.join(BENCHMARK_PATH, 'baseline.json'),
+            'compare': True}
+
+# Results of all benchmarks run in this process, by benchmark name.
+results = {}
+
+
+def getDeepSize(value, seen=None):
+    """ Size of value in bytes, including all values it contains. Objects referenced more than once are counted once. """
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        # dict.iteritems does not create the lazy event_id of EventMetadata.
+        size += sum([getDeepSize(key, seen) + getDeepSize(item, seen) for key, item in dict.iteritems(value)])
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum([getDeepSize(item, seen) for item in value])
+    return size
+
+
+def loadBaseline(path):
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, 'r') as baseline_file:
+            return json.load(baseline_file)
+    except:
+        etype, evalue, etb = sys.exc_info()
+        print("Could not read baseline %s. Exception: %s, Error: %s." % (path, etype, evalue))
+        return {}
+
+
+class ModuleBenchmarkTestCase(ModuleBaseTestCase):
+    """
+    Base class for module benchmarks.
+
+    A benchmark configures a module like a test does, feeds it sample events and measures:
+
+    events_per_second: Throughput of handleEvent. Best of settings['repeat'] runs with settings['events'] events.
+    objects_per_event: Objects handleEvent leaves behind per event, e.g. new fields and their values.
+                       Counts objects tracked by the garbage collector. Strings and numbers are not tracked.
+    bytes_per_event: Growth of an event in bytes, including strings and numbers.
+
+    Python 2 has no tracemalloc, so temporary allocations are not measured. Both values cover only what the module
+    leaves behind.
+
+    If a baseline exists for a benchmark, it fails if events_per_second dropped or objects_per_event or
+    bytes_per_event grew by more than settings['threshold'].
+    """
+
+    baseline = None
+
+    def loadSampleData(self, filename, decode_hex=False, pattern=None):
+        """
+        Returns the lines of a file in benchmarks/sample_data.
+
+        Binary data, e.g. packets, is stored hex encoded. If pattern is set, the named groups of each line are returned.
+        """
+        with open(os.path.join(SAMPLE_DATA_PATH, filename), 'r') as sample_file:
+            lines = [line.rstrip("\r\n") for line in sample_file if line.strip()]
+        if decode_hex:
+            lines = [line.decode('hex') for line in lines]
+        if pattern:
+            regex = re.compile(pattern)
+            lines = [dict([(name, value) for name, value in regex.match(line).groupdict().items() if value is not None]) for line in lines]
+        return lines
+
+    def createEvents(self, sample_data, count):
+        events = []
+        for idx in xrange(0, count):
+            data = sample_data[idx % len(sample_data)]
+            if not isinstance(data, dict):
+                data = {'data': data}
+            events.append(DictUtils.getDefaultEventDict(dict(data), caller_class_name=self.__class__.__name__))
+        return events
+
+    def handleEvents(self, events):
+        handleEvent = self.test_object.handleEvent
+        # Like timeit, disable the garbage collector while timing. Its runs would add noise to the results.
+        gc.collect()
+        gc.disable()
+        try:
+            started_at = time.time()
+            for event in events:
+                for _ in handleEvent(event):
+                    pass
+            return time.time() - started_at
+        finally:
+            gc.enable()
+
+    def measureEventSize(self, events):
+        size_before = sum([getDeepSize(event) for event in events])
+        handled_events = []
+        for event in events:
+            handled_events.extend(self.test_object.handleEvent(event))
+        size_after = sum([getDeepSize(event) for event in handled_events])
+        return float(size_after - size_before) / len(events)
+
+    def countObjects(self, events):
+        handled_events = []
+        gc.collect()
+        gc.disable()
+        try:
+            objects_before = len(gc.get_objects())
+            for event in events:
+                handled_events.extend(self.test_object.handleEvent(event))
+            # Do not count the list holding the handled events.
+            objects_after = len(gc.get_objects()) - 1
+        finally:
+            gc.enable()
+        return float(objects_after - objects_before) / len(events)
+
+    def benchmark(self, sample_data):
+        """
+        Measure the configured test object with events created from sample_data.
+
+        sample_data is a list of strings, which are put into the data field, or of dicts, which populate the event.
+        """
+        self.checkConfiguration()
+        event_count = settings['events']
+        # Warm up, e.g. caches of the module.
+        self.handleEvents(self.createEvents(sample_data, min(event_count, 1000)))
+        durations = []
+        for _ in xrange(0, settings['repeat']):
+            durations.append(self.handleEvents(self.createEvents(sample_data, event_count)))
+        objects_per_event = self.countObjects(self.createEvents(sample_data, min(event_count, 1000)))
+        bytes_per_event = self.measureEventSize(self.createEvents(sample_data, min(event_count, 1000)))
+        name = "%s.%s" % (self.__class__.__name__, self._testMethodName)
+        # Adding 0.0 turns -0.0 into 0.0.
+        result = {'events_per_second': round(event_count / max(min(durations), 0.000001), 1),
+                  'objects_per_event': round(objects_per_event, 2) + 0.0,
+                  'bytes_per_event': round(bytes_per_event, 1) + 0.0}
+        results[name] = result
+        if settings['compare']:
+            self.compareWithBaseline(name, result)
+        return result
+
+    def compareWithBaseline(self, name, result):
+        if ModuleBenchmarkTestCase.baseline is None:
+            ModuleBenchmarkTestCase.baseline = loadBaseline(settings['baseline'])
+        if name not in ModuleBenchmarkTestCase.baseline:
+            return
+        baseline = ModuleBenchmarkTestCase.baseline[name]
+        min_events_per_second = baseline['events_per_second'] * (1 - settings['threshold'])
+        self.assertGreaterEqual(result['events_per_second'], min_events_per_second,
+                                "%s: %s events/s, baseline %s events/s." % (name, result['events_per_second'], baseline['events_per_second']))
+        # Allow at least one object or 64 bytes more, a small baseline would fail too easily otherwise.
+        for key, unit, minimum in [('objects_per_event', 'objects/event', 1), ('bytes_per_event', 'bytes/event', 64)]:
+            if key not in baseline:
+                continue
+            max_value = baseline[key] + max(abs(baseline[key]) * settings['threshold'], minimum)
+            self.assertLessEqual(result[key], max_value, "%s: %s %s, baseline %s %s." % (name, result[key], unit, baseline[key], unit))
@@ -0,0 +1,23 @@
+import mock
+
+from benchmarks.ModuleBenchmarkTestCase import ModuleBenchmarkTestCase, APACHE_COMBINED_PATTERN
+from lumbermill.modifier import AddDateTime
+
+
+class BenchAddDateTime(ModuleBenchmarkTestCase):
+
+    def setUp(self):
+        super(BenchAddDateTime, self).setUp(AddDateTime.AddDateTime(mock.Mock()))
+
+    def testCurrentTime(self):
+        self.test_object.configure({})
+        self.benchmark(self.loadSampleData('apache_access.log', pattern=APACHE_COMBINED_PATTERN))
+
+    def testFromSourceField(self):
+        self.test_object.configure({'source_fields': ['datetime'],
+                                    'source_formats': ['%d/%b/%Y:%H:%M:%S']})
+        # Apache writes the timezone as offset, strptime in python 2 can not parse it.
+        sample_data = self.loadSampleData('apache_access.log', pattern=APACHE_COMBINED_PATTERN)
+        for data in sample_data:
+            data['datetime'] = data['datetime'].split(' ')[0]
+        self.benchmark(sample_data)
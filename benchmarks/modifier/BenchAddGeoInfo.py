@@ -0,0 +1,25 @@
+import os
+import mock
+import unittest
+
+from benchmarks.ModuleBenchmarkTestCase import ModuleBenchmarkTestCase, APACHE_COMBINED_PATTERN
+from lumbermill.modifier import AddGeoInfo
+from lumbermill.constants import LUMBERMILL_BASEPATH
+
+
+class BenchAddGeoInfo(ModuleBenchmarkTestCase):
+
+    def setUp(self):
+        super(BenchAddGeoInfo, self).setUp(AddGeoInfo.AddGeoInfo(mock.Mock()))
+        self.path_to_geo_db = LUMBERMILL_BASEPATH + '/assets/maxmind/GeoLite2-City.mmdb'
+        if not os.path.isfile(self.path_to_geo_db):
+            raise unittest.SkipTest('Could not find GeoCity db file in %s. Skipping benchmark.' % self.path_to_geo_db)
+
+    def testAddGeoInfo(self):
+        self.test_object.configure({'geoip_dat_path': self.path_to_geo_db})
+        self.benchmark(self.loadSampleData('apache_access.log', pattern=APACHE_COMBINED_PATTERN))
+
+    def testAddGeoInfoSelectedFields(self):
+        self.test_object.configure({'geoip_dat_path': self.path_to_geo_db,
+                                    'geo_info_fields': ['country_code', 'city', 'coordinates']})
+        self.benchmark(self.loadSampleData('apache_access.log', pattern=APACHE_COMBINED_PATTERN))
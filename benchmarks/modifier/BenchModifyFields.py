@@ -0,0 +1,26 @@
+import mock
+
+from benchmarks.ModuleBenchmarkTestCase import ModuleBenchmarkTestCase, NGINX_MAIN_PATTERN
+from lumbermill.modifier import ModifyFields
+
+
+class BenchModifyFields(ModuleBenchmarkTestCase):
+
+    def setUp(self):
+        super(BenchModifyFields, self).setUp(ModifyFields.ModifyFields(mock.Mock()))
+
+    def testDelete(self):
+        self.test_object.configure({'action': 'delete',
+                                    'source_fields': ['identd', 'user', 'protocol']})
+        self.benchmark(self.loadSampleData('nginx_access.log', pattern=NGINX_MAIN_PATTERN))
+
+    def testCastToInteger(self):
+        self.test_object.configure({'action': 'cast_to_int',
+                                    'source_fields': ['http_status', 'bytes_send']})
+        self.benchmark(self.loadSampleData('nginx_access.log', pattern=NGINX_MAIN_PATTERN))
+
+    def testRename(self):
+        self.test_object.configure({'action': 'rename',
+                                    'source_field': 'x_forwarded_for',
+                                    'target_field': 'client_ip'})
+        self.benchmark(self.loadSampleData('nginx_access.log', pattern=NGINX_MAIN_PATTERN))
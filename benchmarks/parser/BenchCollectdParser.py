@@ -0,0 +1,14 @@
+import mock
+
+from benchmarks.ModuleBenchmarkTestCase import ModuleBenchmarkTestCase
+from lumbermill.parser import CollectdParser
+
+
+class BenchCollectdParser(ModuleBenchmarkTestCase):
+
+    def setUp(self):
+        super(BenchCollectdParser, self).setUp(CollectdParser.CollectdParser(mock.Mock()))
+
+    def testDecode(self):
+        self.test_object.configure({})
+        self.benchmark(self.loadSampleData('collectd.hex', decode_hex=True))
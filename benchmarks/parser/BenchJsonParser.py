@@ -0,0 +1,18 @@
+import mock
+
+from benchmarks.ModuleBenchmarkTestCase import ModuleBenchmarkTestCase
+from lumbermill.parser import JsonParser
+
+
+class BenchJsonParser(ModuleBenchmarkTestCase):
+
+    def setUp(self):
+        super(BenchJsonParser, self).setUp(JsonParser.JsonParser(mock.Mock()))
+
+    def testDecode(self):
+        self.test_object.configure({})
+        self.benchmark(self.loadSampleData('events.json'))
+
+    def testDecodeToTargetField(self):
+        self.test_object.configure({'target_field': 'json_data'})
+        self.benchmark(self.loadSampleData('events.json'))
@@ -0,0 +1,15 @@
+from benchmarks.ModuleBenchmarkTestCase import ModuleBenchmarkTestCase
+from tests.ModuleBaseTestCase import MockLumberMill
+from lumbermill.parser import NetFlowParser
+
+
+class BenchNetFlowParser(ModuleBenchmarkTestCase):
+
+    def setUp(self):
+        test_object = NetFlowParser.NetFlowParser(MockLumberMill())
+        test_object.lumbermill.addModule('NetFlowParser', test_object)
+        super(BenchNetFlowParser, self).setUp(test_object)
+
+    def testNetFlowV5(self):
+        self.test_object.configure({})
+        self.benchmark(self.loadSampleData('netflow_v5.hex', decode_hex=True))
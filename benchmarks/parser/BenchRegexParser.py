@@ -0,0 +1,29 @@
+import mock
+
+from benchmarks.ModuleBenchmarkTestCase import ModuleBenchmarkTestCase, APACHE_COMBINED_PATTERN, NGINX_MAIN_PATTERN, SYSLOG_PATTERN
+from lumbermill.parser import RegexParser
+
+
+class BenchRegexParser(ModuleBenchmarkTestCase):
+
+    def setUp(self):
+        super(BenchRegexParser, self).setUp(RegexParser.RegexParser(mock.Mock()))
+
+    def testApacheAccessLog(self):
+        self.test_object.configure({'field_extraction_patterns': [{'httpd_access_log': APACHE_COMBINED_PATTERN}]})
+        self.benchmark(self.loadSampleData('apache_access.log'))
+
+    def testNginxAccessLog(self):
+        self.test_object.configure({'field_extraction_patterns': [{'nginx_access_log': NGINX_MAIN_PATTERN}]})
+        self.benchmark(self.loadSampleData('nginx_access.log'))
+
+    def testSyslog(self):
+        self.test_object.configure({'field_extraction_patterns': [{'syslog': SYSLOG_PATTERN}]})
+        self.benchmark(self.loadSampleData('syslog.log'))
+
+    def testMultiplePatterns(self):
+        # The patterns of all three log types, as in a configuration that reads mixed logs.
+        self.test_object.configure({'field_extraction_patterns': [{'syslog': SYSLOG_PATTERN},
+                                                                  {'nginx_access_log': NGINX_MAIN_PATTERN},
+                                                                  {'httpd_access_log': APACHE_COMBINED_PATTERN}]})
+        self.benchmark(self.loadSampleData('apache_access.log') + self.loadSampleData('nginx_access.log') + self.loadSampleData('syslog.log'))
@@ -0,0 +1,18 @@
+import mock
+
+from benchmarks.ModuleBenchmarkTestCase import ModuleBenchmarkTestCase, SYSLOG_PATTERN
+from lumbermill.parser import SyslogPrivalParser
+
+
+class BenchSyslogPrivalParser(ModuleBenchmarkTestCase):
+
+    def setUp(self):
+        super(BenchSyslogPrivalParser, self).setUp(SyslogPrivalParser.SyslogPrivalParser(mock.Mock()))
+
+    def testMapValues(self):
+        self.test_object.configure({})
+        self.benchmark(self.loadSampleData('syslog.log', pattern=SYSLOG_PATTERN))
+
+    def testWithoutMapValues(self):
+        self.test_object.configure({'map_values': False})
+        self.benchmark(self.loadSampleData('syslog.log', pattern=SYSLOG_PATTERN))
@@ -0,0 +1,22 @@
+import mock
+
+from benchmarks.ModuleBenchmarkTestCase import ModuleBenchmarkTestCase, NGINX_MAIN_PATTERN
+from lumbermill.parser import UrlParser
+
+
+class BenchUrlParser(ModuleBenchmarkTestCase):
+
+    def setUp(self):
+        super(BenchUrlParser, self).setUp(UrlParser.UrlParser(mock.Mock()))
+
+    def testDecode(self):
+        self.test_object.configure({'source_field': 'uri',
+                                    'target_field': 'uri_parts'})
+        self.benchmark(self.loadSampleData('nginx_access.log', pattern=NGINX_MAIN_PATTERN))
+
+    def testDecodeWithQuerystring(self):
+        self.test_object.configure({'source_field': 'uri',
+                                    'target_field': 'uri_parts',
+                                    'parse_querystring': True,
+                                    'querystring_target_field': 'params'})
+        self.benchmark(self.loadSampleData('nginx_access.log', pattern=NGINX_MAIN_PATTERN))
@@ -0,0 +1,14 @@
+import mock
+
+from benchmarks.ModuleBenchmarkTestCase import ModuleBenchmarkTestCase, APACHE_COMBINED_PATTERN, NGINX_MAIN_PATTERN
+from lumbermill.parser import UserAgentParser
+
+
+class BenchUserAgentParser(ModuleBenchmarkTestCase):
+
+    def setUp(self):
+        super(BenchUserAgentParser, self).setUp(UserAgentParser.UserAgentParser(mock.Mock()))
+
+    def testUserAgent(self):
+        self.test_object.configure({'source_fields': 'user_agent'})
+        self.benchmark(self.loadSampleData('apache_access.log', pattern=APACHE_COMBINED_PATTERN) + self.loadSampleData('nginx_access.log', pattern=NGINX_MAIN_PATTERN))
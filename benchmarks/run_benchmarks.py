@@ -0,0 +1,66 @@
+import unittest as unittest
+import os
+import sys
+import json
+import argparse
+
+pathname = os.path.abspath(__file__)
+pathname = pathname[:pathname.rfind("/")]
+sys.path.insert(0, pathname[:pathname.rfind("/")])
+
+from benchmarks import ModuleBenchmarkTestCase
+
+"""
+Run all benchmarks and compare them with the stored baseline:
+python benchmarks/run_benchmarks.py
+
+To judge a change, store a baseline before applying it:
+python benchmarks/run_benchmarks.py --save-baseline
+
+Baselines depend on the machine and interpreter. Only compare results from the same setup.
+"""
+
+
+def printResults(results, baseline):
+    print("\n%-50s %12s %8s %14s %8s %12s %8s" % ('Benchmark', 'events/s', 'change', 'objects/event', 'change', 'bytes/event', 'change'))
+    for name in sorted(results.keys()):
+        result = results[name]
+        events_change = objects_change = bytes_change = ''
+        if name in baseline:
+            events_change = "%+.1f%%" % ((result['events_per_second'] / baseline[name]['events_per_second'] - 1) * 100)
+            objects_change = "%+.2f" % (result['objects_per_event'] - baseline[name].get('objects_per_event', 0))
+            bytes_change = "%+.1f" % (result['bytes_per_event'] - baseline[name].get('bytes_per_event', 0))
+        print("%-50s %12.1f %8s %14.2f %8s %12.1f %8s" % (name, result['events_per_second'], events_change, result['objects_per_event'], objects_change, result['bytes_per_event'], bytes_change))
+
+
+def saveBaseline(path, results, baseline):
+    # Keep the baseline of benchmarks that were not run, e.g. when using --include.
+    baseline.update(results)
+    with open(path, 'w') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+    print("\nSaved baseline of %d benchmarks to %s." % (len(results), path))
+
+
+if __name__ == "__main__":
+    benchmark_dir = os.path.dirname(os.path.realpath(__file__))
+    settings = ModuleBenchmarkTestCase.settings
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--include", help="Filename pattern to select benchmarks. Default: Bench*.py")
+    parser.add_argument("--events", type=int, help="Events per run. Default: %s" % settings['events'])
+    parser.add_argument("--repeat", type=int, help="Runs per benchmark, the fastest is used. Default: %s" % settings['repeat'])
+    parser.add_argument("--threshold", type=float, help="Allowed regression, e.g. 0.2 for 20%%. Default: {}".format(settings['threshold']))
+    parser.add_argument("--baseline", help="Path to baseline file. Default: %s" % settings['baseline'])
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as baseline instead of comparing them.")
+    args = parser.parse_args()
+    for option in ['events', 'repeat', 'threshold', 'baseline']:
+        if getattr(args, option) is not None:
+            settings[option] = getattr(args, option)
+    settings['compare'] = not args.save_baseline
+    include_benchmark_filename_pattern = 'Bench*.py' if not args.include else args.include
+    all_benchmarks = unittest.TestLoader().discover(benchmark_dir, pattern=include_benchmark_filename_pattern, top_level_dir=os.path.dirname(benchmark_dir))
+    result = unittest.TextTestRunner(verbosity=2).run(all_benchmarks)
+    baseline = ModuleBenchmarkTestCase.loadBaseline(settings['baseline'])
+    printResults(ModuleBenchmarkTestCase.results, baseline)
+    if args.save_baseline:
+        saveBaseline(settings['baseline'], ModuleBenchmarkTestCase.results, baseline)
+    sys.exit(0 if result.wasSuccessful() else 1)
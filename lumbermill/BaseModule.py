@@ -1,14 +1,16 @@
 # -*- coding: utf-8 -*-
-import abc
 import logging
 import os
 import re
 import sys
+import time
 from functools import wraps
 
-from constants import LOGLEVEL_STRING_TO_LOGLEVEL_INT
+from constants import LOGLEVEL_STRING_TO_LOGLEVEL_INT, BACKPRESSURE_CHECK_INTERVAL
 from utils.ConfigurationValidator import ConfigurationValidator
-from utils.DynamicValues import parseDynamicValue, mapDynamicValue, GP_DYNAMIC_VAL_REGEX_WITH_TYPES
+from utils.DynamicValues import parseDynamicValue, compileDynamicValue
+from utils.filterparser.FilterParser import CompiledFilter
+from utils.OutputRouter import OutputRouter
 
 
 class BaseModule:
@@ -37,6 +39,10 @@ class BaseModule:
     module_type = "generic"
     """ Set module type. """
     can_run_forked = True
+    modifies_events = True
+    """ Modules that only read events can share them with other receivers without a copy. """
+    partition_key = None
+    """ Name of the configuration value that groups events sharing module state. See isPartitioned. """
 
     def __init__(self, lumbermill):
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -45,6 +51,12 @@ class BaseModule:
         self.configuration_data = {}
         self.input_filter = None
         self.output_filters = {}
+        self.has_common_actions = False
+        self.receiver_copy_plan = None
+        self.output_router = None
+        self.module_statistics = None
+        self.is_saturated = False
+        self.saturation_checked_at = 0
         self.process_id = os.getpid()
 
     def configure(self, configuration=None):
@@ -67,6 +79,15 @@ class BaseModule:
         self.add_fields = self.getConfigurationValue('add_fields')
         self.event_type = self.getConfigurationValue('event_type')
         self.set_internal = self.getConfigurationValue('set_internal')
+        # Compile the dynamic values of the common actions once, so they only need to be rendered per event.
+        self.add_fields_template = compileDynamicValue(self.add_fields)
+        self.event_type_template = compileDynamicValue(self.event_type)
+        if self.set_internal:
+            self.set_internal_template = compileDynamicValue(self.set_internal['value'])
+        # If none of the default actions is configured, commonActions can be skipped.
+        self.has_common_actions = bool(self.delete_fields or self.add_fields or self.event_type or self.set_internal)
+        self.receiver_copy_plan = None
+        self.output_router = None
         # Set input filter.
         if self.getConfigurationValue('filter'):
             self.setInputFilter(self.getConfigurationValue('filter'))
@@ -142,80 +163,150 @@ class BaseModule:
             return False
         if config_setting['contains_dynamic_value'] is False or not mapping_dict:
             return config_setting.get('value')
-        return mapDynamicValue(config_setting.get('value'), mapping_dict, use_strftime)
+        # Compile the value on first use and keep the template with the setting.
+        try:
+            template = config_setting['templates'][use_strftime]
+        except KeyError:
+            template = config_setting.setdefault('templates', {})[use_strftime] = compileDynamicValue(config_setting.get('value'), use_strftime)
+        return template.render(mapping_dict)
+
+    def isPartitioned(self):
+        """
+        Modules keeping per key state can declare the configuration value holding the key in partition_key and offer
+        the partition_events option. If it is set and LumberMill runs with multiple workers, events with the same key
+        will always be routed to the same worker. See LumberMill.initEventStream.
+        """
+        if not self.partition_key:
+            return False
+        return bool(self.getConfigurationValue('partition_events'))
+
+    def getPartitionKey(self, event):
+        return self.getConfigurationValue(self.partition_key, event)
 
     def addReceiver(self, receiver_name, receiver):
         if self.module_type != "output":
             self.receivers[receiver_name] = receiver
+            self.receiver_copy_plan = None
+            self.output_router = None
+
+    def modifiesEvents(self, visited=None):
+        """
+        Check if this module or any module it sends events to might modify events.
+        Queues always count as modifying, since the queued events are serialized later on.
+        """
+        if self.modifies_events or self.has_common_actions:
+            return True
+        visited = visited if visited is not None else set()
+        visited.add(id(self))
+        for receiver in self.receivers.values():
+            if id(receiver) in visited:
+                continue
+            if not hasattr(receiver, 'modifiesEvents') or receiver.modifiesEvents(visited):
+                return True
+        return False
+
+    def isSaturated(self, visited=None):
+        """
+        Check if this module or any module it sends events to can not keep up.
+        A module is saturated if its buffer is full, a queue if it has no space left.
+        Input modules use this to pause reading until the pressure is gone.
+        """
+        buffer = getattr(self, 'buffer', None)
+        if buffer is not None and hasattr(buffer, 'isFull') and buffer.isFull():
+            return True
+        visited = visited if visited is not None else set()
+        visited.add(id(self))
+        for receiver in self.receivers.values():
+            if id(receiver) in visited:
+                continue
+            if hasattr(receiver, 'receiveEvent'):
+                if receiver.isSaturated(visited):
+                    return True
+            elif hasattr(receiver, 'isSaturated') and receiver.isSaturated():
+                return True
+        return False
+
+    def isSaturatedCached(self):
+        """
+        Same as isSaturated, but the receivers are only checked again after BACKPRESSURE_CHECK_INTERVAL seconds.
+        Inputs check for saturation before each read, walking all receivers each time would be too expensive.
+        """
+        now = time.time()
+        if now - self.saturation_checked_at >= BACKPRESSURE_CHECK_INTERVAL:
+            self.is_saturated = self.isSaturated()
+            self.saturation_checked_at = now
+        return self.is_saturated
+
+    def getReceiverCopyPlan(self, receivers):
+        """
+        Return a list of (receiver, copy_event) tuples.
+
+        Receivers that do not modify events share the original event. All other receivers get their own copy,
+        except for one receiver that gets the original if no read only receiver holds it. This receiver will be
+        called last, so the copies are made before the original might get modified.
+        """
+        if receivers is self.receivers and self.receiver_copy_plan is not None:
+            return self.receiver_copy_plan
+        read_only_receivers = []
+        modifying_receivers = []
+        for receiver in receivers.values():
+            if hasattr(receiver, 'modifiesEvents') and not receiver.modifiesEvents():
+                read_only_receivers.append((receiver, False))
+            else:
+                modifying_receivers.append((receiver, True))
+        if modifying_receivers and not read_only_receivers:
+            modifying_receivers[-1] = (modifying_receivers[-1][0], False)
+        copy_plan = read_only_receivers + modifying_receivers
+        if receivers is self.receivers:
+            self.receiver_copy_plan = copy_plan
+        return copy_plan
 
     def setInputFilter(self, filter_string):
         """
-        Convert input filter to lamba function.
-        E.g. original filter:
-        filter: $(lumbermill.source_module) == 'TcpServer'
-        converts to:
-        lambda event : event.get('lumbermill.source_module', False) == 'TcpServer'
-        """
-        filter_string_tmp = re.sub('^if\s+', "", filter_string)
-        # Check if we have a reference to the internal LumberMill datastore.
-        if re.search(r"%\(internal.(.*?)\)(-?\d*[-\.\*]?\d*[sdf]?)", filter_string_tmp):
-            filter_string_tmp = re.sub(r"%\(internal.(.*?)\)(-?\d*[-\.\*]?\d*[sdf]?)", r"lumbermill.getFromInternalDataStore('\1', False)", filter_string_tmp)
-        # Replace all remaining dynamic references.
-        filter_string_tmp = GP_DYNAMIC_VAL_REGEX_WITH_TYPES.sub(r"event.get('\1', False)", filter_string_tmp)
-        filter_string_tmp = "lambda lumbermill, event : " + filter_string_tmp
-        try:
-            event_filter = eval(filter_string_tmp)
-        except:
-            etype, evalue, etb = sys.exc_info()
-            self.logger.error("Failed to compile filter: %s. Exception: %s, Error: %s." % (filter_string, etype, evalue))
-            self.lumbermill.shutDown()
+        Compile input filter, @see: CompiledFilter.
+        """
+        event_filter = self.compileFilter(filter_string)
+        if not event_filter:
+            return
+        self.input_filter = event_filter
+        self.input_filter_string = filter_string
         # Wrap default receiveEvent method with filtered one.
         self.wrapReceiveEventWithFilter(event_filter, filter_string)
 
     def addOutputFilter(self, receiver_name, filter_string):
         """
-        Convert output filter to lamba function.
-        E.g. original filter:
-        filter: $(lumbermill.source_module) == 'TcpServer'
-        converts to:
-        lambda event : event.get('lumbermill.source_module', False) == 'TcpServer'
+        Compile output filter for receiver, @see: CompiledFilter.
         """
-        filter_string_tmp = re.sub('^if\s+', "", filter_string)
         # Output filter strings are not automatically parsed by parseDynamicValuesInConfiguration. So we need to do this here.
-        # Check if we have a reference to the internal LumberMill datastore.
-        if re.search(r"%\(internal.(.*?)\)(-?\d*[-\.\*]?\d*[sdf]?)", filter_string):
-            filter_string_tmp = re.sub(r"%\(internal.(.*?)\)(-?\d*[-\.\*]?\d*[sdf]?)", r"lumbermill.getFromInternalDataStore('\1', False)", filter_string_tmp)
-        # Replace all remaining dynamic references.
-        filter_string_tmp = GP_DYNAMIC_VAL_REGEX_WITH_TYPES.sub(r"event.get('\1', False)", filter_string_tmp)
-        filter_string_tmp = "lambda lumbermill, event : " + filter_string_tmp
-        try:
-            output_filter = eval(filter_string_tmp)
+        output_filter = self.compileFilter(filter_string)
+        if output_filter:
             self.output_filters[receiver_name] = output_filter
+            self.output_router = None
+
+    def compileFilter(self, filter_string):
+        """
+        Compile a filter string to a callable of lumbermill and event.
+        The module globals stay available in filter expressions.
+        """
+        try:
+            return CompiledFilter(filter_string, globals())
         except:
             etype, evalue, etb = sys.exc_info()
             self.logger.error("Failed to compile filter: %s. Exception: %s, Error: %s." % (filter_string, etype, evalue))
             self.lumbermill.shutDown()
 
+    def getOutputRouter(self):
+        """
+        Return the router for modules with output filters. It is built on first use, when all receivers are known.
+        """
+        if self.output_router is None:
+            self.output_router = OutputRouter(self)
+        return self.output_router
+
     def getFilteredReceivers(self, event):
         if not self.output_filters:
             return self.receivers
-        filterd_receivers = {}
-        for receiver_name, receiver in self.receivers.items():
-            if receiver_name not in self.output_filters:
-                filterd_receivers[receiver_name] = receiver
-                continue
-            try:
-                # The filter needs the event variable to work correctly.
-                matched = self.output_filters[receiver_name](self.lumbermill, event)
-            except:
-                etype, evalue, etb = sys.exc_info()
-                self.logger.warning("Output filter for %s failed. Exception: %s, Error: %s." % (receiver_name, etype, evalue))
-                print(event)
-                continue
-            # If the filter succeeds, the data will be send to the receiver.
-            if matched:
-                filterd_receivers[receiver_name] = receiver
-        return filterd_receivers
+        return self.getOutputRouter().route(event)[0]
 
     def initAfterFork(self):
         """
@@ -233,7 +324,7 @@ class BaseModule:
         #if not self.input_filter or self.input_filter_matched:
         # Add fields if configured.
         if self.add_fields:
-            for field_name, field_value in mapDynamicValue(self.add_fields, event).items():
+            for field_name, field_value in self.add_fields_template.render(event).items():
                 try:
                     event[field_name] = field_value
                 except KeyError:
@@ -245,41 +336,126 @@ class BaseModule:
             except (KeyError, AttributeError) as e:
                 self.logger.warning("KeyError: could not delete %s." % field_name)
         if self.event_type:
-            event['lumbermill']['event_type'] = mapDynamicValue(self.event_type, event)
+            event['lumbermill']['event_type'] = self.event_type_template.render(event)
         if self.set_internal:
-            self.lumbermill.setInInternalDataStore(self.set_internal['key'], mapDynamicValue(self.set_internal['value'], event))
+            self.lumbermill.setInInternalDataStore(self.set_internal['key'], self.set_internal_template.render(event))
         return event
 
     def sendEvent(self, event, apply_common_actions=True):
-        receivers = self.receivers if not self.output_filters else self.getFilteredReceivers(event)
+        if self.output_filters:
+            receivers, copy_plan = self.getOutputRouter().route(event)
+        else:
+            receivers, copy_plan = self.receivers, self.getReceiverCopyPlan(self.receivers)
         if not receivers:
             return
-        if(apply_common_actions):
+        if apply_common_actions and self.has_common_actions:
             event = self.commonActions(event)
-        if len(receivers) > 1:
-            event_clone = event.copy()
-        copy_event = False
-        for receiver in receivers.values():
-            self.logger.debug("Sending event from %s to %s" % (self, receiver))
+        for receiver, copy_event in copy_plan:
             if hasattr(receiver, 'receiveEvent'):
-                receiver.receiveEvent(event if not copy_event else event_clone.copy())
+                receiver.receiveEvent(event if not copy_event else event.copy())
             else:
-                receiver.put(event if not copy_event else event_clone.copy())
-            copy_event = True
+                receiver.put(event if not copy_event else event.copy())
+
+    def sendEvents(self, events, apply_common_actions=True):
+        """
+        Send a list of events to all receivers.
+
+        If a receiver implements receiveEvents, the whole batch is passed on in one call. Other receivers will get
+        the events one by one. If output filters are configured, each event needs to be matched individually, so
+        this falls back to sendEvent.
+        """
+        if not self.receivers or not events:
+            return
+        if self.output_filters:
+            for event in events:
+                self.sendEvent(event, apply_common_actions)
+            return
+        if apply_common_actions and self.has_common_actions:
+            events = [self.commonActions(event) for event in events]
+        for receiver, copy_events in self.getReceiverCopyPlan(self.receivers):
+            batch = events if not copy_events else [event.copy() for event in events]
+            if hasattr(receiver, 'receiveEvents'):
+                receiver.receiveEvents(batch)
+            elif hasattr(receiver, 'receiveEvent'):
+                for event in batch:
+                    receiver.receiveEvent(event)
+            elif hasattr(receiver, 'extend'):
+                receiver.extend(batch)
+            else:
+                for event in batch:
+                    receiver.put(event)
+
+    def enableStatistics(self, module_statistics):
+        """
+        Record throughput and processing time of this module in module_statistics, @see: ModuleStatistics.
+        Modules overriding receiveEvent or receiveEvents are only instrumented where they call the base methods.
+        """
+        self.module_statistics = module_statistics
 
     def receiveEvent(self, event):
+        if self.module_statistics is not None:
+            self.receiveEventWithStatistics(event)
+            return
         for event in self.handleEvent(event):
             if event:
                 self.sendEvent(event)
 
+    def receiveEventWithStatistics(self, event):
+        statistics = self.module_statistics
+        statistics.events_in += 1
+        events_out = 0
+        if statistics.events_in % statistics.sample_rate:
+            for event in self.handleEvent(event):
+                if event:
+                    events_out += 1
+                    self.sendEvent(event)
+        else:
+            # Only time the module itself, not the receivers called via sendEvent.
+            processing_time = 0
+            started_at = time.time()
+            for event in self.handleEvent(event):
+                processing_time += time.time() - started_at
+                if event:
+                    events_out += 1
+                    self.sendEvent(event)
+                started_at = time.time()
+            statistics.addProcessingTime(processing_time + time.time() - started_at)
+        statistics.events_out += events_out
+        # Events not passed on by modules without receivers, like output modules, are not dropped.
+        if not events_out and self.receivers:
+            statistics.events_dropped += 1
+
+    def receiveEvents(self, events):
+        """
+        Receive a list of events, handle them and pass the results on to the receivers as one batch.
+        """
+        statistics = self.module_statistics
+        if statistics is not None:
+            event_count = len(events)
+            started_at = time.time()
+            events = self.handleEvents(events)
+            statistics.addProcessingTime(time.time() - started_at, event_count)
+            statistics.events_in += event_count
+            statistics.events_out += len(events) if events else 0
+            if self.receivers:
+                statistics.events_dropped += max(0, event_count - (len(events) if events else 0))
+        else:
+            events = self.handleEvents(events)
+        if events:
+            self.sendEvents(events)
+
     def wrapReceiveEventWithFilter(self, event_filter, filter_string):
         wrapped_func = self.receiveEvent
         @wraps(wrapped_func)
         def receiveEventFiltered(event):
             try:
                 if event_filter(self.lumbermill, event):
+                    if self.module_statistics is not None:
+                        self.module_statistics.filter_passed += 1
                     wrapped_func(event)
                 else:
+                    if self.module_statistics is not None:
+                        self.module_statistics.filter_skipped += 1
                     # Common actions will only be applied if the filter for the module matched.
                     self.sendEvent(event, apply_common_actions=False)
             except:
@@ -289,15 +465,67 @@ class BaseModule:
                 # Common actions will only be applied if the filter for the module matched.
                 self.sendEvent(event, apply_common_actions=False)
         self.receiveEvent = receiveEventFiltered
+        wrapped_batch_func = self.receiveEvents
+        @wraps(wrapped_batch_func)
+        def receiveEventsFiltered(events):
+            matched_events = []
+            unmatched_events = []
+            for event in events:
+                try:
+                    if event_filter(self.lumbermill, event):
+                        matched_events.append(event)
+                    else:
+                        unmatched_events.append(event)
+                except:
+                    etype, evalue, etb = sys.exc_info()
+                    self.logger.warning("Filter <%s> failed. Exception: %s, Error: %s." % (filter_string, etype, evalue))
+                    unmatched_events.append(event)
+            if self.module_statistics is not None:
+                self.module_statistics.filter_passed += len(matched_events)
+                self.module_statistics.filter_skipped += len(unmatched_events)
+            if matched_events:
+                wrapped_batch_func(matched_events)
+            if unmatched_events:
+                # Common actions will only be applied if the filter for the module matched.
+                self.sendEvents(unmatched_events, apply_common_actions=False)
+        self.receiveEvents = receiveEventsFiltered
+
+    def handleEvents(self, events):
+        """
+        Process a list of events.
+
+        The default implementation passes each event to handleEvent. Modules that can work on a whole batch
+        at once may override this method.
+
+        @param events: list
+        @return: list of events to pass on to the receivers.
+        """
+        handled_events = []
+        for event in events:
+            for handled_event in self.handleEvent(event):
+                if handled_event:
+                    handled_events.append(handled_event)
+        return handled_events
 
-    @abc.abstractmethod
     def handleEvent(self, event):
         """
         Process the event.
 
+        Modules that always pass on exactly one event should implement processEvent instead.
+        This saves the generator and allows LumberMill to fuse the module into a direct call path.
+
         @param event: dictionary
         """
-        yield event
+        yield self.processEvent(event)
+
+    def processEvent(self, event):
+        """
+        Process the event and return it. Return None to drop the event.
+
+        @param event: dictionary
+        @return: event: dictionary
+        """
+        return event
 
     def shutDown(self):
         self.alive = False
\ No newline at end of file
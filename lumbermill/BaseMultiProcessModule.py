@@ -73,10 +73,9 @@ class BaseMultiProcessModule(BaseModule.BaseModule, multiprocessing.Process): #
         self.alive = True
         self.process_id = os.getpid()
         while self.alive:
-            for event in self.pollQueue():
-                if not event:
-                    continue
-                self.receiveEvent(event)
+            events = [event for event in self.pollQueue() if event]
+            if events:
+                self.receiveEvents(events)
 
     def shutDown(self):
         # Call parent shutDown method
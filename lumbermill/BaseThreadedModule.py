@@ -68,7 +68,6 @@ class BaseThreadedModule(BaseModule.BaseModule, threading.Thread):
                 self.logger.error("Shutting down module %s since no receivers are set." % (self.__class__.__name__))
                 return
         while self.alive:
-            for event in self.pollQueue():
-                if not event:
-                    continue
-                self.receiveEvent(event)
+            events = [event for event in self.pollQueue() if event]
+            if events:
+                self.receiveEvents(events)
@@ -0,0 +1,299 @@
+# -*- coding: UTF-8 -*-
+"""
+Benchmark a LumberMill configuration.
+
+Usage: lumbermill bench -c <path/to/config.conf> [options]
+
+The inputs of the configuration are replaced by BenchmarkInput and its outputs by BenchmarkSink. If a capture file of
+CaptureSink is given via --replay, the inputs are replaced by Replay instead. LumberMill is then run in a subprocess
+for the configured duration. The results are printed as JSON, so they can be kept as baseline
+and compared to the results of later releases.
+"""
+import os
+import sys
+import copy
+import glob
+import json
+import time
+import shutil
+import signal
+import getopt
+import tempfile
+import subprocess
+
+import yaml
+
+from lumbermill.constants import LUMBERMILL_BASEPATH
+from lumbermill.utils.CaptureFile import isCaptureFile
+from lumbermill.utils.ModuleRegistry import ModuleRegistry
+from lumbermill.utils.StatisticCollector import ModuleStatistics, MODULE_STATISTICS_COUNTERS, LATENCY_BUCKETS
+
+MODULE_DIRS = ['input', 'parser', 'modifier', 'misc', 'output', 'webserver', 'cluster']
+# Modules in these directories send their events to the next module, if no receivers are configured.
+FORWARDING_MODULE_DIRS = ['input', 'parser', 'modifier', 'misc']
+
+
+def usage():
+    print('Usage: ' + sys.argv[0] + ' bench -c <path/to/config.conf> [--duration <seconds>] [--rate <events per second>]'
+          ' [--event <json>] [--replay <path/to/file>] [--speed <factor>] [--workers <count>] [--keep-outputs] [--no-module-statistics]'
+          ' [--output <path/to/results.json>]')
+
+
+def getModuleIds(configuration):
+    """ Return (module class name, module configuration, module id) of all modules, with ids as LumberMill sets them. """
+    modules = []
+    module_ids = set()
+    for module_info in configuration:
+        if isinstance(module_info, dict):
+            module_class_name = module_info.keys()[0]
+            module_config = module_info[module_class_name] or {}
+            module_id = module_config.get('id', module_class_name)
+        else:
+            module_class_name = module_id = module_info
+            module_config = {}
+        if module_class_name == 'Global':
+            continue
+        counter = 1
+        while module_id in module_ids:
+            module_id = "%s_%s" % (module_id.split("_", 1)[0], counter)
+            counter += 1
+        module_ids.add(module_id)
+        modules.append((module_class_name, module_config, module_id))
+    return modules
+
+
+def getReceiverName(receiver_config):
+    return receiver_config.keys()[0] if isinstance(receiver_config, dict) else receiver_config
+
+
+def rewriteConfiguration(configuration, module_registry, results_path, rate=0, event=None, replay_file=None, speed=0, workers=None, keep_outputs=False, module_statistics=True):
+    """
+    Replace inputs by BenchmarkInput and outputs by BenchmarkSink.
+
+    If replay_file is a capture file, inputs are replaced by Replay. It replays the capture in a loop with the given
+    speed, rate and event are not used then.
+
+    All modules get their id and receivers set explicitly, so replaced modules keep their place in the event flow.
+    If keep_outputs is set, the outputs stay and a single BenchmarkSink receives a copy of each event sent to an output.
+    """
+    global_configuration = {}
+    for module_info in configuration:
+        if isinstance(module_info, dict) and 'Global' in module_info:
+            global_configuration = copy.deepcopy(module_info['Global'] or {})
+    if workers:
+        global_configuration['workers'] = workers
+    global_configuration['module_statistics'] = module_statistics
+    modules = getModuleIds(configuration)
+    module_dirs = {}
+    for module_class_name, module_config, module_id in modules:
+        # Modules outside the module directories are imported by their name and have no directory.
+        import_path = module_registry.getImportPath(module_class_name).split('.')
+        module_dirs[module_id] = import_path[-2] if len(import_path) > 1 else None
+    output_ids = [module_id for module_id, module_dir in module_dirs.items() if module_dir == 'output']
+    input_count = max(len([module_dir for module_dir in module_dirs.values() if module_dir == 'input']), 1)
+    benchmark_configuration = [{'Global': global_configuration}]
+    for idx, (module_class_name, module_config, module_id) in enumerate(modules):
+        module_config = copy.deepcopy(module_config)
+        module_config['id'] = module_id
+        module_dir = module_dirs[module_id]
+        if 'receivers' not in module_config and module_dir in FORWARDING_MODULE_DIRS and idx + 1 < len(modules):
+            module_config['receivers'] = [modules[idx + 1][2]]
+        if module_dir == 'input':
+            module_config = dict([(key, value) for key, value in module_config.items() if key in ['id', 'receivers', 'add_fields', 'event_type']])
+            if replay_file and isCaptureFile(replay_file):
+                module_class_name = 'Replay'
+                module_config.update({'file_name': replay_file, 'speed': speed, 'loop': True})
+            else:
+                module_class_name = 'BenchmarkInput'
+                module_config['rate'] = float(rate) / input_count
+                if event is not None:
+                    module_config['event'] = event
+                if replay_file:
+                    module_config['file'] = replay_file
+        elif module_dir == 'output' and not keep_outputs:
+            module_class_name = 'BenchmarkSink'
+            module_config = {'id': module_id, 'results_path': results_path}
+        if keep_outputs and any(getReceiverName(receiver_config) in output_ids for receiver_config in module_config.get('receivers', [])):
+            module_config['receivers'].append('BenchmarkSink')
+        benchmark_configuration.append({module_class_name: module_config})
+    if keep_outputs:
+        benchmark_configuration.append({'BenchmarkSink': {'id': 'BenchmarkSink', 'results_path': results_path}})
+    return benchmark_configuration
+
+
+def getProcessTree(process):
+    try:
+        return [process] + process.children(recursive=True)
+    except Exception:
+        return [process]
+
+
+def measureProcesses(master_process, duration):
+    """ Sample CPU time and RSS of all LumberMill processes once per second for duration seconds. """
+    import psutil
+    processes = {}
+    stop_at = time.time() + duration
+    while time.time() < stop_at:
+        for process in getProcessTree(master_process):
+            try:
+                cpu_times = process.cpu_times()
+                rss = process.memory_info().rss
+            except psutil.Error:
+                continue
+            process_stats = processes.setdefault(process.pid, {'first_sample_at': time.time(), 'first_cpu_time': cpu_times.user + cpu_times.system, 'max_rss': 0})
+            process_stats['last_sample_at'] = time.time()
+            process_stats['last_cpu_time'] = cpu_times.user + cpu_times.system
+            process_stats['max_rss'] = max(process_stats['max_rss'], rss)
+        time.sleep(min(1, max(stop_at - time.time(), 0)))
+    process_results = {}
+    for pid, process_stats in processes.items():
+        sampled_time = process_stats['last_sample_at'] - process_stats['first_sample_at']
+        cpu_percent = 100.0 * (process_stats['last_cpu_time'] - process_stats['first_cpu_time']) / sampled_time if sampled_time else None
+        process_results[str(pid)] = {'cpu_percent': cpu_percent, 'max_rss': process_stats['max_rss']}
+    return process_results
+
+
+def summarizeResults(sink_results, process_results, duration):
+    """ Combine the results written by the BenchmarkSinks of all workers and the process measurements. """
+    report = {'duration': duration, 'events': 0, 'eps': 0, 'eps_per_worker': {}, 'latency': None, 'sinks': {}, 'modules': {}, 'processes': process_results}
+    latency_histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+    latency = timed_events = 0
+    module_statistics_per_worker = {}
+    for sink_name, results in sink_results:
+        report['events'] += results['events']
+        sink_report = report['sinks'].setdefault(sink_name, {'events': 0, 'eps': 0})
+        sink_report['events'] += results['events']
+        if results['events'] and results['last_event_at'] > results['first_event_at']:
+            eps = results['events'] / (results['last_event_at'] - results['first_event_at'])
+            sink_report['eps'] += eps
+            report['eps'] += eps
+            worker = str(results['worker'])
+            report['eps_per_worker'][worker] = report['eps_per_worker'].get(worker, 0) + eps
+        latency += results['latency']
+        timed_events += results['timed_events']
+        latency_histogram = [count + other_count for count, other_count in zip(latency_histogram, results['latency_histogram'])]
+        if str(results['pid']) in report['processes']:
+            report['processes'][str(results['pid'])]['worker'] = results['worker']
+        # All sinks of a worker write the same module statistics.
+        module_statistics_per_worker[results['worker']] = results['module_statistics']
+    if timed_events:
+        report['latency'] = {'avg': latency / timed_events,
+                             'p50': ModuleStatistics.getPercentile(latency_histogram, 50, LATENCY_BUCKETS),
+                             'p99': ModuleStatistics.getPercentile(latency_histogram, 99, LATENCY_BUCKETS)}
+    for module_statistics in module_statistics_per_worker.values():
+        for module_name, stats in module_statistics.items():
+            module_report = report['modules'].setdefault(module_name, dict([(counter_name, 0) for counter_name in MODULE_STATISTICS_COUNTERS] + [('histogram', [0] * len(stats['histogram']))]))
+            for counter_name in MODULE_STATISTICS_COUNTERS:
+                module_report[counter_name] += stats[counter_name]
+            module_report['histogram'] = [count + other_count for count, other_count in zip(module_report['histogram'], stats['histogram'])]
+    for module_name, module_report in report['modules'].items():
+        module_report['avg_processing_time'] = module_report['processing_time'] / module_report['timed_events'] if module_report['timed_events'] else None
+        module_report['p50'] = ModuleStatistics.getPercentile(module_report['histogram'], 50)
+        module_report['p99'] = ModuleStatistics.getPercentile(module_report['histogram'], 99)
+        del module_report['histogram']
+    return report
+
+
+def readSinkResults(results_path):
+    sink_results = []
+    for results_filename in sorted(glob.glob(os.path.join(results_path, '*.json'))):
+        sink_name = os.path.basename(results_filename).rsplit('_', 1)[0]
+        with open(results_filename) as results_file:
+            sink_results.append((sink_name, json.load(results_file)))
+    return sink_results
+
+
+def runBenchmark(path_to_config_file, duration=10, **rewrite_options):
+    try:
+        import psutil
+    except ImportError:
+        print('Could not import psutil module. To install run: pip install psutil')
+        return None
+    with open(path_to_config_file, "r") as configuration_file:
+        configuration = yaml.load(configuration_file.read())
+    results_path = tempfile.mkdtemp(prefix='lumbermill_bench_')
+    benchmark_configuration = rewriteConfiguration(configuration, ModuleRegistry(LUMBERMILL_BASEPATH, MODULE_DIRS), results_path, **rewrite_options)
+    benchmark_config_file = os.path.join(results_path, 'benchmark.conf')
+    with open(benchmark_config_file, 'w') as configuration_file:
+        yaml.safe_dump(benchmark_configuration, configuration_file, default_flow_style=False)
+    try:
+        with open(os.path.join(results_path, 'lumbermill.log'), 'w') as log_file:
+            lumbermill_process = subprocess.Popen([sys.executable, os.path.join(LUMBERMILL_BASEPATH, 'LumberMill.py'), '-c', benchmark_config_file], stdout=log_file, stderr=subprocess.STDOUT)
+            # Give the workers some time to start.
+            time.sleep(1)
+            process_results = measureProcesses(psutil.Process(lumbermill_process.pid), duration)
+            lumbermill_process.send_signal(signal.SIGINT)
+            for _ in range(0, 60):
+                if lumbermill_process.poll() is not None:
+                    break
+                time.sleep(.5)
+            else:
+                lumbermill_process.kill()
+        # Workers might still be writing their results.
+        time.sleep(1)
+        sink_results = readSinkResults(results_path)
+        if not sink_results:
+            with open(os.path.join(results_path, 'lumbermill.log')) as log_file:
+                print(log_file.read())
+            return None
+        report = summarizeResults(sink_results, process_results, duration)
+        report['config'] = path_to_config_file
+        report['options'] = rewrite_options
+        return report
+    finally:
+        shutil.rmtree(results_path)
+
+
+def main(argv):
+    try:
+        opts, args = getopt.getopt(argv, "hc:", ["help", "conf=", "duration=", "rate=", "event=", "replay=", "speed=", "workers=", "keep-outputs", "no-module-statistics", "output="])
+    except getopt.GetoptError:
+        usage()
+        return 2
+    path_to_config_file = None
+    duration = 10
+    output_file = None
+    rewrite_options = {}
+    try:
+        for opt, arg in opts:
+            if opt in ("-h", "--help"):
+                usage()
+                return 0
+            elif opt in ("-c", "--conf"):
+                path_to_config_file = arg
+            elif opt == "--duration":
+                duration = float(arg)
+            elif opt == "--rate":
+                rewrite_options['rate'] = float(arg)
+            elif opt == "--event":
+                rewrite_options['event'] = json.loads(arg)
+            elif opt == "--replay":
+                rewrite_options['replay_file'] = os.path.abspath(arg)
+            elif opt == "--speed":
+                rewrite_options['speed'] = float(arg)
+            elif opt == "--workers":
+                rewrite_options['workers'] = int(arg)
+            elif opt == "--keep-outputs":
+                rewrite_options['keep_outputs'] = True
+            elif opt == "--no-module-statistics":
+                rewrite_options['module_statistics'] = False
+            elif opt == "--output":
+                output_file = arg
+    except ValueError:
+        etype, evalue, etb = sys.exc_info()
+        print("Invalid value for %s: %s" % (opt, evalue))
+        usage()
+        return 2
+    if not path_to_config_file:
+        usage()
+        return 2
+    report = runBenchmark(path_to_config_file, duration, **rewrite_options)
+    if not report:
+        print("Benchmark failed, no results were written.")
+        return 1
+    report_json = json.dumps(report, indent=2, sort_keys=True)
+    if output_file:
+        with open(output_file, 'w') as results_file:
+            results_file.write(report_json)
+    print(report_json)
+    return 0
@@ -7,6 +7,8 @@ import os
 import signal
 import sys
 import time
+import tempfile
+import threading
 from collections import OrderedDict
 
 import tornado.ioloop
@@ -37,10 +39,15 @@ sys.path.append(pathname[:pathname.rfind("/")])
 
 from constants import MSGPACK_AVAILABLE, ZMQ_AVAILABLE, LOGLEVEL_STRING_TO_LOGLEVEL_INT
 from utils.misc import TimedFunctionManager, coloredConsoleLogging, restartMainProcess
-from utils.Buffers import BufferedQueue, ZeroMqMpQueue
+from utils.Buffers import BufferedQueue, PartitionedQueue, ZeroMqMpQueue, SharedMemoryRingQueue
 from utils.DictUtils import mergeNestedDicts
 from utils.ConfigurationValidator import ConfigurationValidator
+from utils.ModuleFusion import ModuleFusion
+from utils.ModuleRegistry import ModuleRegistry
+from utils.Profiler import SamplingProfiler, makeDirectory, writeProfile, readProfiles, waitForProfiles, mergeProfiles, formatProfile
 from utils.MultiProcessDataStore import MultiProcessDataStore
+from utils.StatisticCollector import ModuleStatistics
+from utils.filterparser.FilterParser import setInternalValue
 
 # Conditional imports for python2/3
 try:
@@ -61,16 +68,32 @@ class LumberMill():
     and connects them as configured.
     """
 
-    def __init__(self, path_to_config_file):
+    def __init__(self, path_to_config_file, startup_profile=False):
         self.path_to_config_file = path_to_config_file
+        self.startup_profile = startup_profile
+        self.started_at = time.time()
+        self.module_registry = ModuleRegistry(pathname, module_dirs)
+        self.configure_times = {}
         self.alive = False
         self.child_processes = []
         self.main_process_pid = os.getpid()
+        self.worker_index = 0
         self.modules = OrderedDict()
+        self.fused_hops = 0
         self.internal_datastore = MultiProcessDataStore()
+        # Start time and duration of the current profiling run. Shared with the workers, see startProfiling.
+        self.profiler_request = multiprocessing.Array('d', [0, 0], lock=False)
         self.global_configuration = {'workers': multiprocessing.cpu_count() - 1,
                                      'queue_size': 20,
                                      'queue_buffer_size': 50,
+                                     'mp_queue_type': 'multiprocessing',
+                                     'mp_queue_codec': 'msgpack',
+                                     'fuse_modules': True,
+                                     'module_statistics': False,
+                                     'module_statistics_sample_rate': 16,
+                                     'profiler_directory': os.path.join(tempfile.gettempdir(), 'lumbermill_profiles'),
+                                     'profiler_duration': 30,
+                                     'profiler_interval': 0.005,
                                      'logging': {'level': 'info',
                                                  'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
                                                  'filename': None,
@@ -85,7 +108,8 @@ class LumberMill():
         """Returns a queue with queue_max_size"""
         queue = None
         if queue_type == 'simple':
-            queue =  BufferedQueue(queue=Queue.Queue(queue_max_size), buffersize=queue_buffer_size)
+            # Producer and consumer live in the same process, so events can be passed by reference.
+            queue = BufferedQueue(queue=Queue.Queue(queue_max_size), buffersize=queue_buffer_size, serialize=False)
         if queue_type == 'multiprocess':
             # At the moment I ran into a problem with zmq.
             # This problem causes the performance to be comparable with the normal python multiprocessing.Queue.
@@ -93,11 +117,15 @@ class LumberMill():
             # Update 28.04.2015: With pypy-2.5 and normal python, the load balancing problem seems to be gone. ZMQ is
             # still a bit faster (ca. ~15%).
             # TODO: Analyze this problem more thoroughly.
-            if False and ZMQ_AVAILABLE and MSGPACK_AVAILABLE:
-                  queue = ZeroMqMpQueue(queue_max_size)
+            mp_queue_type = self.global_configuration['mp_queue_type']
+            if mp_queue_type == 'zmq' and ZMQ_AVAILABLE and MSGPACK_AVAILABLE:
+                queue = ZeroMqMpQueue(queue_max_size)
+            elif mp_queue_type == 'ring_buffer':
+                # One ring per worker. The main process is worker 0.
+                queue = SharedMemoryRingQueue(queue_max_size, rings=self.getWorkerCount(), get_worker_index=self.getWorkerIndex)
             else:
                 queue = multiprocessing.Queue(queue_max_size)
-            queue = BufferedQueue(queue=queue, buffersize=queue_buffer_size)
+            queue = BufferedQueue(queue=queue, buffersize=queue_buffer_size, codec=self.global_configuration['mp_queue_codec'])
         if not queue:
             self.logger.error("Could not produce requested queue %s." % (queue_type))
             self.shutDown()
@@ -172,12 +200,11 @@ class LumberMill():
         self.logger.debug("Initializing module %s." % (module_name))
         instance = None
         try:
-            module = __import__(module_name, globals(), locals(), module_name, -1)
+            module_class = self.module_registry.getModuleClass(module_name)
         except ImportError:
             etype, evalue, etb = sys.exc_info()
             self.logger.error("Unknown module %s. Exception: %s, Error: %s." % (module_name, etype, evalue))
             self.shutDown()
-        module_class = getattr(module, module_name)
         instance = module_class(self)
         """
         try:
@@ -266,7 +293,19 @@ class LumberMill():
         """Call configuration method of module."""
         for module_name, module_info in sorted(self.modules.items(), key=lambda x: x[1]['idx']):
             for module_instance in module_info['instances']:
+                started_at = time.time()
                 module_instance.configure(module_info['configuration'])
+                self.configure_times[module_name] = self.configure_times.get(module_name, 0) + time.time() - started_at
+
+    def printStartupProfile(self):
+        """Print the import and configure time of each module."""
+        print("%-30s %14s %14s" % ("Module", "import (ms)", "configure (ms)"))
+        for module_name, module_info in sorted(self.modules.items(), key=lambda x: x[1]['idx']):
+            # Libraries shared by multiple modules are accounted to the first module importing them.
+            import_time = self.module_registry.import_times.get(module_info['instances'][0].__class__.__name__, 0)
+            print("%-30s %14.1f %14.1f" % (module_name, import_time * 1000, self.configure_times.get(module_name, 0) * 1000))
+        print("%-30s %14.1f %14.1f" % ("All modules", sum(self.module_registry.import_times.values()) * 1000, sum(self.configure_times.values()) * 1000))
+        print("Startup took %.1f ms." % ((time.time() - self.started_at) * 1000))
 
     def initEventStream(self):
         """
@@ -294,6 +333,14 @@ class LumberMill():
                 # If we run multiprocessed and the module is not capable of running parallel, this module will only be
                 # started in the main process. Connect the module via a queue to all receivers that can run forked.
                 for receiver_instance in self.modules[receiver_name]['instances']:
+                    # Modules keeping per key state can ask for their events to be partitioned. Each worker polls its
+                    # own queue and all senders route events by the hash of the partition key.
+                    if self.isPartitionedModule(receiver_instance):
+                        if receiver_name not in queues:
+                            partition_queues = [self.produceQueue('multiprocess', self.global_configuration['queue_size'], self.global_configuration['queue_buffer_size']) for _ in range(0, self.getWorkerCount())]
+                            queues[receiver_name] = PartitionedQueue(partition_queues, receiver_instance.getPartitionKey, self.getWorkerIndex)
+                            receiver_instance.setInputQueue(queues[receiver_name])
+                        continue
                     if (self.global_configuration['workers'] > 1 and sender_instance.can_run_forked != receiver_instance.can_run_forked):
                         try:
                             queue = queues[receiver_name]
@@ -310,6 +357,30 @@ class LumberMill():
                         self.logger.debug("%s will send its output directly to %s." % (module_name, receiver_name))
                         instance.addReceiver(receiver_name, receiver_instance)
 
+    def enableModuleStatistics(self):
+        """
+        Enable throughput and processing time statistics for all module instances if configured.
+        Each worker process will update its own copy of the statistics.
+        """
+        if not self.global_configuration['module_statistics']:
+            return
+        for module_name, module_info in self.modules.items():
+            for instance in module_info['instances']:
+                if hasattr(instance, 'enableStatistics'):
+                    instance.enableStatistics(ModuleStatistics(self.global_configuration['module_statistics_sample_rate']))
+
+    def isPartitionedModule(self, module_instance):
+        return self.getWorkerCount() > 1 and module_instance.can_run_forked and module_instance.isPartitioned()
+
+    def fuseModules(self):
+        """
+        Fuse chains of directly connected modules into a single call path.
+        See utils.ModuleFusion for details.
+        """
+        if not self.global_configuration['fuse_modules']:
+            return
+        self.fused_hops = ModuleFusion(self).fuseModules(self.modules)
+
     def getModuleInfoById(self, module_id, silent=True):
         """
         Get a module by its id.
@@ -371,6 +442,117 @@ class LumberMill():
             module_queues[module_name] = instance.getInputQueue()
         return module_queues
 
+    def getAllBuffers(self):
+        """ Get the buffers of all module instances in this process, e.g. to check their flush size. """
+        module_buffers = {}
+        for module_name, module_info in self.modules.items():
+            for idx, instance in enumerate(module_info['instances']):
+                buffer = getattr(instance, 'buffer', None)
+                if not hasattr(buffer, 'getStats'):
+                    continue
+                buffer_name = module_name if idx == 0 else "%s.%s" % (module_name, idx)
+                module_buffers[buffer_name] = buffer
+        return module_buffers
+
+    def getAllModuleStatistics(self):
+        """ Get the statistics of all module instances in this process, @see: BaseModule.enableStatistics. """
+        module_statistics = {}
+        for module_name, module_info in self.modules.items():
+            for idx, instance in enumerate(module_info['instances']):
+                if getattr(instance, 'module_statistics', None) is None:
+                    continue
+                instance_name = module_name if idx == 0 else "%s.%s" % (module_name, idx)
+                module_statistics[instance_name] = instance.module_statistics
+        return module_statistics
+
+    def getAllFilters(self):
+        """ Get the compiled filters of all module instances in this process, e.g. to check their match rate. """
+        module_filters = {}
+        for module_name, module_info in self.modules.items():
+            for idx, instance in enumerate(module_info['instances']):
+                instance_name = module_name if idx == 0 else "%s.%s" % (module_name, idx)
+                if getattr(instance, 'input_filter', None):
+                    module_filters[instance_name] = instance.input_filter
+                for receiver_name, output_filter in getattr(instance, 'output_filters', {}).items():
+                    module_filters["%s->%s" % (instance_name, receiver_name)] = output_filter
+        return module_filters
+
+    def getModuleFiles(self):
+        """ Map the source files, without extension, of all module classes in this process to the class names. """
+        module_files = {}
+        for module_name, module_info in self.modules.items():
+            for instance in module_info['instances']:
+                module_file = getattr(sys.modules.get(instance.__class__.__module__), '__file__', None)
+                if module_file:
+                    module_files[os.path.splitext(os.path.abspath(module_file))[0]] = instance.__class__.__name__
+        return module_files
+
+    def startProfiling(self, duration=None):
+        """
+        Profile all processes for duration seconds.
+
+        The master sends SIGUSR1 to all workers. Each process, the master included, samples its threads and writes
+        its profile to <profiler_directory>/<start time>/worker_<index>.json. The master then merges these to a
+        summary.txt, with the samples attributed to the modules.
+        Returns the directory of the run or None if a run is already in progress. A worker can only ask the master
+        to start a run with the configured duration, as a signal can not carry any data. It returns True then, since
+        the directory is only known once the master has started the run.
+        """
+        started_at, running_duration = self.profiler_request
+        if started_at + running_duration > time.time():
+            self.logger.warning("Profiling is already in progress.")
+            return None
+        if not self.is_master():
+            os.kill(self.getMainProcessId(), signal.SIGUSR1)
+            return True
+        duration = float(duration or self.global_configuration['profiler_duration'])
+        # Workers read the request from shared memory, as a signal can not carry any data.
+        self.profiler_request[0], self.profiler_request[1] = time.time(), duration
+        for worker in self.child_processes:
+            os.kill(worker.pid, signal.SIGUSR1)
+        run_directory = self.getProfilerRunDirectory()
+        self.logger.info("Profiling %s processes for %ss. Profiles will be written to %s." % (len(self.child_processes) + 1, duration, run_directory))
+        profiler_thread = threading.Thread(target=self.runProfiler)
+        profiler_thread.daemon = True
+        profiler_thread.start()
+        return run_directory
+
+    def profile(self, signum=False, frame=False):
+        """ Handler for SIGUSR1. """
+        if self.is_master():
+            self.startProfiling()
+            return
+        profiler_thread = threading.Thread(target=self.runProfiler)
+        profiler_thread.daemon = True
+        profiler_thread.start()
+
+    def getProfilerRunDirectory(self):
+        started_at = self.profiler_request[0]
+        return os.path.join(self.global_configuration['profiler_directory'], time.strftime('%Y%m%d-%H%M%S', time.localtime(started_at)))
+
+    def runProfiler(self):
+        run_directory = self.getProfilerRunDirectory()
+        duration = self.profiler_request[1]
+        profiler = SamplingProfiler(self.getModuleFiles(), self.global_configuration['profiler_interval'])
+        profiler.sample(duration)
+        profile = profiler.getProfile()
+        profile.update({'worker': self.getWorkerIndex(), 'pid': os.getpid(), 'duration': duration})
+        try:
+            makeDirectory(run_directory)
+            writeProfile(profile, os.path.join(run_directory, 'worker_%d.json' % self.getWorkerIndex()))
+            if not self.is_master():
+                return
+            profile_paths = [os.path.join(run_directory, 'worker_%d.json' % worker_index) for worker_index in range(0, len(self.child_processes) + 1)]
+            profile_paths = waitForProfiles(profile_paths, timeout=10)
+            with open(os.path.join(run_directory, 'summary.txt'), 'w') as summary_file:
+                summary_file.write("LumberMill profile of %d processes over %ss.\n" % (len(profile_paths), duration))
+                summary_file.write(formatProfile(mergeProfiles(readProfiles(profile_paths))))
+        except (IOError, OSError):
+            etype, evalue, etb = sys.exc_info()
+            self.logger.error("Could not write profile to %s. Exception: %s, Error: %s." % (run_directory, etype, evalue))
+            return
+        self.logger.info("Profile written to %s." % run_directory)
+
     def getInternalDataStore(self):
         return self.internal_datastore;
 
@@ -379,9 +561,11 @@ class LumberMill():
         # This way of sharing data between modules and filters does not seem to be as flexible as one could wish for.
         # A better idea might be to give access to module data via a dynamic value like:
         # module.<module_name>.get.<key> instead of e.g. internal.<key>
-        # This datastore is based on multiprocessing.Manager(), using multiprocessing.Lock() for mp synchronization.
-        # So frequent usage of this store might impact performance.
+        # Reads from this datastore are local, but each write of a new value pickles all values, see
+        # MultiProcessDataStore. So it is meant for few and small values.
         self.internal_datastore.setValue(key, value)
+        # Filters cache internal values. Make the new value visible to the filters of this process right away.
+        setInternalValue(key, value)
 
     def getFromInternalDataStore(self, key, default=None):
         try:
@@ -389,6 +573,10 @@ class LumberMill():
         except KeyError:
             return default
 
+    def getWorkerIndex(self):
+        """Return the index of the current worker process. The main process has index 0."""
+        return self.worker_index
+
     def getMainProcessId(self):
         return self.main_process_pid
 
@@ -403,6 +591,8 @@ class LumberMill():
         self.setDefaultReceivers()
         self.configureModules()
         self.initEventStream()
+        if self.startup_profile:
+            self.printStartupProfile()
         self.logger.info("Done...")
         return
 
@@ -413,13 +603,21 @@ class LumberMill():
         self.setDefaultReceivers()
         self.configureModules()
         self.initEventStream()
+        # Statistics need to be enabled before fusion, see ModuleFusion.fuseReceiver.
+        self.enableModuleStatistics()
+        self.fuseModules()
+        if self.startup_profile:
+            self.printStartupProfile()
         self.runWorkers()
 
     def runWorkers(self):
         for i in range(1, self.global_configuration['workers']):
+            # The worker index is passed on to the forked process.
+            self.worker_index = i
             worker = multiprocessing.Process(target=self.run)
             worker.start()
             self.child_processes.append(worker)
+        self.worker_index = 0
         self.run()
 
     def run(self):
@@ -431,12 +629,19 @@ class LumberMill():
         if self.is_master():
             # Register SIGALARM only for master process. This will take care to kill all subprocesses.
             signal.signal(signal.SIGALRM, self.restart)
+        # SIGUSR1 starts a profiling run, see startProfiling.
+        signal.signal(signal.SIGUSR1, self.profile)
         self.alive = True
         self.initModulesAfterFork()
         self.runModules()
         if self.is_master():
-            self.logger.info("LumberMill started with %s processes(%s)." % (len(self.child_processes) + 1, os.getpid()))
+            self.logger.info("LumberMill started with %s processes(%s). Fused module hops: %s." % (len(self.child_processes) + 1, os.getpid(), self.fused_hops))
             tornado.ioloop.IOLoop.instance().start()
+        else:
+            # The modules of a worker run as daemon threads. Keep the worker alive until it is shut down, otherwise
+            # it would exit as soon as run returns.
+            while self.alive:
+                time.sleep(.5)
 
     def restart(self, signum=False, frame=False):
         for worker in list(self.child_processes):
@@ -492,13 +697,18 @@ class LumberMill():
                     instance.shutDown()
 
 def usage():
-    print('Usage: ' + sys.argv[0] + ' -c <path/to/config.conf> --configtest')
+    print('Usage: ' + sys.argv[0] + ' -c <path/to/config.conf> --configtest --startup-profile')
+    print('       ' + sys.argv[0] + ' bench -c <path/to/config.conf>, see bench --help')
 
 def main():
+    if sys.argv[1:2] == ['bench']:
+        from lumbermill.Benchmark import main as benchmark
+        sys.exit(benchmark(sys.argv[2:]))
     path_to_config_file = ""
     run_configtest = False
+    startup_profile = False
     try:
-        opts, args = getopt.getopt(sys.argv[1:], "hc:", ["help", "configtest", "conf="])
+        opts, args = getopt.getopt(sys.argv[1:], "hc:", ["help", "configtest", "startup-profile", "conf="])
     except getopt.GetoptError:
         usage()
         sys.exit(2)
@@ -510,7 +720,9 @@ def main():
             path_to_config_file = arg
         elif opt in ("--configtest"):
             run_configtest = True
-    gp = LumberMill(path_to_config_file)
+        elif opt == "--startup-profile":
+            startup_profile = True
+    gp = LumberMill(path_to_config_file, startup_profile)
     if run_configtest:
         gp.configTest()
     else:
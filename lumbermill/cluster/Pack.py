@@ -222,7 +222,7 @@ class Pack(BaseThreadedModule):
                 self.logger.debug('Calling callback %s for %s.' % (callback, message['action']))
                 callback(host, message)
 
-    @setInterval(10, call_on_init=True)
+    @setInterval(10, call_on_init=True, blocking=True)
     def sendDiscoverBroadcast(self):
         """
         Leader sends udp broadcast messages every 10 seconds.
@@ -231,7 +231,7 @@ class Pack(BaseThreadedModule):
         self.logger.debug('Sending broadcast pack follower discovery.')
         self.sendBroadcastMessage(message)
 
-    @setInterval(10)
+    @setInterval(10, blocking=True)
     def sendAliveRequests(self):
         """
         Leader sends alive requests to all dicovered followers every 10 seconds.
@@ -240,7 +240,7 @@ class Pack(BaseThreadedModule):
             message = self.getDefaultMessageDict(action='alive_request')
             self.sendMessageToPackFollower(pack_follower, message)
 
-    @setInterval(10)
+    @setInterval(10, blocking=True)
     def dropDeadPackFollowers(self):
         """
         Drop followers who have not been seen the last 30 seconds.
@@ -253,7 +253,7 @@ class Pack(BaseThreadedModule):
                 self.logger.warning('Dropping dead pack follower %s, %s.' % (pack_follower.getHostName(), ip_address))
                 self.pack_followers.pop(ip_address)
 
-    @setInterval(1)
+    @setInterval(1, blocking=True)
     def dropDeadPackLeader(self):
         """
         Drop leader who has not been seen the last 30 seconds.
@@ -66,7 +66,7 @@ class PackConfiguration(BaseModule.BaseModule):
         self.pack.sendMessageToPack(message)
 
     def getMasterConfigurationUpdateFunc(self):
-        @setInterval(self.getConfigurationValue('interval'))
+        @setInterval(self.getConfigurationValue('interval'), blocking=True)
         def checkForUpdatedMasterConfiguration():
             filtered_running_configuration = self.filterIgnoredModules(self.lumbermill.getConfiguration())
             if self.filtered_startup_config != filtered_running_configuration:
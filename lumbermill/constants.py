@@ -64,4 +64,8 @@ LOGLEVEL_STRING_TO_LOGLEVEL_INT = {'debug': logging.DEBUG,
 
 MY_HOSTNAME = socket.gethostname()
 MY_SYSTEM_NAME = sys.platform
-LUMBERMILL_BASEPATH = os.path.dirname(os.path.realpath(__file__))
\ No newline at end of file
+LUMBERMILL_BASEPATH = os.path.dirname(os.path.realpath(__file__))
+# Seconds an input waits before checking again if saturated modules can take more events.
+BACKPRESSURE_RETRY_INTERVAL = .05
+# Seconds an input reuses the result of checking its receivers for saturation.
+BACKPRESSURE_CHECK_INTERVAL = .01
@@ -10,13 +10,14 @@ import logging
 from cStringIO import StringIO
 
 from tornado import autoreload
+from tornado.ioloop import IOLoop
 from tornado.iostream import StreamClosedError
 from tornado.netutil import bind_sockets
 from tornado.tcpserver import TCPServer
 from tornado import gen
 
 import lumbermill.utils.DictUtils as DictUtils
-from lumbermill.constants import IS_PYPY
+from lumbermill.constants import IS_PYPY, BACKPRESSURE_RETRY_INTERVAL
 from lumbermill.BaseModule import BaseModule
 from lumbermill.utils.Decorators import ModuleDocstringParser
 
@@ -117,14 +118,26 @@ class BeatsConnectionHandler(object):
         self.tcp_stream.close()
 
     def sendBatch(self):
-        for message in self.batch.getMessage():
-            self.gp_module.sendEvent(DictUtils.getDefaultEventDict(message, caller_class_name="BeatsServer", received_from="%s:%d" % (self.host, self.port)))
-        self.sendAck()
+        received_from = "%s:%d" % (self.host, self.port)
+        self.gp_module.sendEvents([DictUtils.getDefaultEventDict(message, caller_class_name="BeatsServer", received_from=received_from) for message in self.batch.getMessage()])
+        self.sendAck(self.batch.getProtocol(), self.sequence_number)
         self.initBatch()
 
-    def sendAck(self):
-        self.logger.debug("Sending ack for seq: %s. %sA%s" % (self.sequence_number, self.batch.getProtocol(), struct.pack(">I", self.sequence_number)))
-        self.tcp_stream.write("%sA%s" % (self.batch.getProtocol(), struct.pack(">I", self.sequence_number)))
+    def sendAck(self, protocol, sequence_number):
+        """
+        Beats will not send new events before the last ones were acknowledged. So while the modules receiving our
+        events are saturated, the ack is delayed.
+        """
+        if self.tcp_stream.closed():
+            return
+        if self.gp_module.isSaturatedCached():
+            IOLoop.current().call_later(BACKPRESSURE_RETRY_INTERVAL, self.sendAck, protocol, sequence_number)
+            return
+        self.logger.debug("Sending ack for seq: %s. %sA%s" % (sequence_number, protocol, struct.pack(">I", sequence_number)))
+        try:
+            self.tcp_stream.write("%sA%s" % (protocol, struct.pack(">I", sequence_number)))
+        except StreamClosedError:
+            pass
 
     def transition(self, next, required_bytes):
         self.logger.debug("Transition, from: %s to: %s required bytes: %d." % (self.getCurrentState(), self.states[next], required_bytes))
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import time
+
+import lumbermill.utils.DictUtils as DictUtils
+from lumbermill.BaseThreadedModule import BaseThreadedModule
+from lumbermill.utils.Decorators import ModuleDocstringParser
+
+
+@ModuleDocstringParser
+class BenchmarkInput(BaseThreadedModule):
+    """
+    Emits events at a fixed rate or as fast as possible. Used by lumbermill bench.
+
+    Works like Spam, but the time each event was created at is stored in lumbermill.sent_at. BenchmarkSink uses it to
+    measure the end to end latency.
+
+    event: Event data as in Spam. A string is put into the data field, a dict populates the event.
+           For multiple events, provide a list of strings or dicts.
+    file: Replay the lines of this file as data field, instead of using event.
+    rate: Events per second of all workers together. 0 means as fast as possible.
+
+    Configuration template:
+
+    - BenchmarkInput:
+       event:                           # <default: {'data': 'benchmark'}; type: string||list||dict; is: optional>
+       file:                            # <default: None; type: None||string; is: optional>
+       rate:                            # <default: 0; type: int||float; is: optional>
+       receivers:
+        - NextModule
+    """
+
+    module_type = "input"
+    """Set module type"""
+    can_run_forked = True
+
+    def configure(self, configuration):
+        # Call parent configure method
+        BaseThreadedModule.configure(self, configuration)
+        if self.getConfigurationValue("file"):
+            with open(self.getConfigurationValue("file")) as replay_file:
+                self.events = [line.rstrip("\r\n") for line in replay_file]
+        else:
+            self.events = self.getConfigurationValue("event")
+            if not isinstance(self.events, list):
+                self.events = [self.events]
+        if not self.events:
+            self.logger.error("No events to send.")
+            self.lumbermill.shutDown()
+        self.rate = self.getConfigurationValue("rate")
+
+    def initAfterFork(self):
+        BaseThreadedModule.initAfterFork(self)
+        # Each worker sends its share of the configured rate.
+        self.rate = float(self.getConfigurationValue("rate")) / self.lumbermill.getWorkerCount()
+
+    def run(self):
+        counter = 0
+        started_at = time.time()
+        while self.alive:
+            for event_data in self.events:
+                if isinstance(event_data, dict):
+                    event = DictUtils.getDefaultEventDict(event_data, caller_class_name=self.__class__.__name__)
+                else:
+                    event = DictUtils.getDefaultEventDict({'data': event_data}, caller_class_name=self.__class__.__name__)
+                event['lumbermill']['sent_at'] = time.time()
+                self.sendEvent(event)
+                if not self.rate:
+                    continue
+                counter += 1
+                # Wait until the next event is due. The schedule is based on the start time, so delays do not add up.
+                delay = started_at + counter / self.rate - time.time()
+                if delay > 0:
+                    time.sleep(delay)
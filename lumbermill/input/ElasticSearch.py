@@ -4,7 +4,6 @@ import sys
 import time
 import types
 import requests
-from elasticsearch import Elasticsearch, connection
 from ctypes import c_char_p
 from multiprocessing import Manager, Lock
 
@@ -88,6 +87,14 @@ class ElasticSearch(BaseThreadedModule):
     def configure(self, configuration):
         # Call parent configure method.
         BaseThreadedModule.configure(self, configuration)
+        # The library is imported on configure, so modules can be listed and validated without loading it.
+        global Elasticsearch, connection
+        try:
+            from elasticsearch import Elasticsearch, connection
+        except ImportError:
+            self.logger.error("Could not import elasticsearch module. To install run: pip install elasticsearch")
+            self.lumbermill.shutDown()
+            return
         # Set log level for elasticsarch library if configured to other than default.
         if self.getConfigurationValue('log_level') != 'info':
             logging.getLogger('elasticsearch').setLevel(self.logger.level)
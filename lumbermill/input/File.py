@@ -112,12 +112,12 @@ class File(BaseThreadedModule):
         BaseThreadedModule.initAfterFork(self)
         datastore = self.lumbermill.getInternalDataStore()
         datastore.acquireLock()
-        from_file_list_idx = datastore.getDataDict()[self.datastore_key]
+        from_file_list_idx = datastore.getValue(self.datastore_key)
         to_file_list_idx = from_file_list_idx + int(len(self.files) / self.lumbermill.getWorkerCount())
         if self.lumbermill.is_master():
             to_file_list_idx += len(self.files) % self.lumbermill.getWorkerCount()
         self.files = self.files[from_file_list_idx:to_file_list_idx]
-        datastore.getDataDict()[self.datastore_key] = to_file_list_idx
+        datastore.setValue(self.datastore_key, to_file_list_idx)
         datastore.releaseLock()
 
     def handleFileChange(self, callback_data):
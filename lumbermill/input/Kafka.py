@@ -66,8 +66,14 @@ class Kafka(BaseThreadedModule):
 
     def run(self):
         while self.alive:
-            for kafka_event in self.consumer:
-                event = DictUtils.getDefaultEventDict(dict={"topic": kafka_event.topic, "data": kafka_event.value}, caller_class_name=self.__class__.__name__)
-                self.sendEvent(event)
-                if(self.auto_commit_enable):
+            # Each call to fetch_messages does one fetch round for all partitions. Send the fetched messages as one batch.
+            kafka_events = list(self.consumer.fetch_messages())
+            if not kafka_events:
+                continue
+            events = []
+            for kafka_event in kafka_events:
+                events.append(DictUtils.getDefaultEventDict(dict={"topic": kafka_event.topic, "data": kafka_event.value}, caller_class_name=self.__class__.__name__))
+            self.sendEvents(events)
+            if(self.auto_commit_enable):
+                for kafka_event in kafka_events:
                     self.consumer.task_done(kafka_event)
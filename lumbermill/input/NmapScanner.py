@@ -40,7 +40,7 @@ class NmapScanner(BaseModule):
         self.arguments = self.getConfigurationValue('arguments')
 
     def getScannerFunc(self):
-        @setInterval(self.getConfigurationValue('interval'), call_on_init=True)
+        @setInterval(self.getConfigurationValue('interval'), call_on_init=True, blocking=True)
         def scanNetwork():
             # Get all alive hosts
             try:
@@ -99,12 +99,14 @@ class RedisList(BaseThreadedModule):
                 exc_type, exc_value, exc_tb = sys.exc_info()
                 self.logger.error("Could not read data from redis list(s) %s. Exception: %s, Error: %s." % (self.lists, exc_type, exc_value))
                 continue
+            batch = []
             for event in events:
                 # If batch_size is bigger than events waiting in redis queue, the remaining entries will be filled with None values.
                 # So break out if a None value is found.
                 if not event:
-                    # Queue is exhausted. Sleep a bit and retry.
-                    time.sleep(.5)
                     break
-                event = DictUtils.getDefaultEventDict(dict={"received_from": '%s' % event[0], "data": event[1]}, caller_class_name=self.__class__.__name__)
-                self.sendEvent(event)
\ No newline at end of file
+                batch.append(DictUtils.getDefaultEventDict(dict={"received_from": '%s' % event[0], "data": event[1]}, caller_class_name=self.__class__.__name__))
+            self.sendEvents(batch)
+            if len(batch) < len(events):
+                # Queue is exhausted. Sleep a bit and retry.
+                time.sleep(.5)
\ No newline at end of file
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+
+import lumbermill.utils.CaptureFile as CaptureFile
+import lumbermill.utils.DictUtils as DictUtils
+from lumbermill.BaseThreadedModule import BaseThreadedModule
+from lumbermill.utils.Decorators import ModuleDocstringParser
+
+
+@ModuleDocstringParser
+class Replay(BaseThreadedModule):
+    """
+    Replay events captured by CaptureSink, @see: CaptureSink.
+
+    Use this module to reproduce a load test or a problem with real traffic. The capture file is read via mmap.
+    When running in multiple processes, each process replays its share of the captured events.
+
+    The replayed events keep their captured fields and metadata, but get a new event id. Like BenchmarkInput, the time
+    each event was sent at is stored in lumbermill.sent_at, so BenchmarkSink can measure the end to end latency.
+
+    file_name: Path to the capture file.
+    speed: Replay at recorded speed (1), a multiple of it (e.g. 10) or as fast as possible (0).
+    sleep: Time to wait between sending events.
+    events_count: Only send configured number of events. 0 means no limit.
+    loop: Start again when all captured events were sent. If not set, LumberMill is shut down after the replay.
+
+    Configuration template:
+
+    - Replay:
+       file_name:                       # <type: string; is: required>
+       speed:                           # <default: 1; type: int||float; is: optional>
+       sleep:                           # <default: 0; type: int||float; is: optional>
+       events_count:                    # <default: 0; type: int; is: optional>
+       loop:                            # <default: False; type: boolean; is: optional>
+       receivers:
+        - NextModule
+    """
+
+    module_type = "input"
+    """Set module type"""
+    can_run_forked = True
+
+    def configure(self, configuration):
+        # Call parent configure method
+        BaseThreadedModule.configure(self, configuration)
+        self.file_name = self.getConfigurationValue("file_name")
+        if not CaptureFile.isCaptureFile(self.file_name):
+            self.logger.error("%s is not a capture file." % self.file_name)
+            self.lumbermill.shutDown()
+        self.speed = self.getConfigurationValue("speed")
+        self.sleep = self.getConfigurationValue("sleep")
+        self.loop = self.getConfigurationValue("loop")
+        self.max_events_count = self.getConfigurationValue("events_count")
+        self.worker_count = 1
+        self.worker_index = 0
+
+    def initAfterFork(self):
+        BaseThreadedModule.initAfterFork(self)
+        # Each process replays every n-th event.
+        self.worker_count = self.lumbermill.getWorkerCount()
+        self.worker_index = self.lumbermill.getWorkerIndex()
+        # Calculate event count when running in multiple processes.
+        if self.max_events_count == 0:
+            return
+        self.max_events_count = int(self.getConfigurationValue("events_count")/self.lumbermill.getWorkerCount())
+        if self.lumbermill.is_master():
+            remainder = self.getConfigurationValue("events_count") % self.lumbermill.getWorkerCount()
+            self.max_events_count += remainder
+        if self.max_events_count == 0:
+            self.shutDown()
+
+    def prepareEvent(self, event):
+        metadata = event.get('lumbermill')
+        if not isinstance(metadata, dict):
+            event = DictUtils.getDefaultEventDict(event, caller_class_name=self.__class__.__name__, received_from=self.file_name)
+            metadata = event['lumbermill']
+        metadata['pid'] = os.getpid()
+        metadata['source_module'] = self.__class__.__name__
+        metadata['sent_at'] = time.time()
+        return event
+
+    def replay(self, counter):
+        """ Replay the capture file once. Returns the number of events sent, counting on from counter. """
+        try:
+            reader = CaptureFile.CaptureFileReader(self.file_name)
+        except:
+            etype, evalue, etb = sys.exc_info()
+            self.logger.error("Could not read %s. Exception: %s, Error: %s." % (self.file_name, etype, evalue))
+            self.alive = False
+            return counter
+        started_at = time.time()
+        try:
+            for captured_at, event in reader.iterRecords(self.worker_count, self.worker_index):
+                if self.speed > 0:
+                    # The schedule is based on the start time, so delays do not add up.
+                    delay = started_at + (captured_at - reader.first_captured_at) / self.speed - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.sendEvent(self.prepareEvent(event))
+                if self.sleep > 0:
+                    time.sleep(self.sleep)
+                counter += 1
+                if not self.alive or counter == self.max_events_count:
+                    break
+        finally:
+            reader.close()
+        return counter
+
+    def run(self):
+        counter = 0
+        while self.alive:
+            events_sent = counter
+            counter = self.replay(counter)
+            if counter == self.max_events_count or not self.loop or events_sent == counter:
+                break
+        if not self.alive:
+            return
+        time.sleep(2)
+        self.alive = False
+        self.lumbermill.shutDown()
@@ -3,8 +3,6 @@ import logging
 import sys
 import time
 
-import boto3
-
 import lumbermill.utils.DictUtils as DictUtils
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Decorators import ModuleDocstringParser
@@ -46,6 +44,14 @@ class SQS(BaseThreadedModule):
     def configure(self, configuration):
         # Call parent configure method
         BaseThreadedModule.configure(self, configuration)
+        # The library is imported on configure, so modules can be listed and validated without loading it.
+        global boto3
+        try:
+            import boto3
+        except ImportError:
+            self.logger.error("Could not import boto3 module. To install run: pip install boto3")
+            self.lumbermill.shutDown()
+            return
         # Set boto log level.
         logging.getLogger('boto3').setLevel(logging.CRITICAL)
         logging.getLogger('botocore').setLevel(logging.CRITICAL)
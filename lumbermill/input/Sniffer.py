@@ -5,9 +5,6 @@ import socket
 import struct
 import sys
 
-import pcapy
-from impacket.ImpactDecoder import EthDecoder
-
 import lumbermill.utils.DictUtils as DictUtils
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Decorators import ModuleDocstringParser
@@ -54,6 +51,15 @@ class Sniffer(BaseThreadedModule):
 
     def configure(self, configuration):
         BaseThreadedModule.configure(self, configuration)
+        # The library is imported on configure, so modules can be listed and validated without loading it.
+        global pcapy, EthDecoder
+        try:
+            import pcapy
+            from impacket.ImpactDecoder import EthDecoder
+        except ImportError:
+            self.logger.error("Could not import pcapy or impacket module. To install run: pip install pcapy impacket")
+            self.lumbermill.shutDown()
+            return
         self.interface = self.getConfigurationValue('interface')
         self.protocols = self.getConfigurationValue('protocols')
         self.promiscous_mode = 1 if self.getConfigurationValue('promiscous') else 0
@@ -7,12 +7,14 @@ import logging
 import exceptions
 
 from tornado import autoreload
+from tornado.ioloop import IOLoop
 from tornado.iostream import StreamClosedError
 from tornado.netutil import bind_sockets
 from tornado.tcpserver import TCPServer
 
 import lumbermill.utils.DictUtils as DictUtils
 from lumbermill.BaseModule import BaseModule
+from lumbermill.constants import BACKPRESSURE_RETRY_INTERVAL
 from lumbermill.utils.Decorators import ModuleDocstringParser
 
 
@@ -40,6 +42,7 @@ class ConnectionHandler(object):
         self.chunksize = self.gp_module.getConfigurationValue('chunksize')
         self.mode = self.gp_module.getConfigurationValue('mode')
         self.is_open = True
+        self.line_buffer = ""
         self.stream = stream
         self.address = address
         self.host, self.port = self.address[0], self.address[1]
@@ -49,7 +52,7 @@ class ConnectionHandler(object):
                 if self.mode == 'line' and self.regex_separator:
                     self.stream.read_until_regex(self.regex_separator, self._on_read_line)
                 elif self.mode == 'line':
-                    self.stream.read_until(self.simple_separator, self._on_read_line)
+                    self.stream.read_bytes(self.chunksize, self._on_read_lines, partial=True)
                 else:
                     self.stream.read_bytes(self.chunksize, self._on_read_chunk)
         except:
@@ -61,31 +64,50 @@ class ConnectionHandler(object):
         if data == "":
             return
         self.sendEvent(data)
-        try:
-            if not self.stream.reading():
-                if self.regex_separator:
-                    self.stream.read_until_regex(self.regex_separator, self._on_read_line)
-                else:
-                    self.stream.read_until(self.simple_separator, self._on_read_line)
-        except StreamClosedError:
-            pass
-        except:
-            etype, evalue, etb = sys.exc_info()
-            self.logger.error("Could not read from socket %s. Exception: %s, Error: %s." % (self.address, etype, evalue))
+        if self.regex_separator:
+            self.readNext(self.stream.read_until_regex, self.regex_separator, self._on_read_line)
+        else:
+            self.readNext(self.stream.read_until, self.simple_separator, self._on_read_line)
+
+    def _on_read_lines(self, data):
+        """
+        Split all complete lines from the received data and send them as one batch.
+        Incomplete data will be kept till the next read.
+        """
+        lines = (self.line_buffer + data).split(self.simple_separator)
+        self.line_buffer = lines.pop()
+        if len(self.line_buffer) > self.gp_module.max_buffer_size:
+            self.logger.error("Line from %s exceeds max_buffer_size. Closing connection." % (self.address,))
+            self.stream.close()
+            return
+        self.sendEvents([line + self.simple_separator for line in lines])
+        self.readNext(self.stream.read_bytes, self.chunksize, self._on_read_lines, partial=True)
 
     def _on_read_chunk(self, data):
         data = data.strip()
         if data == "":
             return
         self.sendEvent(data)
+        self.readNext(self.stream.read_bytes, self.chunksize, self._on_read_chunk)
+
+    def readNext(self, read_method, *args, **kwargs):
+        """
+        Start the next read from the stream.
+
+        While the modules receiving our events are saturated, the read is postponed. The socket buffers will fill up
+        and tcp flow control slows down the clients, instead of blocking the ioloop in a full buffer.
+        """
+        if self.gp_module.isSaturatedCached():
+            IOLoop.current().call_later(BACKPRESSURE_RETRY_INTERVAL, self.readNext, read_method, *args, **kwargs)
+            return
         try:
             if not self.stream.reading():
-                self.stream.read_bytes(self.chunksize, self._on_read_chunk)
+                read_method(*args, **kwargs)
         except StreamClosedError:
             pass
         except:
             etype, evalue, etb = sys.exc_info()
-            self.logger.error("Failed to read from socket %s. Exception: %s, Error: %s." % (self.address, etype, evalue))
+            self.logger.error("Could not read from socket %s. Exception: %s, Error: %s." % (self.address, etype, evalue))
 
     def _on_close(self):
         # Send remaining buffer if neccessary.
@@ -99,6 +121,8 @@ class ConnectionHandler(object):
                 except AttributeError:
                     #print(self.stream._read_buffer)
                     sys.exit()
+        if self.mode == 'line':
+            data = self.line_buffer.strip()
         if data != "":
             self.sendEvent(data)
         self.stream.close()
@@ -106,6 +130,16 @@ class ConnectionHandler(object):
     def sendEvent(self, data):
         self.gp_module.sendEvent(DictUtils.getDefaultEventDict({"data": data}, caller_class_name="TcpServer", received_from="%s:%d" % (self.host, self.port)))
 
+    def sendEvents(self, lines):
+        received_from = "%s:%d" % (self.host, self.port)
+        events = []
+        for line in lines:
+            line = line.strip()
+            if line == "":
+                continue
+            events.append(DictUtils.getDefaultEventDict({"data": line}, caller_class_name="TcpServer", received_from=received_from))
+        self.gp_module.sendEvents(events)
+
 @ModuleDocstringParser
 class TcpServer(BaseModule):
     r"""
@@ -123,7 +157,8 @@ class TcpServer(BaseModule):
     mode:       Receive mode, line or stream.
     simple_separator:  If mode is line, set separator between lines.
     regex_separator:   If mode is line, set separator between lines. Here regex can be used. The result includes the data that matches the regex.
-    chunksize:  If mode is stream, set chunksize in bytes to read from stream.
+    chunksize:  If mode is stream, set chunksize in bytes to read from stream. In line mode with a simple_separator, this
+                is the maximum number of bytes read at once. All complete lines in a read will be sent as one batch.
     max_buffer_size: Max kilobytes to in receiving buffer.
 
     Configuration template:
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 import cPickle
 import sys
-import redis
 
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Buffers import Buffer
@@ -102,6 +101,12 @@ class Cache(BaseThreadedModule):
         return client
 
     def _getSimpleRedisClient(self):
+        try:
+            import redis
+        except ImportError:
+            self.logger.error("Could not import redis module. To install run: pip install redis")
+            self.lumbermill.shutDown()
+            return
         try:
             client = redis.StrictRedis(host=self.getConfigurationValue('server'),
                                        port=self.getConfigurationValue('port'),
@@ -196,6 +201,7 @@ class Cache(BaseThreadedModule):
     def _setBufferedCallback(self, values):
         for value in values:
             self._set(value['key'], value['value'], value['ttl'], value['pickle'])
+        return True
 
     def _setRedisBufferedCallback(self, values):
         pipe = self.backend_client.pipeline()
@@ -217,6 +223,7 @@ class Cache(BaseThreadedModule):
         except:
             etype, evalue, etb = sys.exc_info()
             self.logger.error("Could not flush buffer. Exception: %s, Error: %s." % (etype, evalue))
+            return False
 
     def get(self, key, unpickle=True):
         value = self.kv_store.get(key)
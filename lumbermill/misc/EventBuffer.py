@@ -108,7 +108,7 @@ class EventBuffer(BaseThreadedModule):
         DictUtils.KeyDotNotationDict.copy = returnSimpleKeyDotDictOnCopy
 
     def getTimedGarbageCollectFunc(self):
-        @setInterval(self.flush_interval, call_on_init=True)
+        @setInterval(self.flush_interval, call_on_init=True, blocking=True)
         def timedGarbageCollect():
             if not self.requeue_events_done:
                 self.requeueEvents()
@@ -20,6 +20,7 @@ class Noop(BaseThreadedModule):
 
     module_type = "misc"
     """Set module type"""
+    modifies_events = False
 
     def handleEvent(self, event):
         """
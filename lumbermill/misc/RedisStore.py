@@ -175,6 +175,7 @@ class RedisStore(BaseThreadedModule):
         except:
             etype, evalue, etb = sys.exc_info()
             self.logger.error("Could not flush buffer. Exception: %s, Error: %s." % (etype, evalue))
+            return False
 
 
     def get(self, key, unpickle=True):
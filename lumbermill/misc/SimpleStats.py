@@ -1,16 +1,13 @@
 # -*- coding: utf-8 -*-
 import os
-import sys
 import time
-import socket
-import psutil
 import datetime
 from collections import defaultdict
 
 import lumbermill.utils.DictUtils as DictUtils
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Decorators import ModuleDocstringParser, setInterval
-from lumbermill.utils.StatisticCollector import StatisticCollector, MultiProcessStatisticCollector
+from lumbermill.utils.StatisticCollector import StatisticCollector, MultiProcessStatisticCollector, ModuleStatistics, MODULE_STATISTICS_COUNTERS, PROCESSING_TIME_BUCKETS
 from lumbermill.utils.misc import AnsiColors, TimedFunctionManager
 
 
@@ -22,9 +19,16 @@ class SimpleStats(BaseThreadedModule):
     Use this module if you just need some simple statistics on how many events are passing through lumbermill.
     Per default, statistics will just be send to stdout.
 
-    As a side note: This module inits MultiProcessStatisticCollector. As it uses multiprocessing.Manager().dict()
-    this will start another process. So if you use SimpleStats, you will see workers + 1 processes in the process
-    list.
+    The statistics of all workers are collected in shared memory, @see: MultiProcessStatisticCollector.
+
+    buffer_statistics logs the current flush size of all buffered modules, e.g. to see what an adaptive batch size
+    converged to.
+
+    filter_statistics logs how often the filters of all modules were evaluated, their match rate and the average time
+    an evaluation took.
+
+    module_statistics logs events in and out, dropped events, input filter results and processing times per module
+    and worker. Needs module_statistics: True in the Global section, which enables the statistics for all modules.
 
     For possible values for process_statistics see: https://code.google.com/archive/p/psutil/wikis/Documentation.wiki#CPU
 
@@ -35,12 +39,16 @@ class SimpleStats(BaseThreadedModule):
        event_type_statistics:           # <default: True; type: boolean; is: optional>
        receive_rate_statistics:         # <default: True; type: boolean; is: optional>
        waiting_event_statistics:        # <default: False; type: boolean; is: optional>
+       buffer_statistics:               # <default: True; type: boolean; is: optional>
+       filter_statistics:               # <default: True; type: boolean; is: optional>
+       module_statistics:               # <default: True; type: boolean; is: optional>
        process_statistics:              # <default: ['cpu_percent','memory_percent']; type: boolean||list; is: optional>
        emit_as_event:                   # <default: False; type: boolean; is: optional>
     """
 
     module_type = "misc"
     """Set module type"""
+    modifies_events = False
 
     def configure(self, configuration):
         # Call parent configure method
@@ -50,10 +58,15 @@ class SimpleStats(BaseThreadedModule):
         self.event_type_statistics = self.getConfigurationValue('event_type_statistics')
         self.process_statistics = self.getConfigurationValue('process_statistics')
         self.stats_collector = StatisticCollector()
-        self.mp_stats_collector = MultiProcessStatisticCollector()
+        # Needs to be created before the workers are forked.
+        self.mp_stats_collector = MultiProcessStatisticCollector(self.lumbermill.getWorkerCount(), self.lumbermill.getWorkerIndex)
+        for counter_name in ['events_received', 'last_events_received']:
+            self.mp_stats_collector.registerCounter(counter_name)
         self.module_queues = {}
         self.psutil_processes = []
         self.last_values = {'events_received': 0}
+        self.previous_module_stats = {}
+        self.last_module_statistics = {}
         self.methods = dir(self)
 
     def getRunTimedFunctionsFunc(self):
@@ -61,6 +74,9 @@ class SimpleStats(BaseThreadedModule):
         def evaluateStats():
             self.accumulateReceiveRateStats()
             self.accumulateEventTypeStats()
+            self.accumulateBufferStats()
+            self.accumulateFilterStats()
+            self.accumulateModuleStats()
             if self.lumbermill.is_master():
                 self.printIntervalStatistics()
         return evaluateStats
@@ -78,6 +94,42 @@ class SimpleStats(BaseThreadedModule):
         self.mp_stats_collector.incrementCounter('events_received', self.stats_collector.getCounter('events_received'))
         self.stats_collector.resetCounter('events_received')
 
+    def accumulateBufferStats(self):
+        # Each process has its own buffers. Store their flush sizes per worker.
+        # Buffers are created in initAfterFork of their modules, so look them up here and not on init.
+        for module_name, buffer in self.lumbermill.getAllBuffers().items():
+            self.mp_stats_collector.setCounter('buffer_flush_size_%s' % module_name, buffer.getStats()['flush_size'])
+
+    def accumulateFilterStats(self):
+        for filter_name, compiled_filter in self.lumbermill.getAllFilters().items():
+            stats = compiled_filter.resetStats()
+            if stats['evaluations'] == 0:
+                continue
+            for stat_name, value in stats.items():
+                self.mp_stats_collector.incrementCounter('filter_%s_%s' % (stat_name, filter_name), value)
+
+    def accumulateModuleStats(self):
+        # Module statistics are totals since start. Each worker stores them in its slot, the difference is calculated
+        # when printing.
+        for module_name, module_statistics in self.lumbermill.getAllModuleStatistics().items():
+            stats = module_statistics.getStats()
+            for counter_name in MODULE_STATISTICS_COUNTERS:
+                self.mp_stats_collector.setCounter('module_%s_%s' % (counter_name, module_name), stats[counter_name])
+            for bucket_idx, count in enumerate(stats['histogram']):
+                self.mp_stats_collector.setCounter('module_histogram_%d_%s' % (bucket_idx, module_name), count)
+
+    def getModuleStatsPerWorker(self, module_name):
+        stats_per_worker = [{} for _ in range(0, self.lumbermill.getWorkerCount())]
+        for counter_name in MODULE_STATISTICS_COUNTERS:
+            for worker_index, value in enumerate(self.mp_stats_collector.getCounterPerWorker('module_%s_%s' % (counter_name, module_name))):
+                stats_per_worker[worker_index][counter_name] = value
+        for stats in stats_per_worker:
+            stats['histogram'] = []
+        for bucket_idx in range(0, len(PROCESSING_TIME_BUCKETS) + 1):
+            for worker_index, count in enumerate(self.mp_stats_collector.getCounterPerWorker('module_histogram_%d_%s' % (bucket_idx, module_name))):
+                stats_per_worker[worker_index]['histogram'].append(count)
+        return stats_per_worker
+
     def printIntervalStatistics(self):
         self.logger.info("############# Statistics (PID: %s) #############" % os.getpid())
         if self.getConfigurationValue('receive_rate_statistics'):
@@ -86,6 +138,12 @@ class SimpleStats(BaseThreadedModule):
             self.eventTypeStatistics()
         if self.getConfigurationValue('waiting_event_statistics'):
             self.eventsInQueuesStatistics()
+        if self.getConfigurationValue('buffer_statistics'):
+            self.bufferStatistics()
+        if self.getConfigurationValue('filter_statistics'):
+            self.filterStatistics()
+        if self.getConfigurationValue('module_statistics'):
+            self.moduleStatistics()
         if self.getConfigurationValue('process_statistics'):
             self.processStatistics()
 
@@ -103,24 +161,16 @@ class SimpleStats(BaseThreadedModule):
 
     def eventTypeStatistics(self):
         self.logger.info(">> EventTypes Statistics")
-        try:
-            for event_type in sorted(self.mp_stats_collector.getAllCounters().keys()):
-                if not event_type.startswith('event_type_'):
-                    continue
-                count = self.mp_stats_collector.getCounter(event_type)
-                event_name = event_type.replace('event_type_', '').lower()
-                self.logger.info("EventType: %s%s%s - Hits: %s%s%s" % (AnsiColors.YELLOW, event_name, AnsiColors.ENDC, AnsiColors.YELLOW, count, AnsiColors.ENDC))
-                if self.emit_as_event:
-                    self.sendEvent(DictUtils.getDefaultEventDict({"stats_type": "event_type_stats", "%s_count" % event_name: count, "%s_count_per_sec" % event_name:int((count/self.interval)), "interval": self.interval, "timestamp": time.time()}, caller_class_name="Statistics", event_type="statistic"))
-                self.mp_stats_collector.setCounter("last_%s" % event_type, count)
-                self.mp_stats_collector.resetCounter(event_type)
-        except socket.error:
-            # socket.error: [Errno 2] No such file or directory may be thrown when exiting lumbermill via CTRL+C. Ignore it
-            etype, evalue, etb = sys.exc_info()
-            if "No such file or directory" in evalue:
-                pass
-            else:
-                raise etype, evalue, etb
+        for event_type in sorted(self.mp_stats_collector.getAllCounters().keys()):
+            if not event_type.startswith('event_type_'):
+                continue
+            count = self.mp_stats_collector.getCounter(event_type)
+            event_name = event_type.replace('event_type_', '').lower()
+            self.logger.info("EventType: %s%s%s - Hits: %s%s%s" % (AnsiColors.YELLOW, event_name, AnsiColors.ENDC, AnsiColors.YELLOW, count, AnsiColors.ENDC))
+            if self.emit_as_event:
+                self.sendEvent(DictUtils.getDefaultEventDict({"stats_type": "event_type_stats", "%s_count" % event_name: count, "%s_count_per_sec" % event_name:int((count/self.interval)), "interval": self.interval, "timestamp": time.time()}, caller_class_name="Statistics", event_type="statistic"))
+            self.mp_stats_collector.setCounter("last_%s" % event_type, count)
+            self.mp_stats_collector.resetCounter(event_type)
 
     def eventsInQueuesStatistics(self):
         if len(self.module_queues) == 0:
@@ -135,6 +185,69 @@ class SimpleStats(BaseThreadedModule):
             if self.emit_as_event:
                 self.sendEvent(DictUtils.getDefaultEventDict({"stats_type": "queue_stats", "count": queue.qsize(), "interval": self.interval, "timestamp": time.time()}, caller_class_name="Statistics", event_type="statistic"))
 
+    def bufferStatistics(self):
+        buffer_counters = sorted(key for key in self.mp_stats_collector.getAllCounters().keys() if key.startswith('buffer_flush_size_'))
+        if not buffer_counters:
+            return
+        self.logger.info(">> Buffer stats")
+        for buffer_counter in buffer_counters:
+            module_name = buffer_counter.replace('buffer_flush_size_', '')
+            for worker_index, flush_size in enumerate(self.mp_stats_collector.getCounterPerWorker(buffer_counter)):
+                # Workers without this buffer did not set a flush size.
+                if not flush_size:
+                    continue
+                self.logger.info("Flush size of %s (worker %s): %s%s%s" % (module_name, worker_index, AnsiColors.YELLOW, flush_size, AnsiColors.ENDC))
+                if self.emit_as_event:
+                    self.sendEvent(DictUtils.getDefaultEventDict({"stats_type": "buffer_stats", "module": module_name, "worker": worker_index, "flush_size": flush_size, "interval": self.interval, "timestamp": time.time()}, caller_class_name="Statistics", event_type="statistic"))
+
+    def filterStatistics(self):
+        filter_stats = {}
+        counters = self.mp_stats_collector.getAllCounters()
+        for filter_name, compiled_filter in self.lumbermill.getAllFilters().items():
+            stats = {}
+            for stat_name in ['evaluations', 'matches', 'timed_evaluations', 'evaluation_time']:
+                stats[stat_name] = counters.get('filter_%s_%s' % (stat_name, filter_name), 0)
+                self.mp_stats_collector.resetCounter('filter_%s_%s' % (stat_name, filter_name))
+            if stats['evaluations']:
+                filter_stats[filter_name] = (compiled_filter.filter_string, stats)
+        if not filter_stats:
+            return
+        self.logger.info(">> Filter stats")
+        for filter_name, (filter_string, stats) in sorted(filter_stats.items()):
+            match_rate = 100.0 * stats['matches'] / stats['evaluations']
+            evaluation_time = stats['evaluation_time'] / stats['timed_evaluations'] if stats['timed_evaluations'] else 0
+            self.logger.info("Filter of %s <%s>: evaluated %s%s%s, matched %s%.1f%%%s, avg. time %s%.4fms%s" % (filter_name, filter_string, AnsiColors.YELLOW, stats['evaluations'], AnsiColors.ENDC, AnsiColors.YELLOW, match_rate, AnsiColors.ENDC, AnsiColors.YELLOW, evaluation_time * 1000, AnsiColors.ENDC))
+            if self.emit_as_event:
+                self.sendEvent(DictUtils.getDefaultEventDict({"stats_type": "filter_stats", "filter": filter_name, "evaluations": stats['evaluations'], "match_rate": match_rate, "evaluation_time": evaluation_time, "interval": self.interval, "timestamp": time.time()}, caller_class_name="Statistics", event_type="statistic"))
+
+    def moduleStatistics(self):
+        module_statistics = {}
+        # All workers run the same modules.
+        for module_name in self.lumbermill.getAllModuleStatistics().keys():
+            for worker_index, stats in enumerate(self.getModuleStatsPerWorker(module_name)):
+                interval_stats = ModuleStatistics.getDifference(stats, self.previous_module_stats.get((module_name, worker_index)))
+                self.previous_module_stats[(module_name, worker_index)] = stats
+                module_statistics.setdefault(module_name, {})[worker_index] = interval_stats
+        self.last_module_statistics = module_statistics
+        if not module_statistics:
+            return
+        self.logger.info(">> Module stats")
+        for module_name, worker_stats in sorted(module_statistics.items()):
+            for worker_index, stats in sorted(worker_stats.items()):
+                if not stats['events_in'] and not stats['filter_skipped']:
+                    continue
+                processing_time = stats['processing_time'] / stats['timed_events'] if stats['timed_events'] else 0
+                p50 = ModuleStatistics.getPercentile(stats['histogram'], 50)
+                p99 = ModuleStatistics.getPercentile(stats['histogram'], 99)
+                self.logger.info("%s (worker %s): in %s%s%s, out %s%s%s, dropped %s%s%s, filter passed/skipped %s/%s, avg. time %s%.4fms%s, p50 <= %s, p99 <= %s" % (module_name, worker_index, AnsiColors.YELLOW, stats['events_in'], AnsiColors.ENDC, AnsiColors.YELLOW, stats['events_out'], AnsiColors.ENDC, AnsiColors.YELLOW, stats['events_dropped'], AnsiColors.ENDC, stats['filter_passed'], stats['filter_skipped'], AnsiColors.YELLOW, processing_time * 1000, AnsiColors.ENDC, "%.2fms" % (p50 * 1000) if p50 else "-", "%.2fms" % (p99 * 1000) if p99 else "-"))
+                if self.emit_as_event:
+                    stats_event = {"stats_type": "module_stats", "module": module_name, "worker": worker_index, "avg_processing_time": processing_time, "interval": self.interval, "timestamp": time.time()}
+                    stats_event.update(stats)
+                    self.sendEvent(DictUtils.getDefaultEventDict(stats_event, caller_class_name="Statistics", event_type="statistic"))
+
+    def getLastModuleStatistics(self):
+        return self.last_module_statistics
+
     def processStatistics(self):
         stats_event = {"stats_type": "process_stats", "timestamp": time.time(),
                        "worker_count": len(self.lumbermill.child_processes) + 1,
@@ -224,6 +337,13 @@ class SimpleStats(BaseThreadedModule):
     def initAfterFork(self):
         # Get all configured queues for waiting event stats.
         self.module_queues = self.lumbermill.getAllQueues()
+        # psutil is only imported when running, so configuration tests do not need to load it.
+        try:
+            import psutil
+        except ImportError:
+            self.logger.error('Could not import psutil module. To install run: pip install psutil')
+            self.lumbermill.shutDown()
+            return
         self.psutil_processes.append(psutil.Process(self.lumbermill.getMainProcessId()))
         for worker in self.lumbermill.child_processes:
             self.psutil_processes.append(psutil.Process(worker.pid))
@@ -242,6 +362,9 @@ class SimpleStats(BaseThreadedModule):
     def shutDown(self):
         self.accumulateReceiveRateStats()
         self.accumulateEventTypeStats()
+        self.accumulateBufferStats()
+        self.accumulateFilterStats()
+        self.accumulateModuleStats()
         if self.lumbermill.is_master():
             self.printIntervalStatistics()
         self.mp_stats_collector.shutDown()
@@ -38,6 +38,7 @@ class Statistics(BaseThreadedModule):
 
     module_type = "misc"
     """Set module type"""
+    modifies_events = False
 
     def configure(self, configuration):
         # Call parent configure method
@@ -4,7 +4,7 @@ from collections import defaultdict
 
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Decorators import ModuleDocstringParser, setInterval
-from lumbermill.utils.DynamicValues import mapDynamicValue
+from lumbermill.utils.DynamicValues import compileDynamicValue
 from lumbermill.utils.misc import TimedFunctionManager
 
 
@@ -19,6 +19,8 @@ class Throttle(BaseThreadedModule):
     max_mount: Maximum count of same events before same events will be blocked.
     backend: Name of a key::value store plugin. When running multiple instances of gp this backend can be used to synchronize events across multiple instances.
     backend_key_prefix: Prefix for the backend key.
+    partition_events: When running with multiple workers, route events with the same key to the same worker.
+                      The event counts can then be kept in local memory of each worker, without using a backend.
 
     Configuration template:
 
@@ -29,18 +31,21 @@ class Throttle(BaseThreadedModule):
        max_count:                       # <default: 1; type: integer; is: optional>
        backend:                         # <default: None; type: None||string; is: optional>
        backend_key_prefix:              # <default: "lumbermill:throttle"; type: string; is: optional>
+       partition_events:                # <default: False; type: boolean; is: optional>
        receivers:
         - NextModule
     """
 
     module_type = "misc"
     """Set module type"""
+    partition_key = "key"
 
     def configure(self, configuration):
         # Call parent configure method
         BaseThreadedModule.configure(self, configuration)
         self.throttled_events_info = defaultdict(int)
         self.key = self.getConfigurationValue('key')
+        self.key_template = compileDynamicValue(self.key)
         self.timeframe = self.getConfigurationValue('timeframe')
         self.min_count = self.getConfigurationValue('min_count')
         self.max_count = self.getConfigurationValue('max_count')
@@ -104,7 +109,7 @@ class Throttle(BaseThreadedModule):
         BaseThreadedModule.initAfterFork(self)
 
     def handleEvent(self, event):
-        throttled_event_key = mapDynamicValue(self.key, event)
+        throttled_event_key = self.key_template.render(event)
         throttled_event_count = self.setAndGetEventCountByKey(throttled_event_key)
         if self.min_count <= throttled_event_count <= self.max_count:
             yield event
\ No newline at end of file
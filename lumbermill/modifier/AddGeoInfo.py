@@ -2,8 +2,6 @@
 import os
 import socket
 import sys
-import geoip2.database
-import geoip2.errors
 
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Decorators import ModuleDocstringParser, memoize
@@ -57,6 +55,15 @@ class AddGeoInfo(BaseThreadedModule):
     def configure(self, configuration):
         # Call parent configure method
         BaseThreadedModule.configure(self, configuration)
+        # The library is imported on configure, so modules can be listed and validated without loading it.
+        global geoip2
+        try:
+            import geoip2.database
+            import geoip2.errors
+        except ImportError:
+            self.logger.error("Could not import geoip2 module. To install run: pip install geoip2")
+            self.lumbermill.shutDown()
+            return
         allowed_geoip_fields = ['city', 'postal_code', 'country_name', 'country_code', 'continent_code',
                                 'continent', 'area_code', 'region_name', 'longitude', 'latitude',
                                 'longlat', 'time_zone', 'metro_code']
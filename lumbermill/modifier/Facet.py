@@ -155,7 +155,7 @@ class Facet(BaseThreadedModule, ModuleCacheMixin):
         self.evaluate_facet_data_func = setInterval(self.getConfigurationValue('interval'))(self.evaluateFacets) #self.getEvaluateFunc()
         self.timed_func_handler_a = TimedFunctionManager.startTimedFunction(self.evaluate_facet_data_func)
         if self.cache:
-            self.store_facets_in_cache_func = setInterval(1)(self.storeFacetsInCache)
+            self.store_facets_in_cache_func = setInterval(1, blocking=True)(self.storeFacetsInCache)
             self.timed_func_handler_b = TimedFunctionManager.startTimedFunction(self.store_facets_in_cache_func)
         BaseThreadedModule.initAfterFork(self)
 
@@ -59,7 +59,7 @@ class HttpRequest(BaseThreadedModule, ModuleCacheMixin):
         self.interval = self.getConfigurationValue('interval')
 
     def getRunTimedFunctionsFunc(self):
-        @setInterval(self.interval, call_on_init=True)
+        @setInterval(self.interval, call_on_init=True, blocking=True)
         def runTimedFunctionsFunc():
             event = DictUtils.getDefaultEventDict({}, caller_class_name="HttpRequest")
             self.receiveEvent(event)
@@ -35,6 +35,8 @@ class MergeEvent(BaseThreadedModule):
     flush_interval_in_secs: If interval is reached, buffer will be flushed.
     match_field: Which field to check for the pattern.
     glue: Join event data with glue as separator.
+    partition_events: When running with multiple workers, route events with the same buffer_key to the same worker.
+                      Otherwise, fragments of one event might end up in the buffers of different workers.
 
     Configuration template:
 
@@ -46,12 +48,14 @@ class MergeEvent(BaseThreadedModule):
        flush_interval_in_secs:          # <default: 1; type: None||integer; is: required if pattern is None else optional>
        match_field:                     # <default: "data"; type: string; is: optional>
        glue:                            # <default: ""; type: string; is: optional>
+       partition_events:                # <default: False; type: boolean; is: optional>
        receivers:
         - NextModule
     """
 
     module_type = "modifier"
     """Set module type"""
+    partition_key = "buffer_key"
 
     def configure(self, configuration):
         # Call parent configure method
@@ -105,10 +109,12 @@ class MergeEvent(BaseThreadedModule):
 
     def initAfterFork(self):
         # As the buffer uses a threaded timed function to flush its buffer and thread will not survive a fork, init buffer here.
+        # There is one buffer per key, so flush directly instead of starting a flusher thread for each of them.
         self.buffers = collections.defaultdict(lambda: Buffer(flush_size=self.buffer_size,
                                                               callback=self.sendMergedEvent,
                                                               interval=self.flush_interval_in_secs,
-                                                              maxsize=self.buffer_size))
+                                                              maxsize=self.buffer_size,
+                                                              max_in_flight=0))
         BaseThreadedModule.initAfterFork(self)
 
     def handleEventStartPattern(self, event):
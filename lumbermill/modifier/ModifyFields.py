@@ -5,6 +5,7 @@ import sys
 
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Decorators import ModuleDocstringParser
+from lumbermill.utils.DictUtils import compileFieldPath
 
 
 @ModuleDocstringParser
@@ -242,6 +243,11 @@ class ModifyFields(BaseThreadedModule):
         self.source_fields = self.getConfigurationValue('source_fields') if "source_fields" in self.configuration_data else []
         self.target_field = self.getConfigurationValue('target_field') if "target_field" in self.configuration_data else []
         self.target_fields = self.getConfigurationValue('target_fields') if "target_fields" in self.configuration_data else []
+        # Precompile field path accessors.
+        self.source_field_path = self.compileFieldPath(self.source_field)
+        self.source_field_paths = [self.compileFieldPath(field) for field in self.source_fields]
+        self.target_field_path = self.compileFieldPath(self.target_field)
+        self.target_field_paths = [self.compileFieldPath(field) for field in self.target_fields]
         # Call action specific configure method.
         if "configure_%s_action" % self.action in dir(self):
             getattr(self, "configure_%s_action" % self.action)()
@@ -253,10 +259,19 @@ class ModifyFields(BaseThreadedModule):
             self.logger.error("ModifyFields action called that does not exist: %s. Exception: %s, Error: %s" % (self.action, etype, evalue))
             self.lumbermill.shutDown()
 
+    def compileFieldPath(self, field):
+        if not field or not isinstance(field, basestring):
+            return None
+        return compileFieldPath(field)
+
     def configure_slice_action(self):
         self.slice_start = self.getConfigurationValue('start')
         self.slice_end = self.getConfigurationValue('end')
 
+    def configure_map_action(self):
+        target_field = self.target_field if self.target_field else "%s_mapped" % self.source_field
+        self.map_target_field_path = self.compileFieldPath(target_field)
+
     def configure_rename_replace_action(self):
         self.recursive = self.getConfigurationValue('recursive')
         self.old = self.getConfigurationValue('old')
@@ -322,14 +337,14 @@ class ModifyFields(BaseThreadedModule):
     def hashlibFunc(self, string):
         return self.hashlib_func(string).hexdigest()
 
-    def handleEvent(self, event):
+    def processEvent(self, event):
         try:
             event = self.event_handler(event)
         except AttributeError:
             etype, evalue, etb = sys.exc_info()
             self.logger.error("ModifyFields action %s threw an error. Exception: %s, Error: %s" % (self.action, etype, evalue))
             self.lumbermill.shutDown()
-        yield event
+        return event
 
     def keep(self,event):
         """
@@ -365,8 +380,8 @@ class ModifyFields(BaseThreadedModule):
         @param event: dictionary
         @return: event: dictionary
         """
-        for field in self.source_fields:
-            event.pop(field, None)
+        for field_path in self.source_field_paths:
+            field_path.pop(event, None)
         return event
 
     def insert(self, event):
@@ -376,7 +391,7 @@ class ModifyFields(BaseThreadedModule):
         @param event: dictionary
         @return: event: dictionary
         """
-        event[self.target_field] = self.getConfigurationValue('value', event)
+        self.target_field_path.set(event, self.getConfigurationValue('value', event))
         return event
 
     def concat(self, event):
@@ -388,12 +403,12 @@ class ModifyFields(BaseThreadedModule):
         @return: event: dictionary
         """
         concat_str = ""
-        for field in self.source_fields:
+        for field_path in self.source_field_paths:
             try:
-                concat_str = "%s%s" % (concat_str,event[field])
+                concat_str = "%s%s" % (concat_str, field_path.getValue(event))
             except KeyError:
                 pass
-        event[self.target_field] = concat_str
+        self.target_field_path.set(event, concat_str)
         return event
 
     def slice(self, event):
@@ -404,7 +419,7 @@ class ModifyFields(BaseThreadedModule):
         :return: event: dictionary
         """
         try:
-            event[self.target_field] = event[self.source_field][self.slice_start:self.slice_end]
+            self.target_field_path.set(event, self.source_field_path.getValue(event)[self.slice_start:self.slice_end])
         except KeyError:
             pass
         return event
@@ -417,7 +432,7 @@ class ModifyFields(BaseThreadedModule):
         @return: event: dictionary
         """
         try:
-            event[self.source_field] = self.regex.sub(self.getConfigurationValue('with', event), event[self.source_field])
+            self.source_field_path.set(event, self.regex.sub(self.getConfigurationValue('with', event), self.source_field_path.getValue(event)))
         except KeyError:
             pass
         return event
@@ -430,7 +445,7 @@ class ModifyFields(BaseThreadedModule):
         @return: event: dictionary
         """
         try:
-            event[self.target_field] = event.pop(self.source_field)
+            self.target_field_path.set(event, self.source_field_path.pop(event))
         except KeyError:
             pass
         return event
@@ -488,7 +503,7 @@ class ModifyFields(BaseThreadedModule):
         @return: event: dictionary
         """
         try:
-            event[self.source_field] = event[self.source_field].replace(self.getConfigurationValue('old', event), self.getConfigurationValue('new', event), self.getConfigurationValue('max'))
+            self.source_field_path.set(event, self.source_field_path.getValue(event).replace(self.getConfigurationValue('old', event), self.getConfigurationValue('new', event), self.getConfigurationValue('max')))
         except KeyError:
             pass
         return event
@@ -503,12 +518,11 @@ class ModifyFields(BaseThreadedModule):
         @param event: dictionary
         @return: event: dictionary
         """
-        target_field = self.target_field if self.target_field else "%s_mapped" % self.source_field
         try:
-            event[target_field] = self.getConfigurationValue('map', event)[event[self.source_field]]
+            self.map_target_field_path.set(event, self.getConfigurationValue('map', event)[self.source_field_path.getValue(event)])
         except KeyError:
             if self.getConfigurationValue('keep_unmappable'):
-                event[target_field] = event[self.source_field]
+                self.map_target_field_path.set(event, self.source_field_path.getValue(event))
             else:
                 pass
         return event
@@ -593,11 +607,11 @@ class ModifyFields(BaseThreadedModule):
         @return: event: dictionary
         """
         try:
-            values = event[self.source_field].split(self.separator)
+            values = self.source_field_path.getValue(event).split(self.separator)
         except:
             return event
-        target_field = self.target_field if self.target_field else self.source_field
-        event[target_field] = values
+        target_field_path = self.target_field_path if self.target_field_path else self.source_field_path
+        target_field_path.set(event, values)
         return event
 
     def merge(self, event):
@@ -608,12 +622,12 @@ class ModifyFields(BaseThreadedModule):
         @return: event: dictionary
         """
         merged_fields = []
-        for field in self.source_fields:
+        for field_path in self.source_field_paths:
             try:
-                merged_fields.append(event[field])
+                merged_fields.append(field_path.getValue(event))
             except:
                 pass
-        event[self.target_field] = merged_fields
+        self.target_field_path.set(event, merged_fields)
         return event
 
     def join(self, event):
@@ -625,7 +639,7 @@ class ModifyFields(BaseThreadedModule):
         """
         #event.update({self.getConfigurationValue('target_field'): separator.join(fields)})
         try:
-            event[self.target_field] = self.separator.join(event[self.source_field])
+            self.target_field_path.set(event, self.separator.join(self.source_field_path.getValue(event)))
         except:
             pass
         return event
@@ -650,11 +664,11 @@ class ModifyFields(BaseThreadedModule):
         @param event: dictionary
         @return: event: dictionary
         """
-        for field in self.source_fields:
+        for field_path in self.source_field_paths:
             try:
-                event[field] = int(float(event[field]))
+                field_path.set(event, int(float(field_path.getValue(event))))
             except ValueError:
-                event[field] = 0
+                field_path.set(event, 0)
             except KeyError:
                 pass
         return event
@@ -666,11 +680,11 @@ class ModifyFields(BaseThreadedModule):
         @param event: dictionary
         @return: event: dictionary
         """
-        for field in self.source_fields:
+        for field_path in self.source_field_paths:
             try:
-                event[field] = float(event[field])
+                field_path.set(event, float(field_path.getValue(event)))
             except ValueError:
-                event[field] = 0
+                field_path.set(event, 0)
             except KeyError:
                 pass
         return event
@@ -682,11 +696,11 @@ class ModifyFields(BaseThreadedModule):
         @param event: dictionary
         @return: event: dictionary
         """
-        for field in self.source_fields:
+        for field_path in self.source_field_paths:
             try:
-                event[field] = str(event[field])
+                field_path.set(event, str(field_path.getValue(event)))
             except ValueError:
-                event[field] = ""
+                field_path.set(event, "")
             except KeyError:
                 pass
         return event
@@ -698,11 +712,11 @@ class ModifyFields(BaseThreadedModule):
         @param event: dictionary
         @return: event: dictionary
         """
-        for field in self.source_fields:
+        for field_path in self.source_field_paths:
             try:
-                event[field] = bool(event[field])
+                field_path.set(event, bool(field_path.getValue(event)))
             except ValueError:
-                event[field] = False
+                field_path.set(event, False)
             except KeyError:
                 pass
         return event
@@ -720,10 +734,10 @@ class ModifyFields(BaseThreadedModule):
         @param event: dictionary
         @return: event: dictionary
         """
-        for idx, field in enumerate(self.source_fields):
-            target_fieldname = field if not self.target_fields else self.target_fields[idx]
+        for idx, field_path in enumerate(self.source_field_paths):
+            target_field_path = field_path if not self.target_field_paths else self.target_field_paths[idx]
             try:
-                event[target_fieldname] = self.hash_func("%s%s" % (self.salt, event[field]))
+                target_field_path.set(event, self.hash_func("%s%s" % (self.salt, field_path.getValue(event))))
             except:
                 pass
         return event
\ No newline at end of file
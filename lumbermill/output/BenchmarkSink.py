@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import time
+import bisect
+
+from lumbermill.BaseThreadedModule import BaseThreadedModule
+from lumbermill.utils.Decorators import ModuleDocstringParser
+from lumbermill.utils.StatisticCollector import LATENCY_BUCKETS
+
+
+@ModuleDocstringParser
+class BenchmarkSink(BaseThreadedModule):
+    """
+    Counts events and their end to end latency. Used by lumbermill bench.
+
+    The latency is measured from the time BenchmarkInput created an event, @see: BenchmarkInput.
+    On shutdown, each process writes its results to <results_path>/<module id>_<worker index>.json. The results include
+    the module statistics of the process, if these are enabled in the Global section.
+
+    Configuration template:
+
+    - BenchmarkSink:
+       results_path:                    # <type: string; is: required>
+    """
+
+    module_type = "output"
+    """Set module type"""
+    modifies_events = False
+
+    def configure(self, configuration):
+        # Call parent configure method
+        BaseThreadedModule.configure(self, configuration)
+        self.results_path = self.getConfigurationValue('results_path')
+        self.event_count = 0
+        self.first_event_at = None
+        self.last_event_at = None
+        self.timed_events = 0
+        self.latency = 0
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def handleEvent(self, event):
+        now = time.time()
+        if self.first_event_at is None:
+            self.first_event_at = now
+        self.last_event_at = now
+        self.event_count += 1
+        try:
+            latency = now - event['lumbermill']['sent_at']
+        except KeyError:
+            yield None
+            return
+        self.timed_events += 1
+        self.latency += latency
+        self.latency_histogram[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        yield None
+
+    def getResults(self):
+        return {'worker': self.lumbermill.getWorkerIndex(),
+                'pid': os.getpid(),
+                'events': self.event_count,
+                'first_event_at': self.first_event_at,
+                'last_event_at': self.last_event_at,
+                'timed_events': self.timed_events,
+                'latency': self.latency,
+                'latency_histogram': self.latency_histogram,
+                'module_statistics': dict([(module_name, module_statistics.getStats()) for module_name, module_statistics in self.lumbermill.getAllModuleStatistics().items()])}
+
+    def shutDown(self):
+        results_filename = "%s_%d.json" % (self.getConfigurationValue('id') or self.__class__.__name__, self.lumbermill.getWorkerIndex())
+        try:
+            with open(os.path.join(self.results_path, results_filename), 'w') as results_file:
+                json.dump(self.getResults(), results_file)
+        except IOError:
+            etype, evalue, etb = sys.exc_info()
+            self.logger.error("Could not write benchmark results to %s. Exception: %s, Error: %s." % (self.results_path, etype, evalue))
+        BaseThreadedModule.shutDown(self)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+
+import lumbermill.utils.CaptureFile as CaptureFile
+from lumbermill.BaseThreadedModule import BaseThreadedModule
+from lumbermill.utils.Buffers import Buffer
+from lumbermill.utils.Decorators import ModuleDocstringParser
+
+
+@ModuleDocstringParser
+class CaptureSink(BaseThreadedModule):
+    """
+    Capture events to a file, so they can be replayed later, @see: Replay.
+
+    Events are captured with all their fields, as they are when received by this module. So the events of any stage
+    of the pipeline can be captured, by adding this module as a receiver of the module of interest.
+    The events are stored as length prefixed msgpack records in blocks of up to batch_size events. If compression is
+    used, each block is compressed. If the file exists, the new events are appended.
+
+    file_name: Path to the capture file.
+    compress: Compress blocks with zlib or snappy. For this to be effective, the batch size should not be too small.
+    store_interval_in_secs: Write captured events in x seconds intervals.
+    batch_size: Write captured events if event count is above, even if store_interval_in_secs is not reached.
+    backlog_size: Maximum count of events waiting to be written.
+
+    Configuration template:
+
+    - CaptureSink:
+       file_name:                       # <type: string; is: required>
+       compress:                        # <default: None; type: None||string; values: [None,'zlib','snappy']; is: optional>
+       store_interval_in_secs:          # <default: 5; type: integer; is: optional>
+       batch_size:                      # <default: 1000; type: integer; is: optional>
+       backlog_size:                    # <default: 5000; type: integer; is: optional>
+    """
+
+    module_type = "output"
+    """Set module type"""
+    modifies_events = False
+    can_run_forked = False
+
+    def configure(self, configuration):
+        # Call parent configure method
+        BaseThreadedModule.configure(self, configuration)
+        self.file_name = self.getConfigurationValue('file_name')
+        self.compress = self.getConfigurationValue('compress')
+        if self.compress == 'snappy' and not CaptureFile.snappy_available:
+            self.logger.error('Snappy compression selected but snappy module could not be loaded.')
+            self.lumbermill.shutDown()
+        if os.path.isfile(self.file_name) and os.path.getsize(self.file_name) and not CaptureFile.isCaptureFile(self.file_name):
+            self.logger.error("Could not capture to %s. File exists and is not a capture file." % self.file_name)
+            self.lumbermill.shutDown()
+        self.file_handle = None
+        self.buffer = Buffer(self.getConfigurationValue('batch_size'), self.storeData, self.getConfigurationValue('store_interval_in_secs'), maxsize=self.getConfigurationValue('backlog_size'))
+
+    def getStartMessage(self):
+        return "File: %s. Compression: %s" % (self.file_name, self.compress)
+
+    def openCaptureFile(self):
+        try:
+            dirpath = os.path.dirname(self.file_name)
+            if dirpath and not os.path.exists(dirpath):
+                os.makedirs(dirpath)
+            is_new_file = not os.path.isfile(self.file_name) or not os.path.getsize(self.file_name)
+            self.file_handle = open(self.file_name, 'ab')
+            if is_new_file:
+                self.file_handle.write(CaptureFile.MAGIC)
+        except:
+            etype, evalue, etb = sys.exc_info()
+            self.logger.error("Could not open %s for writing. Exception: %s, Error: %s." % (self.file_name, etype, evalue))
+            self.file_handle = None
+
+    def handleEvent(self, event):
+        # Encode now, other receivers might still change the event.
+        self.buffer.append(CaptureFile.encodeRecord(event, time.time()))
+        yield None
+
+    def storeData(self, records):
+        if not self.file_handle:
+            self.openCaptureFile()
+        if not self.file_handle:
+            return False
+        try:
+            self.file_handle.write(CaptureFile.encodeBlock(records, self.compress))
+            self.file_handle.flush()
+            return True
+        except:
+            etype, evalue, etb = sys.exc_info()
+            self.logger.error("Could not write captured events to %s. Exception: %s, Error: %s." % (self.file_name, etype, evalue))
+            return False
+
+    def shutDown(self):
+        self.buffer.flush()
+        if self.file_handle:
+            self.file_handle.close()
+            self.file_handle = None
+        BaseThreadedModule.shutDown(self)
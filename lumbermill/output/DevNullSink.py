@@ -15,6 +15,7 @@ class DevNullSink(BaseThreadedModule):
 
     module_type = "output"
     """Set module type"""
+    modifies_events = False
 
     def handleEvent(self, event):
         yield None
\ No newline at end of file
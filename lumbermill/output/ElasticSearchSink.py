@@ -3,13 +3,13 @@ import sys
 import time
 import pprint
 import logging
-import elasticsearch
 
 from lumbermill.constants import IS_PYPY
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Buffers import Buffer
 from lumbermill.utils.Decorators import ModuleDocstringParser
-from lumbermill.utils.DynamicValues import mapDynamicValue, mapDynamicValueInString
+from lumbermill.utils.DictUtils import materializeEventId
+from lumbermill.utils.DynamicValues import compileDynamicValue
 
 # For pypy the default json module is the fastest.
 if IS_PYPY:
@@ -57,6 +57,11 @@ class ElasticSearchSink(BaseThreadedModule):
     store_interval_in_secs:     Send data to es in x seconds intervals.
     batch_size: Sending data to es if event count is above, even if store_interval_in_secs is not reached.
     backlog_size:   Maximum count of events waiting for transmission. If backlog size is exceeded no new events will be processed.
+    max_in_flight:  Maximum number of batches sent to es concurrently.
+    adaptive_batch_size: If True, batch_size is only the starting value. It will be adjusted to the measured store latency and the incoming event rate.
+    min_batch_size: Lower bound for an adaptive batch size.
+    max_batch_size: Upper bound for an adaptive batch size.
+    target_flush_latency: Number of seconds storing one batch should take with an adaptive batch size.
 
     Configuration template:
 
@@ -78,14 +83,28 @@ class ElasticSearchSink(BaseThreadedModule):
        store_interval_in_secs:          # <default: 5; type: integer; is: optional>
        batch_size:                      # <default: 500; type: integer; is: optional>
        backlog_size:                    # <default: 500; type: integer; is: optional>
+       max_in_flight:                   # <default: 1; type: integer; is: optional>
+       adaptive_batch_size:             # <default: False; type: boolean; is: optional>
+       min_batch_size:                  # <default: 50; type: integer; is: optional>
+       max_batch_size:                  # <default: 5000; type: integer; is: optional>
+       target_flush_latency:            # <default: 1; type: float||integer; is: optional>
     """
 
     module_type = "output"
     """Set module type"""
+    modifies_events = False
 
     def configure(self, configuration):
         # Call parent configure method.
         BaseThreadedModule.configure(self, configuration)
+        # The library is imported on configure, so modules can be listed and validated without loading it.
+        global elasticsearch
+        try:
+            import elasticsearch
+        except ImportError:
+            self.logger.error("Could not import elasticsearch module. To install run: pip install elasticsearch")
+            self.lumbermill.shutDown()
+            return
         for module_name in ['elasticsearch', 'urllib3', 'requests']:
             if self.getConfigurationValue('log_level') == 'info':
                 logging.getLogger(module_name).setLevel(logging.WARN)
@@ -99,6 +118,10 @@ class ElasticSearchSink(BaseThreadedModule):
         self.routing_pattern = self.getConfigurationValue("routing")
         self.doc_id_pattern = self.getConfigurationValue("doc_id")
         self.doc_type_pattern = self.getConfigurationValue("doc_type")
+        self.index_name_template = compileDynamicValue(self.index_name, use_strftime=True)
+        self.routing_template = compileDynamicValue(self.routing_pattern, use_strftime=True)
+        self.doc_id_template = compileDynamicValue(self.doc_id_pattern)
+        self.doc_type_template = compileDynamicValue(self.doc_type_pattern)
         self.doc_type_is_dynamic = self.isDynamicConfigurationValue("doc_type")
         self.es_nodes = self.getConfigurationValue("nodes")
         self.read_timeout = self.getConfigurationValue("read_timeout")
@@ -120,7 +143,12 @@ class ElasticSearchSink(BaseThreadedModule):
             self.lumbermill.shutDown()
             return
         # As the buffer uses a threaded timed function to flush its buffer and thread will not survive a fork, init buffer here.
-        self.buffer = Buffer(self.getConfigurationValue('batch_size'), self.storeData, self.getConfigurationValue('store_interval_in_secs'), maxsize=self.getConfigurationValue('backlog_size'))
+        self.buffer = Buffer(self.getConfigurationValue('batch_size'), self.storeData, self.getConfigurationValue('store_interval_in_secs'),
+                             maxsize=self.getConfigurationValue('backlog_size'), max_in_flight=self.getConfigurationValue('max_in_flight'),
+                             adaptive=self.getConfigurationValue('adaptive_batch_size'),
+                             min_flush_size=self.getConfigurationValue('min_batch_size'),
+                             max_flush_size=self.getConfigurationValue('max_batch_size'),
+                             target_latency=self.getConfigurationValue('target_flush_latency'))
 
     def connect(self):
         es = False
@@ -152,29 +180,37 @@ class ElasticSearchSink(BaseThreadedModule):
             self.logger.debug("Connection to %s successful." % self.es_nodes)
         return es
 
+    def getPublishData(self, event):
+        if not self.fields:
+            return event
+        publish_data = {}
+        for field in self.fields:
+            try:
+                publish_data.update(event[field])
+            except KeyError:
+                continue
+        return publish_data
+
     def handleEvent(self, event):
-        if self.fields:
-            publish_data = {}
-            for field in self.fields:
-                try:
-                    publish_data.update(event[field])
-                except KeyError:
-                    continue
-        else:
-            publish_data = event
-        self.buffer.append(publish_data)
+        self.buffer.append(self.getPublishData(event))
         yield None
 
+    def handleEvents(self, events):
+        if self.fields:
+            events = [self.getPublishData(event) for event in events]
+        self.buffer.extend(events)
+        return []
+
     def dataToElasticSearchJson(self, events):
         """
         Format data for elasticsearch bulk update.
         """
         json_data = []
         for event in events:
-            index_name = mapDynamicValueInString(self.index_name, event, use_strftime=True).lower()
-            doc_type = mapDynamicValueInString(self.doc_type_pattern, event)
-            doc_id = mapDynamicValueInString(self.doc_id_pattern, event)
-            routing = mapDynamicValue(self.routing_pattern, use_strftime=True)
+            index_name = self.index_name_template.render(event).lower()
+            doc_type = self.doc_type_template.render(event)
+            doc_id = self.doc_id_template.render(event)
+            routing = self.routing_template.render({})
             if not doc_id:
                 self.logger.error("Could not find doc_id %s for event %s." % (self.getConfigurationValue("doc_id"), event))
                 continue
@@ -185,6 +221,8 @@ class ElasticSearchSink(BaseThreadedModule):
                 header['index']['_routing'] = routing
             if self.ttl:
                 header['index']['_ttl'] = self.ttl
+            # ujson does not call the dict methods of the event metadata.
+            materializeEventId(event)
             if self.action == 'update':
                 event = {'doc': event}
             try:
@@ -209,12 +247,14 @@ class ElasticSearchSink(BaseThreadedModule):
                 self.es = self.connect()
             except:
                 time.sleep(.5)
+            return False
         except:
             etype, evalue, etb = sys.exc_info()
             self.logger.error("Server communication error. Exception: %s, Error: %s." % (etype, evalue))
             self.logger.debug("Payload: %s" % json_data)
             if "Broken pipe" in evalue or "Connection reset by peer" in evalue:
                 self.es = self.connect()
+            return False
 
     def shutDown(self):
         try:
@@ -8,7 +8,7 @@ from cStringIO import StringIO
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Buffers import Buffer
 from lumbermill.utils.Decorators import ModuleDocstringParser, setInterval
-from lumbermill.utils.DynamicValues import mapDynamicValue
+from lumbermill.utils.DynamicValues import compileDynamicValue
 from lumbermill.utils.misc import TimedFunctionManager
 
 
@@ -37,6 +37,7 @@ class FileSink(BaseThreadedModule):
 
     module_type = "output"
     """Set module type"""
+    modifies_events = False
     can_run_forked = False
 
     def configure(self, configuration):
@@ -46,6 +47,8 @@ class FileSink(BaseThreadedModule):
         self.backlog_size = self.getConfigurationValue('backlog_size')
         self.file_name = self.getConfigurationValue('file_name')
         self.format = self.getConfigurationValue('format')
+        self.file_name_template = compileDynamicValue(self.file_name, use_strftime=True)
+        self.format_template = compileDynamicValue(self.format)
         self.compress = self.getConfigurationValue('compress')
         self.file_handles = {}
         if self.compress == 'gzip':
@@ -95,6 +98,10 @@ class FileSink(BaseThreadedModule):
         self.buffer.append(event)
         yield None
 
+    def handleEvents(self, events):
+        self.buffer.extend(events)
+        return []
+
     def getOrCreateFileHandle(self, path, mode):
         file_handle = None
         try:
@@ -112,8 +119,8 @@ class FileSink(BaseThreadedModule):
     def storeData(self, events):
         write_data = collections.defaultdict(str)
         for event in events:
-            path = mapDynamicValue(self.file_name, mapping_dict=event, use_strftime=True)
-            line = mapDynamicValue(self.format, mapping_dict=event)
+            path = self.file_name_template.render(event)
+            line = self.format_template.render(event)
             write_data["%s" % path] += line + "\n"
         for path, lines in write_data.items():
             try:
@@ -121,7 +128,7 @@ class FileSink(BaseThreadedModule):
             except:
                 etype, evalue, etb = sys.exc_info()
                 self.logger.error('Could no create path %s. Events could not be written. Exception: %s, Error: %s.' % (path, etype, evalue))
-                return
+                return False
             mode = "a+"
             if self.compress == 'gzip':
                 path += ".gz"
@@ -135,10 +142,11 @@ class FileSink(BaseThreadedModule):
                 fh = self.getOrCreateFileHandle(path, mode)
                 fh.write(lines)
                 fh.flush()
-                return True
             except:
                 etype, evalue, etb = sys.exc_info()
                 self.logger.error('Could no write event data to %s. Exception: %s, Error: %s.' % (path, etype, evalue))
+                return False
+        return True
 
     def shutDown(self):
         self.buffer.flush()
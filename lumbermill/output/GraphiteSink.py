@@ -95,7 +95,6 @@ class GraphiteSink(BaseThreadedModule):
                 if not event.endswith("\n"):
                     event += "\n"
                 self.connection.send(event)
-                return True
             except:
                 etype, evalue, etb = sys.exc_info()
                 self.logger.error("Server communication error. Exception: %s, Error: %s." % (etype, evalue))
@@ -113,6 +112,8 @@ class GraphiteSink(BaseThreadedModule):
                     self.lumbermill.shutDown()
                 else:
                     self.logger.info("Reconnection to %s successful." % (self.connection_data))
+                return False
+        return True
 
     def shutDown(self):
         try:
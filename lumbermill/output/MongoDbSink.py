@@ -1,13 +1,12 @@
 # -*- coding: utf-8 -*-
-import pymongo
 import sys
-
 import time
 
 from lumbermill.constants import IS_PYPY
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Buffers import Buffer
 from lumbermill.utils.Decorators import ModuleDocstringParser
+from lumbermill.utils.DictUtils import materializeEventId
 from lumbermill.utils.DynamicValues import mapDynamicValue, mapDynamicValueInString
 
 
@@ -26,6 +25,10 @@ class MongoDbSink(BaseThreadedModule):
     store_interval_in_secs:     Send data to es in x seconds intervals.
     batch_size: Sending data to es if event count is above, even if store_interval_in_secs is not reached.
     backlog_size:   Maximum count of events waiting for transmission. If backlog size is exceeded no new events will be processed.
+    adaptive_batch_size: If True, batch_size is only the starting value. It will be adjusted to the measured store latency and the incoming event rate.
+    min_batch_size: Lower bound for an adaptive batch size.
+    max_batch_size: Upper bound for an adaptive batch size.
+    target_flush_latency: Number of seconds storing one batch should take with an adaptive batch size.
 
     Configuration template:
 
@@ -39,6 +42,10 @@ class MongoDbSink(BaseThreadedModule):
        store_interval_in_secs:          # <default: 5; type: integer; is: optional>
        batch_size:                      # <default: 500; type: integer; is: optional>
        backlog_size:                    # <default: 5000; type: integer; is: optional>
+       adaptive_batch_size:             # <default: False; type: boolean; is: optional>
+       min_batch_size:                  # <default: 50; type: integer; is: optional>
+       max_batch_size:                  # <default: 5000; type: integer; is: optional>
+       target_flush_latency:            # <default: 1; type: float||integer; is: optional>
     """
 
     module_type = "output"
@@ -47,6 +54,14 @@ class MongoDbSink(BaseThreadedModule):
     def configure(self, configuration):
         # Call parent configure method.
         BaseThreadedModule.configure(self, configuration)
+        # The library is imported on configure, so modules can be listed and validated without loading it.
+        global pymongo
+        try:
+            import pymongo
+        except ImportError:
+            self.logger.error("Could not import pymongo module. To install run: pip install pymongo")
+            self.lumbermill.shutDown()
+            return
         self.format = self.getConfigurationValue('format')
         self.collection = self.getConfigurationValue('collection')
         self.database = self.getConfigurationValue('database')
@@ -63,7 +78,11 @@ class MongoDbSink(BaseThreadedModule):
             self.lumbermill.shutDown()
             return
         # As the buffer uses a threaded timed function to flush its buffer and thread will not survive a fork, init buffer here.
-        self.buffer = Buffer(self.getConfigurationValue('batch_size'), self.storeData, self.getConfigurationValue('store_interval_in_secs'), maxsize=self.getConfigurationValue('backlog_size'))
+        self.buffer = Buffer(self.getConfigurationValue('batch_size'), self.storeData, self.getConfigurationValue('store_interval_in_secs'), maxsize=self.getConfigurationValue('backlog_size'),
+                             adaptive=self.getConfigurationValue('adaptive_batch_size'),
+                             min_flush_size=self.getConfigurationValue('min_batch_size'),
+                             max_flush_size=self.getConfigurationValue('max_batch_size'),
+                             target_latency=self.getConfigurationValue('target_flush_latency'))
 
     def connect(self):
         try:
@@ -97,6 +116,8 @@ class MongoDbSink(BaseThreadedModule):
                 self.logger.error("Could not find doc_id %s for event %s." % (self.doc_id_pattern, event))
                 continue
             event['_id'] = doc_id
+            # bson does not call the dict methods of the event metadata.
+            materializeEventId(event)
             if collection_name not in bulk_objects.keys():
                 bulk_objects[collection_name] = mongo_db[collection_name].initialize_ordered_bulk_op()
             try:
@@ -114,6 +135,7 @@ class MongoDbSink(BaseThreadedModule):
             except:
                 etype, evalue, etb = sys.exc_info()
                 self.logger.error("Server communication error. Exception: %s, Error: %s." % (etype, evalue))
+        return True
 
     def shutDown(self):
         try:
@@ -23,6 +23,10 @@ class RedisListSink(BaseThreadedModule):
     store_interval_in_secs: Send data to redis in x seconds intervals.
     batch_size: Send data to redis if event count is above, even if store_interval_in_secs is not reached.
     backlog_size: Maximum count of events waiting for transmission. Events above count will be dropped.
+    adaptive_batch_size: If True, batch_size is only the starting value. It will be adjusted to the measured store latency and the incoming event rate.
+    min_batch_size: Lower bound for an adaptive batch size.
+    max_batch_size: Upper bound for an adaptive batch size.
+    target_flush_latency: Number of seconds storing one batch should take with an adaptive batch size.
 
     Configuration template:
 
@@ -36,6 +40,10 @@ class RedisListSink(BaseThreadedModule):
        store_interval_in_secs:          # <default: 5; type: integer; is: optional>
        batch_size:                      # <default: 500; type: integer; is: optional>
        backlog_size:                    # <default: 500; type: integer; is: optional>
+       adaptive_batch_size:             # <default: False; type: boolean; is: optional>
+       min_batch_size:                  # <default: 50; type: integer; is: optional>
+       max_batch_size:                  # <default: 5000; type: integer; is: optional>
+       target_flush_latency:            # <default: 1; type: float||integer; is: optional>
     """
 
     module_type = "output"
@@ -67,7 +75,11 @@ class RedisListSink(BaseThreadedModule):
 
     def initAfterFork(self):
         BaseThreadedModule.initAfterFork(self)
-        self.buffer = Buffer(self.getConfigurationValue('batch_size'), self.storeData, self.getConfigurationValue('store_interval_in_secs'), maxsize=self.getConfigurationValue('backlog_size'))
+        self.buffer = Buffer(self.getConfigurationValue('batch_size'), self.storeData, self.getConfigurationValue('store_interval_in_secs'), maxsize=self.getConfigurationValue('backlog_size'),
+                             adaptive=self.getConfigurationValue('adaptive_batch_size'),
+                             min_flush_size=self.getConfigurationValue('min_batch_size'),
+                             max_flush_size=self.getConfigurationValue('max_batch_size'),
+                             target_latency=self.getConfigurationValue('target_flush_latency'))
 
     def storeData(self, buffered_data):
         try:
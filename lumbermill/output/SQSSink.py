@@ -3,7 +3,6 @@ import logging
 import os
 import random
 import sys
-import boto3
 
 from lumbermill.constants import IS_PYPY
 from lumbermill.BaseThreadedModule import BaseThreadedModule
@@ -66,6 +65,14 @@ class SQSSink(BaseThreadedModule):
     def configure(self, configuration):
         # Call parent configure method
         BaseThreadedModule.configure(self, configuration)
+        # The library is imported on configure, so modules can be listed and validated without loading it.
+        global boto3
+        try:
+            import boto3
+        except ImportError:
+            self.logger.error("Could not import boto3 module. To install run: pip install boto3")
+            self.lumbermill.shutDown()
+            return
         # Set boto log level.
         logging.getLogger('boto3').setLevel(logging.CRITICAL)
         logging.getLogger('botocore').setLevel(logging.CRITICAL)
@@ -125,6 +132,7 @@ class SQSSink(BaseThreadedModule):
                 batch_messages = []
         if len(batch_messages) > 0:
             self.send()
+        return True
 
     def shutDown(self):
         self.buffer.flush()
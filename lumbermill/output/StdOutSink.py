@@ -26,6 +26,7 @@ class StdOutSink(BaseThreadedModule):
 
     module_type = "output"
     """Set module type"""
+    modifies_events = False
 
     def configure(self, configuration):
         # Call parent configure method
@@ -89,7 +89,7 @@ class WebHdfsSink(BaseThreadedModule):
         return hdfs
 
     def getTimedStoreFunc(self):
-        @setInterval(self.getConfigurationValue('store_interval_in_secs'))
+        @setInterval(self.getConfigurationValue('store_interval_in_secs'), blocking=True)
         def timedStoreEvents():
             if self.is_storing or self.lock._semlock._is_mine():
                 return
@@ -103,6 +103,7 @@ class ZabbixSink(BaseThreadedModule):
         response = self.zabbix_sender.send(packet)
         if response.failed != 0:
             self.logger.warning("%d of %d metrics were not processed correctly." % (response.total-response.processed, response.total))
+        return True
 
     def shutDown(self):
         self.buffer.flush()
\ No newline at end of file
@@ -8,6 +8,7 @@ import zmq
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Buffers import Buffer
 from lumbermill.utils.Decorators import ModuleDocstringParser
+from lumbermill.utils.DictUtils import materializeEventId
 from lumbermill.utils.DynamicValues import mapDynamicValue
 
 
@@ -95,7 +96,7 @@ class ZmqSink(BaseThreadedModule):
                 self.client.send("%s" % data)
             return True
         except zmq.error.ContextTerminated:
-            pass
+            return False
         except:
             exc_type, exc_value, exc_tb = sys.exc_info()
             if exc_value in ['Interrupted system call', 'Socket operation on non-socket']:
@@ -107,6 +108,8 @@ class ZmqSink(BaseThreadedModule):
         if self.format:
             publish_data = mapDynamicValue(self.format, event)
         else:
+            # msgpack does not call the dict methods of the event metadata.
+            materializeEventId(event)
             publish_data = msgpack.packb(event)
         if self.topic:
              publish_data = "%s %s" % (self.topic, publish_data)
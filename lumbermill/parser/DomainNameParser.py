@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 import types
 
-from tld import get_tld
-
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Buffers import MemoryCache
 from lumbermill.utils.Decorators import ModuleDocstringParser
@@ -42,6 +40,14 @@ class DomainNameParser(BaseThreadedModule):
     def configure(self, configuration):
         # Call parent configure method
         BaseThreadedModule.configure(self, configuration)
+        # The library is imported on configure, so modules can be listed and validated without loading it.
+        global get_tld
+        try:
+            from tld import get_tld
+        except ImportError:
+            self.logger.error("Could not import tld module. To install run: pip install tld")
+            self.lumbermill.shutDown()
+            return
         self.source_field = self.getConfigurationValue('source_field')
         self.target_field = self.getConfigurationValue('target_field')
         self.in_mem_cache = MemoryCache(size=1000)
@@ -3,7 +3,6 @@ import re
 import sys
 import types
 from json import JSONDecoder
-from bs4 import UnicodeDammit
 
 from lumbermill.constants import IS_PYPY
 from lumbermill.BaseThreadedModule import BaseThreadedModule
@@ -89,6 +88,8 @@ class JsonParser(BaseThreadedModule):
             try:
                 json_string = str(event[source_field])
             except (UnicodeEncodeError, UnicodeDecodeError):
+                # bs4 takes a while to import and is only needed for badly encoded data.
+                from bs4 import UnicodeDammit
                 json_string = UnicodeDammit(event[source_field]).unicode_markup
             except KeyError:
                 continue
@@ -7,6 +7,7 @@ from operator import itemgetter
 from lumbermill.constants import LUMBERMILL_BASEPATH
 from lumbermill.BaseThreadedModule import BaseThreadedModule
 from lumbermill.utils.Decorators import ModuleDocstringParser, setInterval
+from lumbermill.utils.DictUtils import compileFieldPath
 from lumbermill.utils.misc import TimedFunctionManager
 
 
@@ -51,6 +52,7 @@ class RegexParser(BaseThreadedModule):
         supported_regex_match_types = ['search', 'findall']
         self.timed_func_handler = None
         self.source_field = self.getConfigurationValue('source_field')
+        self.source_field_path = compileFieldPath(self.source_field)
         self.mark_unmatched_as = self.getConfigurationValue('mark_unmatched_as')
         self.break_on_match = self.getConfigurationValue('break_on_match')
         self.hot_rules_first = self.getConfigurationValue('hot_rules_first')
@@ -144,19 +146,17 @@ class RegexParser(BaseThreadedModule):
                     continue
         return regex_pattern
 
-    def handleEvent(self, event):
+    def processEvent(self, event):
         """
         When an event type was successfully detected, extract the fields with to corresponding regex pattern.
         """
         try:
-            string_to_match = event[self.source_field]
+            string_to_match = self.source_field_path.getValue(event)
         except KeyError:
-            yield event
-            return
-        if not isinstance(event[self.source_field], basestring):
+            return event
+        if not isinstance(string_to_match, basestring):
             self.logger.warning("Data in event[%s] not of type string. Skipping." % self.source_field)
-            yield event
-            return
+            return event
         matches_dict = False
         for regex_data in self.fieldextraction_regexpressions:
             event_type = regex_data['event_type']
@@ -181,4 +181,4 @@ class RegexParser(BaseThreadedModule):
                     break
         if not matches_dict:
             event['lumbermill']['event_type'] = self.mark_unmatched_as
-        yield event
\ No newline at end of file
+        return event
\ No newline at end of file
@@ -1,17 +1,18 @@
 # -*- coding: utf-8 -*-
+import collections
 import logging
+import mmap
+import multiprocessing
+import os
+import Queue
 import socket
+import struct
 import sys
+import threading
 import time
 
 import pylru
 
-try:
-    import msgpack
-    msgpack_avaiable = True
-except ImportError:
-    msgpack_avaiable = False
-
 try:
     import zmq
     zmq_avaiable = True
@@ -20,20 +21,57 @@ except ImportError:
 
 from Decorators import setInterval
 from misc import TimedFunctionManager
-from DictUtils import KeyDotNotationDict
+from Codecs import getCodec
 
 class Buffer:
-    def __init__(self, flush_size=None, callback=None, interval=1, maxsize=5000):
+    """
+    Collect items and pass them to callback when flush_size is reached or after interval seconds.
+
+    On flush, the collected items are swapped for an empty list and handed to a flusher thread as one batch. Producers
+    can go on appending while the callback runs. Up to max_in_flight batches are passed to the callback concurrently.
+    A batch is retried every interval seconds until the callback returns True. After max_retries failed retries the
+    batch is dropped, so a batch that can not be stored does not block the buffer forever. Set max_retries to None to
+    retry without limit. If max_in_flight batches are in flight, new items are collected till a batch is done.
+    Producers only wait when the buffer holds more than maxsize items, so a slow callback slows down the producers
+    instead of letting the buffer grow without limit.
+
+    With max_in_flight set to 0, the callback is called directly by the thread triggering the flush.
+
+    In adaptive mode, flush_size is only the starting point. After each successful flush it is recalculated from the
+    measured callback latency per item and the rate of incoming items: a batch should take about target_latency
+    seconds to store, but hold no more items than arrive in target_latency seconds. So batches grow at peak times and
+    shrink when only a few items trickle in. The flush size is kept between min_flush_size and max_flush_size and
+    changes by a factor of two at most per flush.
+    """
+    def __init__(self, flush_size=None, callback=None, interval=1, maxsize=5000, max_in_flight=1, adaptive=False,
+                 min_flush_size=1, max_flush_size=None, target_latency=1, max_retries=10):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.flush_size = flush_size
+        self.adaptive = adaptive and flush_size
+        self.min_flush_size = max(min_flush_size, 1)
+        self.max_flush_size = min(max_flush_size or maxsize, maxsize)
+        self.target_latency = target_latency
+        self.item_latency = None
+        self.last_flush_latency = None
+        self.items_received = 0
+        self.rate_measured_at = time.time()
         self.buffer = []
         self.maxsize = maxsize
-        self.append = self.put
+        self.max_in_flight = max_in_flight
         self.flush_interval = interval
         self.flush_callback = callback
         self.flush_timed_func = self.getTimedFlushMethod()
         self.timed_func_handle = TimedFunctionManager.startTimedFunction(self.flush_timed_func)
         self.is_flushing = False
+        self.pending_batches = collections.deque()
+        self.batches_in_flight = 0
+        self.items_in_flight = 0
+        self.failed_flushes = 0
+        self.max_retries = max_retries
+        self.direct_flush_retries = 0
+        self.dropped_items = 0
+        self.flusher_pid = None
+        self.flush_done = threading.Condition(threading.Lock())
 
     def stopInterval(self):
         TimedFunctionManager.stopTimedFunctions(self.timed_func_handle)
@@ -47,99 +85,234 @@ class Buffer:
     def getTimedFlushMethod(self):
         @setInterval(self.flush_interval)
         def timedFlush():
-            self.flush()
+            self.startFlush()
         return timedFlush
 
-    def append(self, item):
-        self.put(item)
-
-    def put(self, item):
-        # Wait till a running store is finished to avoid strange race conditions when using this buffer with multiprocessing.
-        while self.is_flushing:
-            time.sleep(.00001)
+    def waitForSpace(self):
+        """
+        Wait till the buffer has space left. Caller must hold the flush_done lock.
+        """
+        warned = False
         while len(self.buffer) > self.maxsize:
-            self.logger.warning("Maximum number of items (%s) in buffer reached. Waiting for flush." % self.maxsize)
-            time.sleep(1)
-        self.buffer.append(item)
-        if self.flush_size and len(self.buffer) == self.flush_size:
-            self.flush()
+            if not warned:
+                self.logger.warning("Maximum number of items (%s) in buffer reached. Waiting for flush." % self.maxsize)
+                warned = True
+            # Use a timeout, so the waiting thread stays responsive to signals.
+            self.flush_done.wait(1)
 
-    def flush(self):
-        if self.bufsize() == 0 or self.is_flushing:
+    def put(self, item):
+        with self.flush_done:
+            self.waitForSpace()
+            self.buffer.append(item)
+            self.items_received += 1
+            flush_now = self.flush_size and len(self.buffer) >= self.flush_size
+        if flush_now:
+            self.startFlush()
+
+    append = put
+
+    def extend(self, items):
+        with self.flush_done:
+            self.waitForSpace()
+            self.buffer.extend(items)
+            self.items_received += len(items)
+            flush_now = self.flush_size and len(self.buffer) >= self.flush_size
+        if flush_now:
+            self.startFlush()
+
+    def startFlush(self):
+        """
+        Hand the collected items to a flusher thread without waiting for the callback.
+        """
+        if self.max_in_flight == 0:
+            self.flushDirectly()
             return
-        self.is_flushing = True
-        self.stopInterval()
-        success = self.flush_callback(self.buffer)
-        if success:
-            self.buffer = []
-        self.startInterval()
-        self.is_flushing = False
-
-    def bufsize(self):
-        return len(self.buffer)
-
-class RedisBuffer:
-    def __init__(self, flush_size=None, callback=None, interval=1, maxsize=5000):
-        self.logger = logging.getLogger(self.__class__.__name__)
-        self.flush_size = flush_size
-        self.buffer = []
-        self.maxsize = maxsize
-        self.append = self.put
-        self.flush_interval = interval
-        self.flush_callback = callback
-        self.flush_timed_func = self.getTimedFlushMethod()
-        self.timed_func_handle = TimedFunctionManager.startTimedFunction(self.flush_timed_func)
-        self.is_flushing = False
-
-    def stopInterval(self):
-        TimedFunctionManager.stopTimedFunctions(self.timed_func_handle)
-        self.timed_func_handle = False
-
-    def startInterval(self):
+        with self.flush_done:
+            if not self.handOffBatch():
+                return
         if self.timed_func_handle:
-            self.stopInterval()
-        self.timed_func_handle = TimedFunctionManager.startTimedFunction(self.flush_timed_func)
-
-    def getTimedFlushMethod(self):
-        @setInterval(self.flush_interval)
-        def timedFlush():
-            self.flush()
-        return timedFlush
-
-    def append(self, item):
-        self.put(item)
-
-    def put(self, item):
-        # Wait till a running store is finished to avoid strange race conditions when using this buffer with multiprocessing.
-        while self.is_flushing:
-            time.sleep(.00001)
-        while len(self.buffer) > self.maxsize:
-            self.logger.warning("Maximum number of items (%s) in buffer reached. Waiting for flush." % self.maxsize)
-            time.sleep(1)
-        self.buffer.append(item)
-        if self.flush_size and len(self.buffer) == self.flush_size:
-            self.flush()
+            self.timed_func_handle.reschedule()
 
     def flush(self):
-        if self.bufsize() == 0 or self.is_flushing:
+        """
+        Flush all collected items and wait till all batches in flight are done, or till storing one of them failed.
+        """
+        if self.max_in_flight == 0:
+            self.flushDirectly()
             return
-        self.is_flushing = True
-        self.stopInterval()
-        success = self.flush_callback(self.buffer)
-        if success:
-            self.buffer = []
-        self.startInterval()
-        self.is_flushing = False
+        with self.flush_done:
+            failed_flushes = self.failed_flushes
+            while (self.buffer or self.batches_in_flight) and self.failed_flushes == failed_flushes:
+                if not self.handOffBatch():
+                    self.flush_done.wait(1)
+
+    def handOffBatch(self):
+        """
+        Swap the collected items for an empty list and queue them for the flusher threads.
+        Caller must hold the flush_done lock.
+        """
+        if not self.buffer or self.batches_in_flight >= self.max_in_flight:
+            # The next batch will be handed off when one of the batches in flight is done.
+            return False
+        batch, self.buffer = self.buffer, []
+        self.batches_in_flight += 1
+        self.items_in_flight += len(batch)
+        self.pending_batches.append(batch)
+        self.startFlusherThreads()
+        self.flush_done.notify_all()
+        return True
+
+    def startFlusherThreads(self):
+        # Threads will not survive a fork, so start them in the process that uses the buffer.
+        if self.flusher_pid == os.getpid():
+            return
+        self.flusher_pid = os.getpid()
+        for _ in range(0, self.max_in_flight):
+            flusher = threading.Thread(target=self.runFlusher, name="%sFlusher" % self.__class__.__name__)
+            flusher.daemon = True
+            flusher.start()
+
+    def runFlusher(self):
+        while True:
+            with self.flush_done:
+                while not self.pending_batches:
+                    self.flush_done.wait()
+                batch = self.pending_batches.popleft()
+            retries = 0
+            while not self.storeBatch(batch):
+                with self.flush_done:
+                    self.failed_flushes += 1
+                    self.flush_done.notify_all()
+                if self.max_retries is not None and retries >= self.max_retries:
+                    self.dropBatch(batch)
+                    break
+                retries += 1
+                # New items will still be collected while waiting for the retry.
+                time.sleep(self.flush_interval)
+            with self.flush_done:
+                self.batches_in_flight -= 1
+                self.items_in_flight -= len(batch)
+                flush_now = self.flush_size and len(self.buffer) >= self.flush_size
+                self.flush_done.notify_all()
+            if flush_now:
+                self.startFlush()
+
+    def storeBatch(self, batch):
+        started_at = time.time()
+        try:
+            success = self.flush_callback(batch)
+        except:
+            etype, evalue, etb = sys.exc_info()
+            self.logger.error("Could not flush %d buffered items. Exception: %s, Error: %s." % (len(batch), etype, evalue))
+            return False
+        if success and self.adaptive:
+            self.adjustFlushSize(len(batch), time.time() - started_at)
+        return success
+
+    def dropBatch(self, batch):
+        self.logger.error("Could not flush %d buffered items after %d retries. Dropping them." % (len(batch), self.max_retries))
+        with self.flush_done:
+            self.dropped_items += len(batch)
+
+    def adjustFlushSize(self, batch_size, latency):
+        """
+        Recalculate the flush size from the latency of the last flush and the rate of incoming items.
+        """
+        with self.flush_done:
+            now = time.time()
+            elapsed = now - self.rate_measured_at
+            incoming_rate = self.items_received / elapsed if elapsed > 0 else 0
+            self.items_received = 0
+            self.rate_measured_at = now
+            self.last_flush_latency = latency
+            # Smooth the latency per item, single flushes can be slow for reasons unrelated to the batch size.
+            item_latency = latency / batch_size
+            if self.item_latency is None:
+                self.item_latency = item_latency
+            else:
+                self.item_latency = 0.7 * self.item_latency + 0.3 * item_latency
+            if self.item_latency > 0:
+                flush_size = self.target_latency / self.item_latency
+            else:
+                flush_size = self.max_flush_size
+            flush_size = min(flush_size, incoming_rate * self.target_latency)
+            flush_size = min(max(flush_size, self.flush_size / 2), self.flush_size * 2)
+            flush_size = int(min(max(flush_size, self.min_flush_size), self.max_flush_size))
+            if flush_size == self.flush_size:
+                return
+            self.logger.debug("Changing flush size from %d to %d. Flush latency: %.3fs, incoming rate: %.1f/s." % (self.flush_size, flush_size, latency, incoming_rate))
+            self.flush_size = flush_size
+
+    def getStats(self):
+        return {'flush_size': self.flush_size,
+                'adaptive': bool(self.adaptive),
+                'last_flush_latency': self.last_flush_latency,
+                'items_buffered': self.bufsize(),
+                'batches_in_flight': self.batches_in_flight,
+                'failed_flushes': self.failed_flushes,
+                'dropped_items': self.dropped_items}
+
+    def flushDirectly(self):
+        with self.flush_done:
+            if not self.buffer or self.is_flushing:
+                return
+            self.is_flushing = True
+            batch, self.buffer = self.buffer, []
+            self.items_in_flight = len(batch)
+        success = False
+        drop_batch = False
+        started_at = time.time()
+        try:
+            success = self.flush_callback(batch)
+            if success and self.adaptive:
+                self.adjustFlushSize(len(batch), time.time() - started_at)
+        finally:
+            with self.flush_done:
+                if success:
+                    self.direct_flush_retries = 0
+                else:
+                    self.failed_flushes += 1
+                    if self.max_retries is None or self.direct_flush_retries < self.max_retries:
+                        # Keep the items for the next flush.
+                        self.buffer[0:0] = batch
+                        self.direct_flush_retries += 1
+                    else:
+                        self.direct_flush_retries = 0
+                        drop_batch = True
+                self.items_in_flight = 0
+                self.is_flushing = False
+                self.flush_done.notify_all()
+        if drop_batch:
+            self.dropBatch(batch)
+        # Start the next interval after this flush.
+        if self.timed_func_handle:
+            self.timed_func_handle.reschedule()
+
+    def isFull(self):
+        return len(self.buffer) >= self.maxsize
 
     def bufsize(self):
-        return len(self.buffer)
+        return len(self.buffer) + self.items_in_flight
+
+class RedisBuffer(Buffer):
+    pass
 
 class BufferedQueue:
-    def __init__(self, queue, buffersize=500):
+    """
+    Buffer items and put them into a queue in batches.
+
+    If the queue connects different processes, the batches are serialized with the given codec, see utils.Codecs.
+    For queues inside one process, set serialize to False. The batches will then be passed by reference.
+    """
+    def __init__(self, queue, buffersize=500, serialize=True, codec='msgpack'):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.queue = queue
         self.buffersize = buffersize
-        self.buffer = Buffer(buffersize, self.sendBuffer, 5)
+        self.serialize = serialize
+        self.codec = getCodec(codec) if serialize else None
+        # A flusher thread puts the batches into the queue. So a full queue does not block the scheduler running the
+        # timed flushes. Producers are slowed down by the buffer filling up while the flusher waits for the queue.
+        self.buffer = Buffer(buffersize, self.sendBuffer, 5, max_in_flight=1)
 
     def startInterval(self):
         self.buffer.startInterval()
@@ -147,9 +320,13 @@ class BufferedQueue:
     def put(self, payload):
         self.buffer.append(payload)
 
+    def extend(self, payloads):
+        self.buffer.extend(payloads)
+
     def sendBuffer(self, buffered_data):
         try:
-            buffered_data = msgpack.packb(buffered_data)
+            if self.serialize:
+                buffered_data = self.codec.encode(buffered_data)
             self.queue.put(buffered_data)
             return True
         except (KeyboardInterrupt, SystemExit):
@@ -159,15 +336,18 @@ class BufferedQueue:
         except:
             etype, evalue, etb = sys.exc_info()
             self.logger.error("Could not append data to queue. Exception: %s, Error: %s." % (etype, evalue))
+            return False
 
     def get(self, block=True, timeout=None):
         try:
             buffered_data = self.queue.get(block, timeout)
-            buffered_data = msgpack.unpackb(buffered_data)
-            # After msgpack.uppackb we just have a normal dict. Cast this to KeyDotNotationDict.
-            for data in buffered_data:
-                yield KeyDotNotationDict(data)
-        except (KeyboardInterrupt, SystemExit, ValueError, OSError):
+            if not self.serialize:
+                for data in buffered_data:
+                    yield data
+                return
+            for data in self.codec.decode(buffered_data):
+                yield data
+        except (KeyboardInterrupt, SystemExit, ValueError, OSError, EOFError):
             # Keyboard interrupt is catched in GambolPuttys main run method.
             # This will take care to shutdown all running modules.
             pass
@@ -178,9 +358,71 @@ class BufferedQueue:
         except NotImplementedError:
             return 0
 
+    def isSaturated(self):
+        """
+        Return True if the buffer or the underlying queue is full. Queues that can not tell are never saturated.
+        """
+        if self.buffer.isFull():
+            return True
+        try:
+            return self.queue.full()
+        except (AttributeError, NotImplementedError):
+            return False
+
     def __getattr__(self, name):
         return getattr(self.queue, name)
 
+class PartitionedQueue:
+    """
+    Route events to one of multiple queues, based on the hash of a partition key.
+
+    Each worker process reads only from the queue at its own worker index. So all events with the same partition key
+    will be handled by the same worker and a module can keep its per key state in local memory.
+    """
+    def __init__(self, queues, get_partition_key, get_partition_index):
+        self.queues = queues
+        self.get_partition_key = get_partition_key
+        self.get_partition_index = get_partition_index
+
+    def getQueueForEvent(self, event):
+        partition_key = self.get_partition_key(event)
+        try:
+            partition_hash = hash(partition_key)
+        except TypeError:
+            # Unhashable values like lists or dicts.
+            partition_hash = hash(repr(partition_key))
+        return self.queues[partition_hash % len(self.queues)]
+
+    def getOwnQueue(self):
+        return self.queues[self.get_partition_index()]
+
+    def startInterval(self):
+        for queue in self.queues:
+            queue.startInterval()
+
+    def put(self, payload):
+        self.getQueueForEvent(payload).put(payload)
+
+    def extend(self, payloads):
+        for payload in payloads:
+            self.put(payload)
+
+    def get(self, block=True, timeout=None):
+        return self.getOwnQueue().get(block, timeout)
+
+    def qsize(self):
+        return self.getOwnQueue().qsize()
+
+    def isSaturated(self):
+        # A full partition will block all senders sooner or later.
+        for queue in self.queues:
+            if queue.isSaturated():
+                return True
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self.getOwnQueue(), name)
+
 class ZeroMqMpQueue:
     """
     Use ZeroMQ for IPC.
@@ -250,6 +492,137 @@ class ZeroMqMpQueue:
     def qsize(self):
         return self.queue_size
 
+class SharedMemoryRingQueue:
+    """
+    Use ring buffers in shared memory for IPC.
+
+    Messages are written as length prefixed byte strings to ring buffers in an anonymous shared mmap. The mmap is
+    created before the workers are forked, so all processes see the same memory. Data is copied directly into the
+    ring, there is no pipe and no feeder thread involved.
+
+    Each producer process writes to its own ring, chosen by its worker index, see LumberMill.getWorkerIndex. Each ring
+    has its own write lock, which is only contended if there are more producers than rings. Consumers share a read lock.
+    A semaphore counts the messages in all rings, so get blocks like multiprocessing.Queue.get. A second semaphore
+    limits the number of messages to queue_max_size, so put blocks if the queue is full.
+    If a ring has not enough free bytes for a message, put waits on a condition of the ring. Consumers notify it each
+    time they free up space in the ring.
+    """
+    ring_header = struct.Struct("=QQ")
+    position = struct.Struct("=Q")
+    message_header = struct.Struct("=I")
+
+    def __init__(self, queue_max_size=20, rings=1, ring_size=4*1024*1024, get_worker_index=None):
+        self.queue_max_size = queue_max_size
+        self.rings = rings
+        self.get_worker_index = get_worker_index
+        self.ring_size = ring_size
+        self.ring_offset = self.ring_header.size + ring_size
+        self.memory = mmap.mmap(-1, rings * self.ring_offset)
+        self.write_locks = [multiprocessing.Lock() for _ in range(0, rings)]
+        self.space_freed = [multiprocessing.Condition() for _ in range(0, rings)]
+        self.read_lock = multiprocessing.Lock()
+        self.messages = multiprocessing.Semaphore(0)
+        self.free_slots = multiprocessing.Semaphore(queue_max_size)
+        self.next_read_ring = 0
+
+    def getRingPositions(self, ring):
+        return self.ring_header.unpack_from(self.memory, ring * self.ring_offset)
+
+    def setWritePosition(self, ring, write_position):
+        # Producers only write the write position and consumers only the read position.
+        self.position.pack_into(self.memory, ring * self.ring_offset, write_position)
+
+    def setReadPosition(self, ring, read_position):
+        self.position.pack_into(self.memory, ring * self.ring_offset + self.position.size, read_position)
+
+    def writeToRing(self, ring, position, data):
+        start = ring * self.ring_offset + self.ring_header.size
+        offset = position % self.ring_size
+        data_length = len(data)
+        if data_length <= self.ring_size - offset:
+            self.memory[start + offset:start + offset + data_length] = data
+            return
+        # Data wraps around the end of the ring.
+        first_part_length = self.ring_size - offset
+        self.memory[start + offset:start + self.ring_size] = data[:first_part_length]
+        self.memory[start:start + data_length - first_part_length] = data[first_part_length:]
+
+    def readFromRing(self, ring, position, length):
+        start = ring * self.ring_offset + self.ring_header.size
+        offset = position % self.ring_size
+        first_part_length = min(length, self.ring_size - offset)
+        data = self.memory[start + offset:start + offset + first_part_length]
+        if first_part_length < length:
+            data += self.memory[start:start + length - first_part_length]
+        return data
+
+    def getOwnRing(self):
+        if not self.get_worker_index:
+            return 0
+        return self.get_worker_index() % self.rings
+
+    def waitForSpace(self, ring, message_length, block, deadline):
+        """
+        Wait till the ring has message_length free bytes. Returns the write position or None, if the deadline passed.
+        Caller must hold the write lock of the ring.
+        """
+        with self.space_freed[ring]:
+            while True:
+                write_position, read_position = self.getRingPositions(ring)
+                if self.ring_size - (write_position - read_position) >= message_length:
+                    return write_position
+                if not block:
+                    return None
+                wait_time = 1
+                if deadline is not None:
+                    wait_time = deadline - time.time()
+                    if wait_time <= 0:
+                        return None
+                # Use a timeout, so the waiting process stays responsive to signals.
+                self.space_freed[ring].wait(min(wait_time, 1))
+
+    def put(self, data, block=True, timeout=None):
+        message_length = self.message_header.size + len(data)
+        if message_length > self.ring_size:
+            raise ValueError("Message of %s bytes exceeds ring size of %s bytes." % (len(data), self.ring_size))
+        deadline = time.time() + timeout if block and timeout is not None else None
+        if not self.free_slots.acquire(block, timeout):
+            raise Queue.Full
+        ring = self.getOwnRing()
+        with self.write_locks[ring]:
+            write_position = self.waitForSpace(ring, message_length, block, deadline)
+            if write_position is None:
+                self.free_slots.release()
+                raise Queue.Full
+            self.writeToRing(ring, write_position, self.message_header.pack(len(data)))
+            self.writeToRing(ring, write_position + self.message_header.size, data)
+            self.setWritePosition(ring, write_position + message_length)
+        self.messages.release()
+
+    def get(self, block=True, timeout=None):
+        if not self.messages.acquire(block, timeout):
+            raise Queue.Empty
+        with self.read_lock:
+            for idx in range(0, self.rings):
+                ring = (self.next_read_ring + idx) % self.rings
+                write_position, read_position = self.getRingPositions(ring)
+                if write_position > read_position:
+                    break
+            self.next_read_ring = ring + 1
+            data_length, = self.message_header.unpack(self.readFromRing(ring, read_position, self.message_header.size))
+            data = self.readFromRing(ring, read_position + self.message_header.size, data_length)
+            self.setReadPosition(ring, read_position + self.message_header.size + data_length)
+        with self.space_freed[ring]:
+            self.space_freed[ring].notify_all()
+        self.free_slots.release()
+        return data
+
+    def qsize(self):
+        return self.messages.get_value()
+
+    def full(self):
+        return self.free_slots.get_value() == 0
+
 class MemoryCache():
 
     def __init__(self, size=1000):
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import os
+import mmap
+import zlib
+import struct
+
+import msgpack
+
+try:
+    import snappy
+    snappy_available = True
+except ImportError:
+    snappy_available = False
+
+from Codecs import dictToEvent
+
+"""
+File format of event captures, written by CaptureSink and read by Replay.
+
+A capture file starts with MAGIC, followed by blocks. Each block has a header with the length of its payload and
+the compression used. The uncompressed payload is a sequence of records. Each record has a header with the length of
+its data and the time the event was captured, followed by the event, encoded with msgpack.
+
+Since blocks are only appended, a capture can be continued by writing to an existing file. A truncated last block,
+e.g. of a capture that is still running, is ignored when reading.
+"""
+
+MAGIC = 'LUMBERMILL_CAPTURE_1\n'
+# Payload length, compression id.
+BLOCK_HEADER = struct.Struct('!IB')
+# Data length, capture time.
+RECORD_HEADER = struct.Struct('!Id')
+COMPRESSIONS = {None: 0, 'zlib': 1, 'snappy': 2}
+
+
+def isCaptureFile(path):
+    try:
+        with open(path, 'rb') as capture_file:
+            return capture_file.read(len(MAGIC)) == MAGIC
+    except IOError:
+        return False
+
+
+def encodeUnknownType(value):
+    # Values msgpack can not encode, e.g. datetime values, are captured as string.
+    return "%s" % value
+
+
+def encodeRecord(event, captured_at):
+    """
+    Encode event with its current fields and values.
+
+    The event_id is not captured, replayed events get a new one.
+    """
+    plain_event = dict(event)
+    metadata = plain_event.get('lumbermill')
+    if isinstance(metadata, dict):
+        # dict() does not create a not yet generated event_id.
+        metadata = dict(metadata)
+        metadata.pop('event_id', None)
+        plain_event['lumbermill'] = metadata
+    data = msgpack.packb(plain_event, use_bin_type=True, default=encodeUnknownType)
+    return RECORD_HEADER.pack(len(data), captured_at) + data
+
+
+def encodeBlock(records, compression=None):
+    payload = ''.join(records)
+    if compression == 'zlib':
+        payload = zlib.compress(payload)
+    elif compression == 'snappy':
+        payload = snappy.compress(payload)
+    return BLOCK_HEADER.pack(len(payload), COMPRESSIONS[compression]) + payload
+
+
+def decompressBlock(payload, compression_id):
+    if compression_id == COMPRESSIONS['zlib']:
+        return zlib.decompress(payload)
+    if compression_id == COMPRESSIONS['snappy']:
+        if not snappy_available:
+            raise ValueError("Capture is snappy compressed but snappy module could not be loaded.")
+        return snappy.decompress(payload)
+    raise ValueError("Unknown compression id %s." % compression_id)
+
+
+class CaptureFileReader:
+    """
+    Read a capture file via mmap.
+
+    Uncompressed blocks are read directly from the mapped file. Only the records that are returned get decoded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size < len(MAGIC):
+            self.file.close()
+            raise ValueError("%s is not a capture file." % path)
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError("%s is not a capture file." % path)
+        self.first_captured_at = None
+
+    def iterRecords(self, worker_count=1, worker_index=0):
+        """
+        Yields (captured_at, event) of all records.
+
+        With more than one worker, only every worker_count-th record, starting at worker_index, is returned.
+        first_captured_at is set to the capture time of the first record in the file, including skipped ones.
+        """
+        data = self.data
+        data_size = len(data)
+        offset = len(MAGIC)
+        record_idx = 0
+        while offset + BLOCK_HEADER.size <= data_size:
+            payload_size, compression_id = BLOCK_HEADER.unpack_from(data, offset)
+            offset += BLOCK_HEADER.size
+            if offset + payload_size > data_size:
+                break
+            if compression_id == COMPRESSIONS[None]:
+                block, block_offset, block_end = data, offset, offset + payload_size
+            else:
+                block = decompressBlock(data[offset:offset + payload_size], compression_id)
+                block_offset, block_end = 0, len(block)
+            offset += payload_size
+            while block_offset < block_end:
+                record_size, captured_at = RECORD_HEADER.unpack_from(block, block_offset)
+                block_offset += RECORD_HEADER.size
+                if self.first_captured_at is None:
+                    self.first_captured_at = captured_at
+                if record_idx % worker_count == worker_index:
+                    yield captured_at, dictToEvent(msgpack.unpackb(block[block_offset:block_offset + record_size], raw=False))
+                block_offset += record_size
+                record_idx += 1
+
+    def close(self):
+        self.data.close()
+        self.file.close()
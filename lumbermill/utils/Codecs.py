@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import marshal
+import cPickle
+
+try:
+    import msgpack
+    msgpack_avaiable = True
+except ImportError:
+    msgpack_avaiable = False
+
+from DictUtils import KeyDotNotationDict, EventMetadata, isEventMetadata
+
+codecs = {}
+
+
+def registerCodec(codec_class):
+    """
+    Class decorator to register a codec under its name.
+    """
+    codecs[codec_class.name] = codec_class
+    return codec_class
+
+
+def getCodec(codec_name):
+    """
+    Return an instance of the codec registered as codec_name.
+    Raises KeyError if no such codec is available.
+    """
+    return codecs[codec_name]()
+
+
+def getCodecNames():
+    return sorted(codecs.keys())
+
+
+def eventToDict(event):
+    """
+    Return event as a plain dict, including its metadata.
+
+    dict() copies the top level dict without calling the KeyDotNotationDict methods, so copy-on-write values shared
+    with other events are not copied.
+    """
+    plain_event = dict(event)
+    metadata = plain_event.get('lumbermill')
+    if isEventMetadata(metadata):
+        # items() will create a not yet generated event_id.
+        plain_event['lumbermill'] = dict(metadata.items())
+    return plain_event
+
+
+def dictToEvent(plain_event):
+    event = KeyDotNotationDict(plain_event)
+    metadata = dict.get(event, 'lumbermill')
+    if type(metadata) is dict:
+        dict.__setitem__(event, 'lumbermill', EventMetadata(metadata))
+    return event
+
+
+class Codec:
+    """
+    Base class for codecs that serialize batches of events for inter process queues.
+
+    Decoded events are KeyDotNotationDicts with EventMetadata, just like the encoded ones.
+    """
+    name = None
+
+    def encode(self, events):
+        return self.dumps([eventToDict(event) for event in events])
+
+    def decode(self, data):
+        return [dictToEvent(plain_event) for plain_event in self.loads(data)]
+
+    def dumps(self, plain_events):
+        raise NotImplementedError
+
+    def loads(self, data):
+        raise NotImplementedError
+
+
+if msgpack_avaiable:
+    @registerCodec
+    class MsgPackCodec(Codec):
+        """
+        Uses msgpack with separate types for byte strings and unicode strings, so str and unicode values keep their
+        type. Tuples are decoded as lists.
+        """
+        name = 'msgpack'
+
+        def dumps(self, plain_events):
+            return msgpack.packb(plain_events, use_bin_type=True)
+
+        def loads(self, data):
+            return msgpack.unpackb(data, raw=False)
+
+
+@registerCodec
+class PickleCodec(Codec):
+    """
+    Uses cPickle with protocol 2. Supports all picklable types, e.g. datetime values.
+    """
+    name = 'pickle'
+
+    def dumps(self, plain_events):
+        return cPickle.dumps(plain_events, 2)
+
+    def loads(self, data):
+        return cPickle.loads(data)
+
+
+@registerCodec
+class MarshalCodec(Codec):
+    """
+    Uses marshal. Fast, but only supports plain types like dict, list, tuple, str, unicode, int, float, bool and None.
+    The format depends on the python version, so all processes must run the same interpreter.
+    """
+    name = 'marshal'
+
+    def dumps(self, plain_events):
+        return marshal.dumps(plain_events)
+
+    def loads(self, data):
+        return marshal.loads(data)
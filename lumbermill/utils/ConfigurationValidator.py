@@ -3,6 +3,7 @@ import sys
 
 from lumbermill.constants import TYPENAMES_TO_TYPE
 from DynamicValues import replaceVarsAndCompileString
+from Codecs import getCodecNames
 
 if sys.hexversion > 0x03000000:
     pass
@@ -11,7 +12,10 @@ else:
 
 yaml_valid_config_template = {
     'Global': {'types': [dict],
-               'fields': {'workers': {'types': [int]}}},
+               'fields': {'workers': {'types': [int]},
+                          'fuse_modules': {'types': [bool]},
+                          'mp_queue_type': {'types': [str], 'values': ['multiprocessing', 'ring_buffer', 'zmq']},
+                          'mp_queue_codec': {'types': [str], 'values': getCodecNames()}}},
     'Module': {'types': [dict,str],
                'fields': {'id': {'types': [str]},
                           'filter': {'types': [str]},
@@ -83,6 +87,9 @@ class ConfigurationValidator():
             if type(item_value) not in item_template['types']:
                 error_msg = "'%s' not of correct datatype. Is: %s, should be: %s. Please check your configuration." % (path, type(item_value), item_template['types'])
                 configuration_errors.append(error_msg)
+            if 'values' in item_template and item_value not in item_template['values']:
+                error_msg = "'%s' has invalid value. Is: %s, should be one of: %s. Please check your configuration." % (path, item_value, item_template['values'])
+                configuration_errors.append(error_msg)
             if type(item_value) is dict:
                 for field_key, field_value in item_value.items():
                     field_path = "%s.%s" % (path, field_key)
@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 import codecs
+import copy
 import sys
 import functools
-import threading
 import re
 import ast
 import collections
 
+from Scheduler import getScheduler
+
 
 def Singleton(class_):
     instances = {}
@@ -18,71 +20,86 @@ def Singleton(class_):
 
     return getinstance
 
-def setInterval(interval, max_run_count=0, call_on_init=False):
+def setInterval(interval, max_run_count=0, call_on_init=False, blocking=False):
+    """
+    Call the decorated function every interval seconds. All timed functions of a process share a single thread,
+    see utils.Scheduler. Calling the decorated function starts it and returns a handle. handle.set() stops it.
+    Set blocking for functions doing network requests or other slow work. They are then called in their own thread.
+    """
     def decorator(function):
         def wrapper(*args, **kwargs):
-            stopped = threading.Event()
-            def loop(): # executed in another thread
-                run_count = 0
-                if call_on_init:
-                    function(*args, **kwargs)
-                while not stopped.wait(interval): # until stopped
-                    function(*args, **kwargs)
-                    if max_run_count > 0:
-                        run_count += 1
-                        if run_count == max_run_count:
-                            break
-            t = threading.Thread(target=loop)
-            t.daemon = True # stop if the program exits
-            t.start()
-            return stopped
+            return getScheduler().startFunction(functools.partial(function, *args, **kwargs), interval, max_run_count, call_on_init, blocking)
         return wrapper
     return decorator
 
+CONFIG_OPTION_REGEX = re.compile("\s*(?P<name>.*?):.*?#\s*<(?P<props>.*?)>", re.MULTILINE)
+
+parsed_module_docstrings = {}
+"""Parsed configuration options per module class: class -> (configuration_metadata, defaults)."""
+
+def parseModuleDocstring(cls, logger):
+    """
+    Parse the configuration options of a module class and its parents from their docstrings.
+
+    Return the configuration metadata and the default values of all options.
+    """
+    configuration_metadata = {}
+    defaults = {}
+    docstring = ""
+    # Get docstring from parents. Only single inheritance supported.
+    for parent_class in cls.__bases__:
+        if parent_class.__doc__:
+            docstring += parent_class.__doc__
+    if cls.__doc__:
+        docstring += cls.__doc__
+    for matches in CONFIG_OPTION_REGEX.finditer(docstring):
+        config_option_info = matches.groupdict()
+        for prop_info in config_option_info['props'].split(";"):
+            try:
+                prop_name, prop_value = [m.strip() for m in prop_info.split(":", 1)]
+                # Replace escaped backslashes.
+                if "//" in prop_value:
+                    prop_value = codecs.escape_decode(prop_value)
+            except ValueError:
+                logger.debug("Could not parse config setting %s." % config_option_info)
+                continue
+            if prop_name in ["default", "values"]:
+                try:
+                    prop_value = ast.literal_eval(prop_value)
+                except:
+                    etype, evalue, etb = sys.exc_info()
+                    logger.error("Could not parse %s from docstring. Exception: %s, Error: %s." % (prop_value, etype, evalue))
+                    continue
+                # Set default values in module configuration. Will be overwritten by custom values
+                if prop_name == "default":
+                    defaults[config_option_info['name'].strip()] = prop_value
+                # Support for multiple datatypes using the pattern: "type: string||list;"
+            if prop_name == "type":
+                prop_value = prop_value.split("||")
+                prop_value.append('Unicode')
+            try:
+                configuration_metadata[config_option_info['name'].strip()].update({prop_name: prop_value})
+            except:
+                configuration_metadata[config_option_info['name'].strip()] = {prop_name: prop_value}
+    return configuration_metadata, defaults
+
 def ModuleDocstringParser(cls):
+    """
+    Set the configuration metadata and default configuration values of a module from its docstring.
+
+    The docstring is only parsed for the first instance of a class. All instances share the metadata, each one gets
+    its own copy of the default values.
+    """
     @functools.wraps(cls)
     def wrapper(*args, **kwargs):
         instance = cls(*args, **kwargs)
-        instance.configuration_metadata = {}
-        config_option_regex = "\s*(?P<name>.*?):.*?#\s*<(?P<props>.*?)>"
-        regex = re.compile(config_option_regex, re.MULTILINE)
-        docstring = ""
-        # Get docstring from parents. Only single inheritance supported.
-        for parent_class in cls.__bases__:
-            if parent_class.__doc__:
-                docstring += parent_class.__doc__
-        if cls.__doc__:
-            docstring += cls.__doc__
-        for matches in regex.finditer(docstring):
-            config_option_info = matches.groupdict()
-            for prop_info in config_option_info['props'].split(";"):
-                try:
-                    prop_name, prop_value = [m.strip() for m in prop_info.split(":", 1)]
-                    # Replace escaped backslashes.
-                    if "//" in prop_value:
-                        prop_value = codecs.escape_decode(prop_value)
-                except ValueError:
-                    instance.logger.debug("Could not parse config setting %s." % config_option_info)
-                    continue
-                if prop_name in ["default", "values"]:
-                    try:
-                        prop_value = ast.literal_eval(prop_value)
-                    except:
-                        etype, evalue, etb = sys.exc_info()
-                        instance.logger.error("Could not parse %s from docstring. Exception: %s, Error: %s." % (prop_value, etype, evalue))
-                        continue
-                    # Set default values in module configuration. Will be overwritten by custom values
-                    if prop_name == "default":
-                        instance.configuration_data[config_option_info['name'].strip()] = prop_value
-                    # Support for multiple datatypes using the pattern: "type: string||list;"
-                if prop_name == "type":
-                    prop_value = prop_value.split("||")
-                    prop_value.append('Unicode')
-                try:
-                    instance.configuration_metadata[config_option_info['name'].strip()].update({prop_name: prop_value})
-                except:
-                    instance.configuration_metadata[config_option_info['name'].strip()] = {prop_name: prop_value}
-        # Set self_hostname
+        try:
+            configuration_metadata, defaults = parsed_module_docstrings[cls]
+        except KeyError:
+            configuration_metadata, defaults = parsed_module_docstrings[cls] = parseModuleDocstring(cls, instance.logger)
+        instance.configuration_metadata = configuration_metadata
+        for name, value in defaults.items():
+            instance.configuration_data[name] = copy.deepcopy(value)
         return instance
 
     return wrapper
@@ -7,6 +7,144 @@ import pprint
 from string import Formatter
 
 from lumbermill.constants import MY_HOSTNAME
+from Decorators import memoize
+
+# Values of these types never need to be copied.
+try:
+    IMMUTABLE_TYPES = frozenset([str, unicode, int, long, float, bool, type(None)])
+except NameError:
+    IMMUTABLE_TYPES = frozenset([str, bytes, int, float, bool, type(None)])
+
+
+def copyValue(value):
+    """
+    Return a deep copy of value.
+    Nested dicts and lists are copied directly, which is a lot faster than copy.deepcopy.
+    """
+    value_type = type(value)
+    if value_type in IMMUTABLE_TYPES:
+        return value
+    if value_type is dict:
+        return {key: copyValue(item) for key, item in value.iteritems()}
+    if value_type is list:
+        return [copyValue(item) for item in value]
+    if isEventMetadata(value):
+        return value.copy()
+    return copy.deepcopy(value)
+
+
+# Unbound dict methods for code that needs to bypass KeyDotNotationDict.
+dict_contains = dict.__contains__
+dict_setitem = dict.__setitem__
+
+
+def isEventMetadata(value):
+    """
+    Class names are compared instead of classes, since this module might be imported via different paths
+    (e.g. utils.DictUtils and lumbermill.utils.DictUtils).
+    """
+    return type(value).__name__ == 'EventMetadata'
+
+
+def getEventId():
+    return "%032x%s" % (random.getrandbits(128), os.getpid())
+
+
+def materializeEventId(event):
+    """
+    Create the event_id of event, if it was not accessed before.
+    Needed before passing the event to serializers that read the dict internals directly.
+    """
+    metadata = dict.get(event, 'lumbermill')
+    if isEventMetadata(metadata):
+        metadata._materialize()
+
+
+class EventMetadata(dict):
+    """
+    The internal metadata of an event, stored in event['lumbermill'].
+
+    The event_id is only generated when it is first accessed. Most events never get their id read before they are
+    dropped or aggregated, so this saves a random number, a string and its formatting per event.
+    Reading, iterating or serializing the metadata creates the event_id, so it behaves like a plain dict containing
+    all fields. Only code that reads the dict internals directly, like dict(metadata) or C serializers such as ujson
+    and bson, will not see an event_id that was not accessed before. Sinks using these call materializeEventId first.
+    """
+
+    __slots__ = ()
+
+    def __missing__(self, key):
+        if key != 'event_id':
+            raise KeyError(key)
+        event_id = getEventId()
+        dict.__setitem__(self, 'event_id', event_id)
+        return event_id
+
+    def _materialize(self):
+        if not dict.__contains__(self, 'event_id'):
+            dict.__setitem__(self, 'event_id', getEventId())
+
+    def __contains__(self, key):
+        return key == 'event_id' or dict.__contains__(self, key)
+
+    has_key = __contains__
+
+    def __len__(self):
+        self._materialize()
+        return dict.__len__(self)
+
+    def __iter__(self):
+        self._materialize()
+        return dict.__iter__(self)
+
+    def __eq__(self, other):
+        self._materialize()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        self._materialize()
+        return dict.__repr__(self)
+
+    def __reduce_ex__(self, protocol):
+        self._materialize()
+        return (self.__class__, (dict(self),))
+
+    def get(self, key, default=None):
+        if key == 'event_id':
+            return self['event_id']
+        return dict.get(self, key, default)
+
+    def keys(self):
+        self._materialize()
+        return dict.keys(self)
+
+    def items(self):
+        self._materialize()
+        return dict.items(self)
+
+    def iteritems(self):
+        self._materialize()
+        return dict.iteritems(self)
+
+    def values(self):
+        self._materialize()
+        return dict.values(self)
+
+    def itervalues(self):
+        self._materialize()
+        return dict.itervalues(self)
+
+    def copy(self):
+        """Return a deep copy with a new, not yet generated event_id."""
+        new_metadata = self.__class__(self)
+        dict.pop(new_metadata, 'event_id', None)
+        for key, value in dict.iteritems(new_metadata):
+            if type(value) not in IMMUTABLE_TYPES:
+                dict.__setitem__(new_metadata, key, copyValue(value))
+        return new_metadata
 
 
 class KeyDotNotationDict(dict):
@@ -15,9 +153,25 @@ class KeyDotNotationDict(dict):
     >>> my_dict = {"key1": {"key2": "value"}}
     >>> my_dict["key1.key2"]
     "value"
+
+    Copies are copy-on-write, see copy().
     """
 
+    _shared_keys = None
+    """Top level keys whose values are shared with copies of this dict."""
+
     def __getitem__(self, key, item=None):
+        if item is None and self._shared_keys:
+            top_level_key = key.split('.', 1)[0]
+            if top_level_key in self._shared_keys:
+                # Mutable values returned from here might be modified by the caller.
+                if "." not in key:
+                    self._unshareKey(top_level_key)
+                else:
+                    value = self.__getitem__(key, super(KeyDotNotationDict, self))
+                    if type(value) in IMMUTABLE_TYPES:
+                        return value
+                    self._unshareKey(top_level_key)
         item = item if item is not None else super(KeyDotNotationDict, self)
         if "." not in key:
             if isinstance(item, list):
@@ -35,6 +189,8 @@ class KeyDotNotationDict(dict):
         return self.__getitem__(remaining_keys, item)
 
     def __setitem__(self, key, value, item=None):
+        if item is None and self._shared_keys:
+            self._prepareWrite(key)
         item = item if item is not None else super(KeyDotNotationDict, self)
         if "." not in key:
             if isinstance(item, list):
@@ -49,6 +205,8 @@ class KeyDotNotationDict(dict):
         return self.__setitem__(remaining_keys, value, item)
 
     def __delitem__(self, key, item=None):
+        if item is None and self._shared_keys:
+            self._prepareWrite(key)
         item = item if item is not None else super(KeyDotNotationDict, self)
         if "." not in key:
             if isinstance(item, list):
@@ -84,11 +242,82 @@ class KeyDotNotationDict(dict):
         raise KeyError(key)
 
     def copy(self):
-        new_dict = KeyDotNotationDict(copy.deepcopy(super(KeyDotNotationDict, self)))
-        if "event_id" in new_dict.get("lumbermill", {}):
-            new_dict['lumbermill']['event_id'] = "%032x%s" % (random.getrandbits(128), os.getpid())
+        """
+        Return a copy of this dict with a new event_id.
+
+        Mutable values are not copied right away. They are shared between this dict and the copy until one of
+        them accesses a shared value in a way that might modify it. Only then the accessed top level value gets
+        copied. So receivers that only read data from a copy do not pay for a deep copy.
+        """
+        new_dict = KeyDotNotationDict(self)
+        shared_keys = set([key for key, value in dict.iteritems(self) if type(value) not in IMMUTABLE_TYPES])
+        if shared_keys:
+            new_dict._shared_keys = shared_keys
+            self._shared_keys = set(shared_keys)
+        metadata = dict.get(new_dict, "lumbermill")
+        if isEventMetadata(metadata):
+            # Metadata is never shared, since the event_id is created on first access.
+            # The copied metadata will generate a new event_id.
+            new_dict._shared_keys.discard("lumbermill")
+            self._shared_keys.discard("lumbermill")
+            dict.__setitem__(new_dict, "lumbermill", metadata.copy())
+        elif metadata and "event_id" in metadata:
+            new_dict['lumbermill']['event_id'] = getEventId()
         return new_dict
 
+    def _unshareKey(self, key):
+        self._shared_keys.discard(key)
+        dict.__setitem__(self, key, copyValue(dict.__getitem__(self, key)))
+
+    def _unshareAllKeys(self):
+        for key in list(self._shared_keys):
+            self._unshareKey(key)
+
+    def _prepareWrite(self, key):
+        top_level_key = key.split('.', 1)[0]
+        if top_level_key not in self._shared_keys:
+            return
+        if "." in key:
+            self._unshareKey(top_level_key)
+        else:
+            # The shared value will be replaced or removed, no need to copy it.
+            self._shared_keys.discard(top_level_key)
+
+    def items(self):
+        if self._shared_keys:
+            self._unshareAllKeys()
+        return super(KeyDotNotationDict, self).items()
+
+    def iteritems(self):
+        if self._shared_keys:
+            self._unshareAllKeys()
+        return super(KeyDotNotationDict, self).iteritems()
+
+    def values(self):
+        if self._shared_keys:
+            self._unshareAllKeys()
+        return super(KeyDotNotationDict, self).values()
+
+    def itervalues(self):
+        if self._shared_keys:
+            self._unshareAllKeys()
+        return super(KeyDotNotationDict, self).itervalues()
+
+    def setdefault(self, key, default=None):
+        if self._shared_keys and key in self._shared_keys:
+            self._unshareKey(key)
+        return super(KeyDotNotationDict, self).setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        if not self._shared_keys:
+            return super(KeyDotNotationDict, self).update(*args, **kwargs)
+        shared_values = [(key, dict.__getitem__(self, key)) for key in self._shared_keys]
+        super(KeyDotNotationDict, self).update(*args, **kwargs)
+        # Replaced values are not shared anymore.
+        for key, value in shared_values:
+            if dict.get(self, key) is not value:
+                self._shared_keys.discard(key)
+
     def get(self, key, *args):
         try:
             return self.__getitem__(key)
@@ -117,6 +346,11 @@ class KeyDotNotationDict(dict):
             return default
 
     def pop(self, key, default=None, item=None):
+        if item is None and self._shared_keys:
+            # The popped value is returned to the caller, so a shared value needs to be copied.
+            top_level_key = key.split('.', 1)[0]
+            if top_level_key in self._shared_keys:
+                self._unshareKey(top_level_key)
         item = item if item else super(KeyDotNotationDict, self)
         if "." not in key:
             if not isinstance(item, list):
@@ -133,6 +367,179 @@ class KeyDotNotationDict(dict):
         except KeyError:
             return default
 
+
+class FieldPath(object):
+    """
+    A compiled accessor for a dot separated field path like 'lumbermill.event_type'.
+
+    The path is split and list indices are parsed only once. Modules should get their accessors via
+    compileFieldPath in their configure method, e.g.:
+
+    >>> event_type = compileFieldPath('lumbermill.event_type')
+    >>> event_type.get(event)
+    "httpd_access_log"
+
+    The semantics are the same as those of the corresponding KeyDotNotationDict methods, including copy-on-write.
+    """
+
+    __slots__ = ('path', 'top_level_key', 'segments', 'parent_segments', 'last_key', 'last_index')
+
+    def __init__(self, path):
+        self.path = path
+        keys = path.split('.')
+        self.top_level_key = keys[0]
+        self.segments = tuple([(key, toListIndex(key)) for key in keys[1:]])
+        self.parent_segments = self.segments[:-1]
+        self.last_key, self.last_index = self.segments[-1] if self.segments else (self.top_level_key, None)
+
+    def __repr__(self):
+        return "FieldPath(%r)" % self.path
+
+    def _walk(self, item, segments):
+        for key, index in segments:
+            if isinstance(item, list):
+                if index is None:
+                    raise KeyError(key)
+                try:
+                    item = item[index]
+                except IndexError:
+                    raise KeyError(key)
+            else:
+                try:
+                    item = item[key]
+                except (KeyError, IndexError, TypeError, AttributeError):
+                    raise KeyError(key)
+        return item
+
+    def _getParent(self, event):
+        return self._walk(dict.__getitem__(event, self.top_level_key), self.parent_segments)
+
+    def _isShared(self, event):
+        try:
+            shared_keys = event._shared_keys
+        except AttributeError:
+            return False
+        return shared_keys and self.top_level_key in shared_keys
+
+    def read(self, event):
+        """
+        Return the value for this path. Raises KeyError if the path does not exist.
+
+        Other than getValue, this will not copy a value shared with a copy of the event. So the returned value
+        must not be modified.
+        """
+        value = dict.__getitem__(event, self.top_level_key)
+        if self.segments:
+            return self._walk(value, self.segments)
+        return value
+
+    def peek(self, event, default=None):
+        """Like get, but the returned value might be shared with copies of the event and must not be modified."""
+        try:
+            return self.read(event)
+        except KeyError:
+            return default
+
+    def getValue(self, event):
+        """Return the value for this path. Raises KeyError if the path does not exist."""
+        if self._isShared(event):
+            # Let the event take care of copying the shared value.
+            return event[self.path]
+        value = dict.__getitem__(event, self.top_level_key)
+        if self.segments:
+            return self._walk(value, self.segments)
+        return value
+
+    def get(self, event, default=None):
+        try:
+            return self.getValue(event)
+        except KeyError:
+            return default
+
+    def contains(self, event):
+        if not self.segments:
+            return dict.__contains__(event, self.top_level_key)
+        try:
+            parent = self._getParent(event)
+        except KeyError:
+            return False
+        if isinstance(parent, list):
+            return self.last_index is not None and -len(parent) <= self.last_index < len(parent)
+        try:
+            return self.last_key in parent
+        except TypeError:
+            return False
+
+    def _prepareWrite(self, event):
+        if not self._isShared(event):
+            return
+        if self.segments:
+            event._unshareKey(self.top_level_key)
+        else:
+            # The shared value will be replaced or removed, no need to copy it.
+            event._shared_keys.discard(self.top_level_key)
+
+    def set(self, event, value):
+        """Set the value for this path. Raises KeyError if a parent of the path does not exist."""
+        self._prepareWrite(event)
+        if not self.segments:
+            dict.__setitem__(event, self.top_level_key, value)
+            return
+        parent = self._getParent(event)
+        try:
+            if isinstance(parent, list):
+                parent[self.last_index] = value
+            else:
+                parent[self.last_key] = value
+        except (IndexError, TypeError, AttributeError):
+            raise KeyError(self.last_key)
+
+    def delete(self, event):
+        """Delete the value for this path. Raises KeyError if the path does not exist."""
+        self._prepareWrite(event)
+        if not self.segments:
+            dict.__delitem__(event, self.top_level_key)
+            return
+        parent = self._getParent(event)
+        try:
+            if isinstance(parent, list):
+                del parent[self.last_index]
+            else:
+                del parent[self.last_key]
+        except (IndexError, TypeError, AttributeError):
+            raise KeyError(self.last_key)
+
+    def pop(self, event, default=None):
+        """Remove the value for this path and return it. Returns default if the path does not exist."""
+        if self._isShared(event):
+            # The popped value is returned to the caller, so a shared value needs to be copied.
+            event._unshareKey(self.top_level_key)
+        if not self.segments:
+            return dict.pop(event, self.top_level_key, default)
+        try:
+            parent = self._getParent(event)
+            if isinstance(parent, list):
+                return parent.pop(self.last_index)
+            return parent.pop(self.last_key, default)
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return default
+
+
+def toListIndex(key):
+    try:
+        return int(key)
+    except ValueError:
+        return None
+
+
+@memoize(maxlen=10000)
+def compileFieldPath(path):
+    """
+    Return a cached FieldPath accessor for a dot separated field path.
+    """
+    return FieldPath(path)
+
+
 class DotDictFormatter(Formatter):
     try:  # deal with Py 2 & 3 difference
         NUMERICS = (int, long)
@@ -164,16 +571,14 @@ def mergeNestedDicts(a, b, path=None):
     return a
 
 def getDefaultEventDict(dict={}, caller_class_name='', received_from="Unknown", event_type="Unknown"):
-    default_dict = { "data": "",
-                     "lumbermill": {
-                         'pid': os.getpid(),
-                         'event_type': event_type,
-                         'event_id': "%032x%s" % (random.getrandbits(128), os.getpid()),
-                         'source_module': caller_class_name,
-                         'received_from': received_from,
-                         'received_by': MY_HOSTNAME
-                     }
-                }
-    default_dict.update(dict)
-    default_dict = KeyDotNotationDict(default_dict)
+    default_dict = KeyDotNotationDict(dict)
+    # Plain dict methods are used, since a new event has no dotted keys or shared values to take care of.
+    if not dict_contains(default_dict, "data"):
+        dict_setitem(default_dict, "data", "")
+    if not dict_contains(default_dict, "lumbermill"):
+        dict_setitem(default_dict, "lumbermill", EventMetadata(pid=os.getpid(),
+                                                               event_type=event_type,
+                                                               source_module=caller_class_name,
+                                                               received_from=received_from,
+                                                               received_by=MY_HOSTNAME))
     return default_dict
\ No newline at end of file
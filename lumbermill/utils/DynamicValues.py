@@ -1,13 +1,18 @@
 # -*- coding: utf-8 -*-
 import sys
 import ast
+import time
 import logging
 import datetime
 import re
 
+from DictUtils import compileFieldPath
+
 GP_DYNAMIC_VAL_REGEX = re.compile('[\$|%]\(([^\)]*)\)')
-GP_DYNAMIC_VAL_REGEX_WITH_TYPES = re.compile('[\$|%]\(([^\)]*)\)(-?\d*[-\.\*]?\d*[sdf]?)')
+# A format suffix is only part of the dynamic value if no identifier follows, e.g. in $(url).startswith('GET').
+GP_DYNAMIC_VAL_REGEX_WITH_TYPES = re.compile('[\$|%]\(([^\)]*)\)(-?\d*[-\.\*]?\d*[sdf](?!\w))?')
 PYTHON_DYNAMIC_VAL_REGEX = re.compile('%\((.*?)\)')
+PYTHON_DYNAMIC_VAL_REGEX_WITH_FORMAT = re.compile('%\(([^\)]*)\)([#0\- +]*\d*(?:\.\d+)?[diouxXeEfFgGcrs])')
 DYNAMIC_VALUE_REPLACE_PATTERN = r"%(\1)"
 
 
@@ -71,16 +76,9 @@ def parseDynamicValuesInString(value):
     parsed:
     filter: %(lumbermill.source_module)s == 'TcpServer'
     """
-    matches = GP_DYNAMIC_VAL_REGEX_WITH_TYPES.search(value)
-    if not matches:
-        return value
     # Get custom format if set.
     # Defaults to string.
-    if matches.group(2):
-        replace_pattern = DYNAMIC_VALUE_REPLACE_PATTERN + matches.group(2)
-    else:
-        replace_pattern = DYNAMIC_VALUE_REPLACE_PATTERN + "s"
-    return GP_DYNAMIC_VAL_REGEX_WITH_TYPES.sub(replace_pattern, value)
+    return GP_DYNAMIC_VAL_REGEX_WITH_TYPES.sub(lambda match: "%%(%s)%s" % (match.group(1), match.group(2) or "s"), value)
 
 def parseDynamicValuesInList(value_list, contains_dynamic_value):
     # Copy list since we might change it during iteration.
@@ -130,7 +128,46 @@ def parseDynamicValue(value):
             contains_dynamic_value.append(True)
     return {'value': value, 'contains_dynamic_value': bool(contains_dynamic_value)}
 
-def mapDynamicValueInString(value, mapping_dict, use_strftime=False):
+field_paths_in_string = {}
+
+def getFieldPathsInString(value):
+    """
+    Return compiled field paths for all %(field)s style dynamic values in value.
+    """
+    try:
+        return field_paths_in_string[value]
+    except KeyError:
+        pass
+    field_paths = tuple([compileFieldPath(field_name) for field_name in set(PYTHON_DYNAMIC_VAL_REGEX.findall(value))])
+    # Values are mostly configuration strings. Still, keep the cache bounded in case of dynamic keys.
+    if len(field_paths_in_string) > 10000:
+        field_paths_in_string.clear()
+    field_paths_in_string[value] = field_paths
+    return field_paths
+
+def resolveFieldPaths(field_paths, event):
+    """
+    Return a plain dict with the values of all given field paths.
+
+    Formatting a string with a KeyDotNotationDict will split each dotted key on every call. Resolving the fields via
+    compiled field paths and formatting with a plain dict is considerably faster.
+    Missing fields are left out, so formatting will raise a KeyError as before.
+    """
+    resolved_values = {}
+    for field_path in field_paths:
+        try:
+            resolved_values[field_path.path] = field_path.read(event)
+        except KeyError:
+            pass
+    return resolved_values
+
+def renderDynamicValueInString(value, mapping_dict, use_strftime=False):
+    """
+    Map a string with dynamic values without compiling it first.
+
+    Only used for strings a DynamicValueTemplate can not handle, e.g. ones with python format characters other than
+    the dynamic values.
+    """
     try:
         if use_strftime:
             if sys.platform.startswith('linux'):
@@ -145,6 +182,10 @@ def mapDynamicValueInString(value, mapping_dict, use_strftime=False):
                 value = PYTHON_DYNAMIC_VAL_REGEX.sub(r"$(\1)", value)
                 value = datetime.datetime.utcnow().strftime(value)
                 value = GP_DYNAMIC_VAL_REGEX.sub(r"%(\1)", value)
+        if mapping_dict.__class__.__name__ == 'KeyDotNotationDict':
+            field_paths = getFieldPathsInString(value)
+            if field_paths:
+                return value % resolveFieldPaths(field_paths, mapping_dict)
         return value % mapping_dict # dot_dict_formatter.format(value, **mapping_dict)
     except KeyError:
         return value
@@ -153,6 +194,182 @@ def mapDynamicValueInString(value, mapping_dict, use_strftime=False):
         logging.getLogger("mapDynamicValueInString").error("Mapping failed for %s. Mapping data: %s. Exception: %s, Error: %s." % (value, mapping_dict, etype, evalue))
         raise
 
+
+class DynamicValueTemplate:
+    """
+    A string with dynamic values, compiled once and rendered for many events.
+
+    The static parts of the string are pre-joined to a positional format string and the referenced fields are read
+    via compiled field paths. E.g. the template:
+    lumbermill-%Y.%m.%d-%(lumbermill.event_type)s
+    renders as:
+    'lumbermill-2016.05.04-%s' % (read_event_type(event),)
+    With use_strftime, the time patterns are only applied to the static parts and the result is cached per second.
+
+    Just as before, a missing field renders the template unchanged and an incompatible format raises a
+    ValueError or TypeError.
+    Strings with python format characters other than the dynamic values are rendered via renderDynamicValueInString.
+    """
+    def __init__(self, value, use_strftime=False):
+        self.value = value
+        self.use_strftime = use_strftime
+        self.static_parts = []
+        self.field_names = []
+        self.field_readers = []
+        self.field_formats = []
+        self.field_references = []
+        position = 0
+        for match in PYTHON_DYNAMIC_VAL_REGEX_WITH_FORMAT.finditer(value):
+            self.static_parts.append(value[position:match.start()])
+            self.field_names.append(match.group(1))
+            self.field_readers.append(compileFieldPath(match.group(1)).read)
+            self.field_formats.append("%" + match.group(2))
+            self.field_references.append(match.group(0))
+            position = match.end()
+        self.static_parts.append(value[position:])
+        self.compiled = True
+        if not use_strftime:
+            if "%" in "".join(self.static_parts).replace("%%", ""):
+                self.compiled = False
+            self.static_parts = [static_part.replace("%%", "%") for static_part in self.static_parts]
+        self.is_static = self.compiled and not self.field_names and not use_strftime
+        if self.is_static:
+            self.static_value = "".join(self.static_parts)
+        self.format_string = self.buildFormatString(self.static_parts)
+        # Microseconds change within a second, so these templates can not be cached per second.
+        self.cache_strftime = "%f" not in value
+        self.strftime_cache = (None, None, None)
+
+    def buildFormatString(self, static_parts):
+        format_parts = [static_parts[0].replace("%", "%%")]
+        for field_format, static_part in zip(self.field_formats, static_parts[1:]):
+            format_parts.extend((field_format, static_part.replace("%", "%%")))
+        return "".join(format_parts)
+
+    def getStrftimeFormat(self):
+        """
+        Return the format string and the unmapped value with the time patterns applied.
+        """
+        now = time.time()
+        second = int(now)
+        cached_second, format_string, unmapped_value = self.strftime_cache
+        if second == cached_second:
+            return format_string, unmapped_value
+        now = datetime.datetime.utcfromtimestamp(second if self.cache_strftime else now)
+        static_parts = [now.strftime(static_part) for static_part in self.static_parts]
+        format_string = self.buildFormatString(static_parts)
+        unmapped_parts = [static_parts[0]]
+        for field_reference, static_part in zip(self.field_references, static_parts[1:]):
+            unmapped_parts.extend((field_reference, static_part))
+        unmapped_value = "".join(unmapped_parts)
+        if self.cache_strftime:
+            # Set all at once, so other threads never see values of a different second.
+            self.strftime_cache = (second, format_string, unmapped_value)
+        return format_string, unmapped_value
+
+    def render(self, mapping_dict):
+        if self.is_static:
+            return self.static_value
+        if not self.compiled:
+            return renderDynamicValueInString(self.value, mapping_dict, self.use_strftime)
+        if self.use_strftime:
+            format_string, unmapped_value = self.getStrftimeFormat()
+        else:
+            format_string, unmapped_value = self.format_string, self.value
+        try:
+            if mapping_dict.__class__.__name__ == 'KeyDotNotationDict':
+                field_values = tuple([read(mapping_dict) for read in self.field_readers])
+            else:
+                field_values = tuple([mapping_dict[field_name] for field_name in self.field_names])
+            return format_string % field_values
+        except KeyError:
+            return unmapped_value
+        except (ValueError, TypeError):
+            etype, evalue, etb = sys.exc_info()
+            logging.getLogger("mapDynamicValueInString").error("Mapping failed for %s. Mapping data: %s. Exception: %s, Error: %s." % (self.value, mapping_dict, etype, evalue))
+            raise
+
+    __call__ = render
+
+
+class DynamicValueListTemplate:
+
+    def __init__(self, value, use_strftime=False):
+        self.value = value
+        self.templates = [compileDynamicValue(item, use_strftime) for item in value]
+        self.is_static = all([template.is_static for template in self.templates])
+
+    def render(self, mapping_dict):
+        if self.is_static:
+            return self.value
+        return [template.render(mapping_dict) for template in self.templates]
+
+    __call__ = render
+
+
+class DynamicValueDictTemplate:
+
+    def __init__(self, value, use_strftime=False):
+        self.value = value
+        self.templates = [(compileDynamicValue(key, use_strftime), compileDynamicValue(item, use_strftime)) for key, item in value.items()]
+        self.is_static = all([key_template.is_static and template.is_static for key_template, template in self.templates])
+
+    def render(self, mapping_dict):
+        if self.is_static:
+            return self.value
+        return dict([(key_template.render(mapping_dict), template.render(mapping_dict)) for key_template, template in self.templates])
+
+    __call__ = render
+
+
+class StaticValue:
+
+    is_static = True
+
+    def __init__(self, value):
+        self.value = value
+
+    def render(self, mapping_dict):
+        return self.value
+
+    __call__ = render
+
+
+string_templates = {}
+strftime_string_templates = {}
+
+def compileDynamicValue(value, use_strftime=False):
+    """
+    Compile a configuration value to a template, @see: DynamicValueTemplate.
+
+    Lists and dicts are compiled recursively. All templates offer render(mapping_dict) and is_static. Static
+    templates render to the value itself.
+    """
+    if isinstance(value, basestring):
+        templates = strftime_string_templates if use_strftime else string_templates
+        try:
+            return templates[value]
+        except KeyError:
+            pass
+        template = DynamicValueTemplate(value, use_strftime)
+        # Values are mostly configuration strings. Still, keep the cache bounded in case of dynamic keys.
+        if len(templates) > 10000:
+            templates.clear()
+        templates[value] = template
+        return template
+    if isinstance(value, list):
+        return DynamicValueListTemplate(value, use_strftime)
+    if isinstance(value, dict):
+        return DynamicValueDictTemplate(value, use_strftime)
+    return StaticValue(value)
+
+def mapDynamicValueInString(value, mapping_dict, use_strftime=False):
+    try:
+        template = (strftime_string_templates if use_strftime else string_templates)[value]
+    except KeyError:
+        template = compileDynamicValue(value, use_strftime)
+    return template.render(mapping_dict)
+
 def mapDynamicValueInList(value_list, mapping_dict, use_strftime=False):
     for idx, value in enumerate(value_list):
         if isinstance(value, list):
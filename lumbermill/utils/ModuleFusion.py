@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import inspect
+import logging
+
+
+class ModuleFusion:
+    """
+    Fuse chains of directly connected modules into a single call path.
+
+    Modules that are connected without a queue call each other via sendEvent -> receiveEvent -> handleEvent.
+    Each hop goes through the input filter wrapper, a generator, commonActions and the receivers dict.
+    For a module with exactly one direct receiver and no output filters, this class replaces sendEvent/sendEvents
+    with closures that call the receivers (fused) receive method directly. Modules that implement processEvent
+    instead of handleEvent are called without creating a generator.
+    No-op commonActions are skipped.
+    Modules with statistics enabled keep their instrumented receive methods, @see: BaseModule.enableStatistics.
+
+    Fusion runs at startup, after all modules are configured and connected.
+    """
+
+    def __init__(self, lumbermill):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.lumbermill = lumbermill
+        self.visited_modules = set()
+        self.fused_receivers = set()
+        self.fused_hops = 0
+
+    def fuseModules(self, modules):
+        """
+        Fuse all module instances.
+
+        @param modules: dictionary of module infos as used by LumberMill.
+        @return: number of fused hops.
+        """
+        for module_name, module_info in modules.items():
+            for instance in module_info['instances']:
+                self.fuseModule(instance)
+        return self.fused_hops
+
+    def fuseModule(self, module):
+        if id(module) in self.visited_modules:
+            return
+        self.visited_modules.add(id(module))
+        receiver = self.getFusableReceiver(module)
+        if not receiver:
+            return
+        # Fuse the tail of the chain first, so the receivers sendEvent is already the fused one.
+        self.fuseModule(receiver)
+        self.fuseReceiver(receiver)
+        self.fuseSender(module, receiver)
+        self.fused_hops += 1
+        self.logger.debug("Fused %s -> %s." % (module.__class__.__name__, receiver.__class__.__name__))
+
+    def getFusableReceiver(self, module):
+        if module.output_filters or len(module.receivers) != 1:
+            return None
+        if isOverridden(module, 'sendEvent') or isOverridden(module, 'sendEvents'):
+            return None
+        receiver = module.receivers.values()[0]
+        # Queues are no fusion candidates.
+        if receiver is module or not hasattr(receiver, 'handleEvent'):
+            return None
+        if isOverridden(receiver, 'receiveEvent') or isOverridden(receiver, 'receiveEvents'):
+            return None
+        return receiver
+
+    def fuseReceiver(self, module):
+        """
+        Replace receiveEvent/receiveEvents of modules implementing processEvent with a direct call path.
+        An input filter is reapplied on top of the fused methods.
+        """
+        if id(module) in self.fused_receivers or not isProcessEventModule(module) or module.module_statistics is not None:
+            return
+        self.fused_receivers.add(id(module))
+        process_event = module.processEvent
+        send_event = module.sendEvent
+        send_events = module.sendEvents
+
+        def receiveEvent(event):
+            event = process_event(event)
+            if event:
+                send_event(event)
+
+        def receiveEvents(events):
+            handled_events = []
+            for event in events:
+                event = process_event(event)
+                if event:
+                    handled_events.append(event)
+            if handled_events:
+                send_events(handled_events)
+
+        module.receiveEvent = receiveEvent
+        module.receiveEvents = receiveEvents
+        if module.input_filter:
+            module.wrapReceiveEventWithFilter(module.input_filter, module.input_filter_string)
+
+    def fuseSender(self, module, receiver):
+        receive_event = receiver.receiveEvent
+        receive_events = receiver.receiveEvents
+        if module.has_common_actions:
+            common_actions = module.commonActions
+
+            def sendEvent(event, apply_common_actions=True):
+                if apply_common_actions:
+                    event = common_actions(event)
+                receive_event(event)
+
+            def sendEvents(events, apply_common_actions=True):
+                if not events:
+                    return
+                if apply_common_actions:
+                    events = [common_actions(event) for event in events]
+                receive_events(events)
+        else:
+            def sendEvent(event, apply_common_actions=True):
+                receive_event(event)
+
+            def sendEvents(events, apply_common_actions=True):
+                if events:
+                    receive_events(events)
+        module.sendEvent = sendEvent
+        module.sendEvents = sendEvents
+
+
+def getDefiningClassName(instance, method_name):
+    """
+    Return the name of the class that defines method_name for instance.
+    Returns None if the method was set on the instance itself.
+
+    Class names are compared instead of class objects, since the base modules might be imported via
+    different paths (e.g. BaseModule and lumbermill.BaseModule).
+    """
+    if method_name in instance.__dict__:
+        return None
+    for cls in inspect.getmro(instance.__class__):
+        if method_name in cls.__dict__:
+            return cls.__name__
+    return None
+
+
+def isOverridden(instance, method_name):
+    """Check if a module class overrides a method of BaseModule."""
+    defining_class_name = getDefiningClassName(instance, method_name)
+    return defining_class_name is not None and defining_class_name != 'BaseModule'
+
+
+def isProcessEventModule(instance):
+    """Check if a module implements processEvent and uses the default handleEvent."""
+    return getDefiningClassName(instance, 'handleEvent') == 'BaseModule' and isOverridden(instance, 'processEvent')
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import importlib
+
+
+class ModuleRegistry:
+    """
+    Map module names to their import paths, without importing them.
+
+    The module directories are only listed on startup. A module, and the libraries it depends on, is imported when
+    its class is first requested. So a configuration only pays for the modules it actually uses.
+    Names not found in the module directories are imported as they are, e.g. custom modules on the python path.
+
+    The time spent on importing each module is recorded for the startup profile.
+    """
+
+    def __init__(self, base_path, module_dirs):
+        self.import_paths = {}
+        self.import_times = {}
+        for module_dir in module_dirs:
+            module_path = os.path.join(base_path, module_dir)
+            if not os.path.isdir(module_path):
+                continue
+            for filename in sorted(os.listdir(module_path)):
+                module_name, extension = os.path.splitext(filename)
+                if extension != ".py" or module_name.startswith("_"):
+                    continue
+                # If a name exists in multiple directories, the first one wins. Same as with the module dirs on sys.path.
+                self.import_paths.setdefault(module_name, "lumbermill.%s.%s" % (module_dir, module_name))
+
+    def getModuleNames(self):
+        return sorted(self.import_paths.keys())
+
+    def getImportPath(self, module_name):
+        return self.import_paths.get(module_name, module_name)
+
+    def getModuleClass(self, module_name):
+        """
+        Import a module and return its class. Raises ImportError if the module or one of its dependencies is missing.
+        """
+        started_at = time.time()
+        module = importlib.import_module(self.getImportPath(module_name))
+        # Only the first import does the actual work.
+        self.import_times.setdefault(module_name, time.time() - started_at)
+        try:
+            return getattr(module, module_name)
+        except AttributeError:
+            raise ImportError("%s does not define a module class named %s." % (self.getImportPath(module_name), module_name))
@@ -1,16 +1,35 @@
 # -*- coding: utf-8 -*-
+import cPickle
 import multiprocessing
 import Decorators
 
 
 @Decorators.Singleton
 class MultiProcessDataStore:
+    """
+    A key/value store for small values, shared by all LumberMill processes.
 
-    def __init__(self):
-        self.lock = multiprocessing.Lock()
-        self.sync_manager = multiprocessing.Manager()
-        self.data_dict = self.sync_manager.dict()
-        """ Stores the statistic data """
+    The data is kept as a pickled snapshot in shared memory, together with a version number. Each process keeps an
+    unpickled copy of the snapshot. A read only compares the shared version with the version of the local copy and
+    then looks up the key in the local dict. Only if the version changed, the snapshot is read again.
+
+    Writers are serialized by a lock and write a new snapshot. So a write is visible to all processes with their next
+    read. Setting a key to the value it already has does not write a new snapshot.
+    Readers do not take the lock. The version is odd while a snapshot is written, a reader retries if the version
+    was odd or changed while it copied the snapshot.
+
+    Needs to be created before the workers are forked.
+    """
+
+    def __init__(self, max_size=1024 * 1024):
+        self.max_size = max_size
+        # Reentrant, so a process can hold the lock, e.g. via acquireLock, while calling setValue.
+        self.lock = multiprocessing.RLock()
+        self.version = multiprocessing.RawValue('L', 0)
+        self.snapshot_size = multiprocessing.RawValue('L', 0)
+        self.snapshot = multiprocessing.RawArray('c', max_size)
+        self.local_version = 0
+        self.data_dict = {}
 
     def acquireLock(self):
         self.lock.acquire()
@@ -18,24 +37,51 @@ class MultiProcessDataStore:
     def releaseLock(self):
         self.lock.release()
 
+    def refresh(self):
+        """ Update the local copy, if another process wrote a new snapshot. """
+        while True:
+            version = self.version.value
+            if version == self.local_version:
+                return
+            if version % 2:
+                continue
+            snapshot = self.snapshot[:self.snapshot_size.value]
+            if self.version.value != version:
+                continue
+            self.data_dict = cPickle.loads(snapshot) if snapshot else {}
+            self.local_version = version
+            return
+
     def setValue(self, key, value):
+        # Skip writes that would not change anything, e.g. set_internal with the same value for each event.
+        if self.version.value == self.local_version and key in self.data_dict and self.data_dict[key] == value:
+            return
         with self.lock:
-            try:
-                self.data_dict[key] = value
-            except OSError:
-                # OSError: [Errno 32] Broken pipe may be thrown when exiting lumbermill via CTRL+C. Ignore it
-                pass
+            self.refresh()
+            data_dict = dict(self.data_dict)
+            data_dict[key] = value
+            snapshot = cPickle.dumps(data_dict, cPickle.HIGHEST_PROTOCOL)
+            if len(snapshot) > self.max_size:
+                raise ValueError("Could not set %s. Internal datastore would exceed its size of %s bytes." % (key, self.max_size))
+            version = self.version.value
+            self.version.value = version + 1
+            self.snapshot[:len(snapshot)] = snapshot
+            self.snapshot_size.value = len(snapshot)
+            self.version.value = version + 2
+            self.data_dict = data_dict
+            self.local_version = version + 2
 
-    def getValue(self, key, value):
-        with self.lock:
-            try:
-                self.data_dict[key] = value
-            except OSError:
-                # OSError: [Errno 32] Broken pipe may be thrown when exiting lumbermill via CTRL+C. Ignore it
-                pass
+    def getValue(self, key):
+        """ Raises KeyError if key is not set. """
+        if self.version.value != self.local_version:
+            self.refresh()
+        return self.data_dict[key]
 
     def getDataDict(self):
-        return self.data_dict
+        """ Returns a copy of all values. Changes to it are not stored, use setValue. """
+        self.refresh()
+        return dict(self.data_dict)
 
     def shutDown(self):
-        self.sync_manager.shutdown()
\ No newline at end of file
+        # Shared memory is released with the last process.
+        pass
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import sys
+from collections import OrderedDict
+
+from DictUtils import compileFieldPath
+
+
+class LookupCounter:
+    """ Counts the lookups of a lookup table. Shared by the filters replaced by the table. """
+    def __init__(self):
+        self.evaluations = 0
+
+
+class OutputRouter:
+    """
+    Route events to the receivers of a module with output filters.
+
+    The routing is precomputed once all receivers are known:
+    - Receivers without a filter get every event.
+    - Filters that only test a field for equality with literals, like $(lumbermill.event_type) == 'httpd_access_log',
+      are grouped by field. Per field, the field is read once and the matching receivers are found with a single hash
+      lookup, no matter how many receivers test the field.
+    - All other filters are evaluated one by one.
+
+    For each combination of matching receivers, the receivers dict and its copy plan are only built once.
+
+    Filters replaced by a lookup are not called. So the router counts the lookups per field and the matches per
+    receiver for them, to keep the filter statistics complete, @see: CompiledFilter.resetStats.
+    """
+
+    def __init__(self, module):
+        self.module = module
+        self.logger = module.logger
+        self.static_receiver_names = []
+        self.lookup_tables = OrderedDict()
+        self.filtered_receivers = []
+        self.lookup_filters = {}
+        self.routes = {}
+        for receiver_name in module.receivers:
+            output_filter = module.output_filters.get(receiver_name)
+            if not output_filter:
+                self.static_receiver_names.append(receiver_name)
+                continue
+            equality_test = getattr(output_filter, 'equality_test', None)
+            if not equality_test:
+                self.filtered_receivers.append((receiver_name, output_filter))
+                continue
+            field_name, values = equality_test
+            try:
+                field_path, lookup_table, lookup_counter = self.lookup_tables[field_name]
+            except KeyError:
+                field_path, lookup_table, lookup_counter = self.lookup_tables[field_name] = (compileFieldPath(field_name), {}, LookupCounter())
+            output_filter.setLookupCounter(lookup_counter)
+            self.lookup_filters[receiver_name] = output_filter
+            for value in values:
+                receiver_names = lookup_table.setdefault(value, [])
+                if receiver_name not in receiver_names:
+                    receiver_names.append(receiver_name)
+        self.lookup_tables = self.lookup_tables.values()
+
+    def getMatchingReceiverNames(self, event):
+        receiver_names = []
+        for field_path, lookup_table, lookup_counter in self.lookup_tables:
+            lookup_counter.evaluations += 1
+            try:
+                # Missing fields are False, just as in filters.
+                matching_receiver_names = lookup_table.get(field_path.peek(event, False), ())
+            except TypeError:
+                # Unhashable values can not be equal to any of the literals.
+                continue
+            for receiver_name in matching_receiver_names:
+                self.lookup_filters[receiver_name].matches += 1
+            receiver_names.extend(matching_receiver_names)
+        for receiver_name, output_filter in self.filtered_receivers:
+            try:
+                matched = output_filter(self.module.lumbermill, event)
+            except:
+                etype, evalue, etb = sys.exc_info()
+                self.logger.warning("Output filter for %s failed. Exception: %s, Error: %s." % (receiver_name, etype, evalue))
+                continue
+            if matched:
+                receiver_names.append(receiver_name)
+        return tuple(receiver_names)
+
+    def route(self, event):
+        """
+        Return the receivers for event and their copy plan, @see: BaseModule.getReceiverCopyPlan.
+        """
+        route_key = self.getMatchingReceiverNames(event)
+        try:
+            return self.routes[route_key]
+        except KeyError:
+            pass
+        receivers = OrderedDict()
+        for receiver_name in self.static_receiver_names + list(route_key):
+            receivers[receiver_name] = self.module.receivers[receiver_name]
+        route = self.routes[route_key] = (receivers, self.module.getReceiverCopyPlan(receivers))
+        return route
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import time
+import errno
+import thread
+
+# Python frames in these files mean a thread is waiting for work, e.g. in Queue.get or Condition.wait.
+WAITING_FILES = ('threading.py', 'Queue.py', 'queue.py', 'selectors.py', 'connection.py', 'ioloop.py')
+# Idle loops of the LumberMill processes, as (file, function).
+WAITING_FUNCTIONS = (('LumberMill.py', 'run'),)
+
+
+class SamplingProfiler:
+    """
+    Sample the stacks of all threads in this process in fixed intervals.
+
+    Modules run in their own threads, so a cProfile profiler, which only profiles the thread it was enabled in,
+    would miss most of the work. Sampling sys._current_frames() sees all threads, and its overhead does not grow with
+    the number of function calls.
+
+    Each sample is attributed to the innermost module class on the stack. Samples of threads waiting for events are
+    counted as waiting. Times are wall clock times.
+    """
+
+    def __init__(self, module_files, interval=0.005):
+        # Map module source files, without extension, to the module class names.
+        self.module_files = module_files
+        self.interval = interval
+        self.file_modules = {}
+        self.waiting_codes = {}
+        self.samples = 0
+        self.module_samples = {}
+        self.function_samples = {}
+
+    def getModuleName(self, filename):
+        try:
+            return self.file_modules[filename]
+        except KeyError:
+            module_name = self.file_modules[filename] = self.module_files.get(os.path.splitext(os.path.abspath(filename))[0])
+            return module_name
+
+    def isWaiting(self, code):
+        try:
+            return self.waiting_codes[code]
+        except KeyError:
+            filename = os.path.basename(code.co_filename)
+            is_waiting = self.waiting_codes[code] = filename in WAITING_FILES or (filename, code.co_name) in WAITING_FUNCTIONS
+            return is_waiting
+
+    def addSample(self, frame):
+        self.samples += 1
+        module_name = 'waiting' if self.isWaiting(frame.f_code) else None
+        seen_functions = set()
+        is_innermost = True
+        while frame is not None:
+            code = frame.f_code
+            function = (code.co_filename, code.co_firstlineno, code.co_name)
+            if function not in seen_functions:
+                seen_functions.add(function)
+                try:
+                    counters = self.function_samples[function]
+                except KeyError:
+                    counters = self.function_samples[function] = [0, 0]
+                if is_innermost:
+                    counters[0] += 1
+                    is_innermost = False
+                counters[1] += 1
+            if module_name is None:
+                module_name = self.getModuleName(code.co_filename)
+            frame = frame.f_back
+        module_name = module_name or 'other'
+        self.module_samples[module_name] = self.module_samples.get(module_name, 0) + 1
+
+    def sample(self, duration):
+        """ Sample all other threads for duration seconds. Blocks the calling thread. """
+        own_thread_id = thread.get_ident()
+        stop_at = time.time() + duration
+        while time.time() < stop_at:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_thread_id:
+                    self.addSample(frame)
+            time.sleep(self.interval)
+
+    def getProfile(self):
+        return {'samples': self.samples,
+                'interval': self.interval,
+                'modules': self.module_samples,
+                'functions': [[filename, lineno, name, self_samples, cumulative_samples] for (filename, lineno, name), (self_samples, cumulative_samples) in self.function_samples.items()]}
+
+
+def makeDirectory(path):
+    """ Create path. Master and workers create the same run directory, so an existing directory is fine. """
+    try:
+        os.makedirs(path)
+    except OSError:
+        etype, evalue, etb = sys.exc_info()
+        if evalue.errno != errno.EEXIST:
+            raise
+
+
+def writeProfile(profile, path):
+    with open(path, 'w') as profile_file:
+        json.dump(profile, profile_file)
+
+
+def readProfiles(paths):
+    profiles = []
+    for path in paths:
+        with open(path) as profile_file:
+            profiles.append(json.load(profile_file))
+    return profiles
+
+
+def waitForProfiles(paths, timeout):
+    """ Wait until all profiles were written. Returns the paths of the profiles that exist. """
+    wait_until = time.time() + timeout
+    while time.time() < wait_until:
+        if all(os.path.exists(path) for path in paths):
+            break
+        time.sleep(.5)
+    return [path for path in paths if os.path.exists(path)]
+
+
+def mergeProfiles(profiles):
+    merged_profile = {'samples': 0, 'interval': 0, 'modules': {}, 'functions': []}
+    function_samples = {}
+    for profile in profiles:
+        merged_profile['samples'] += profile['samples']
+        merged_profile['interval'] = max(merged_profile['interval'], profile['interval'])
+        for module_name, samples in profile['modules'].items():
+            merged_profile['modules'][module_name] = merged_profile['modules'].get(module_name, 0) + samples
+        for filename, lineno, name, self_samples, cumulative_samples in profile['functions']:
+            counters = function_samples.setdefault((filename, lineno, name), [0, 0])
+            counters[0] += self_samples
+            counters[1] += cumulative_samples
+    merged_profile['functions'] = [[filename, lineno, name, self_samples, cumulative_samples] for (filename, lineno, name), (self_samples, cumulative_samples) in function_samples.items()]
+    return merged_profile
+
+
+def formatProfile(profile, max_functions=30):
+    """ Format a profile as a text summary. Busy percentages do not include samples of waiting threads. """
+    samples = max(profile['samples'], 1)
+    busy_samples = max(samples - profile['modules'].get('waiting', 0), 1)
+    lines = ["%d samples, %.1fms interval." % (profile['samples'], profile['interval'] * 1000), "",
+             "%-40s %10s %8s" % ("Module", "samples", "busy %")]
+    for module_name, module_samples in sorted(profile['modules'].items(), key=lambda x: x[1], reverse=True):
+        if module_name == 'waiting':
+            lines.append("%-40s %10d %8s" % (module_name, module_samples, "-"))
+            continue
+        lines.append("%-40s %10d %8.2f" % (module_name, module_samples, 100.0 * module_samples / busy_samples))
+    lines.extend(["", "%-80s %8s %12s" % ("Function (by self samples)", "self %", "cumulative %")])
+    for filename, lineno, name, self_samples, cumulative_samples in sorted(profile['functions'], key=lambda x: x[3], reverse=True)[:max_functions]:
+        function = "%s:%d(%s)" % (filename, lineno, name)
+        lines.append("%-80s %8.2f %12.2f" % (function[-80:], 100.0 * self_samples / samples, 100.0 * cumulative_samples / samples))
+    return "\n".join(lines) + "\n"
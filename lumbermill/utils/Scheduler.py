@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import heapq
+import logging
+import itertools
+import threading
+
+
+class ScheduledFunction:
+    """
+    Handle for a function that is called repeatedly by the Scheduler.
+
+    set() stops the function, just like setting the threading.Event returned by the former thread based setInterval.
+    Blocking functions are called in a thread of their own, so they do not delay the other timers.
+    """
+    def __init__(self, scheduler, function, interval, max_run_count=0, blocking=False):
+        self.scheduler = scheduler
+        self.function = function
+        self.interval = interval
+        self.max_run_count = max_run_count
+        self.blocking = blocking
+        self.run_count = 0
+        self.due = None
+        self.stopped = False
+
+    def set(self):
+        self.stopped = True
+
+    def is_set(self):
+        return self.stopped
+
+    def reschedule(self, delay=None):
+        """
+        Postpone the next call to delay seconds from now. Defaults to the interval.
+        """
+        if self.stopped:
+            return
+        self.scheduler.schedule(self, self.interval if delay is None else delay)
+
+
+class Scheduler:
+    """
+    Call functions in intervals from a single thread per process.
+
+    The timers are kept in a heap, ordered by the time they are due next. Rescheduling a timer will push a new entry,
+    outdated entries are skipped when popped. A function is called again interval seconds after its last call
+    returned. So a slow function delays the other timers. Functions that might block, e.g. on network requests, should
+    be started with blocking=True. Each call is then run in a new thread.
+
+    A thread will not survive a fork. getScheduler will return a new scheduler in a forked process. Timers started
+    before the fork will not be run in the forked process.
+    """
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.pid = os.getpid()
+        self.timers = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition(threading.Lock())
+        self.thread = threading.Thread(target=self.run, name=self.__class__.__name__)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def startFunction(self, function, interval, max_run_count=0, call_on_init=False, blocking=False):
+        timer = ScheduledFunction(self, function, interval, max_run_count, blocking)
+        if call_on_init:
+            # The initial call does not count as a run.
+            timer.run_count = -1
+            self.schedule(timer, 0)
+        else:
+            self.schedule(timer, interval)
+        return timer
+
+    def schedule(self, timer, delay):
+        with self.condition:
+            timer.due = time.time() + delay
+            heapq.heappush(self.timers, (timer.due, next(self.sequence), timer))
+            # Wake up the scheduler thread, in case the new timer is due before the one it is waiting for.
+            if self.timers[0][2] is timer:
+                self.condition.notify()
+
+    def getNextDueTimer(self):
+        with self.condition:
+            while True:
+                if not self.timers:
+                    self.condition.wait()
+                    continue
+                due, _, timer = self.timers[0]
+                wait_time = due - time.time()
+                if wait_time > 0:
+                    self.condition.wait(wait_time)
+                    continue
+                heapq.heappop(self.timers)
+                # Skip stopped timers and entries replaced by a reschedule.
+                if timer.stopped or timer.due != due:
+                    continue
+                timer.due = None
+                return timer
+
+    def run(self):
+        while True:
+            timer = self.getNextDueTimer()
+            if not timer.blocking:
+                self.callTimer(timer)
+                continue
+            # The timer is only scheduled again after the call returned, so calls of one timer never overlap.
+            caller = threading.Thread(target=self.callTimer, args=(timer,), name="%sCaller" % self.__class__.__name__)
+            caller.daemon = True
+            caller.start()
+
+    def callTimer(self, timer):
+        try:
+            timer.function()
+        except:
+            # Module globals are cleared on interpreter shutdown. Just stop the daemon thread then.
+            if sys is None:
+                return
+            etype, evalue, etb = sys.exc_info()
+            self.logger.error("Timed function %s failed. Exception: %s, Error: %s." % (timer.function, etype, evalue))
+        if timer.stopped or timer.due is not None:
+            # Stopped or rescheduled by the function itself.
+            return
+        if timer.max_run_count > 0:
+            timer.run_count += 1
+            if timer.run_count >= timer.max_run_count:
+                return
+        self.schedule(timer, timer.interval)
+
+
+scheduler = None
+scheduler_lock = threading.Lock()
+
+
+def getScheduler():
+    """
+    Return the scheduler of the current process.
+    """
+    global scheduler
+    if scheduler and scheduler.pid == os.getpid():
+        return scheduler
+    with scheduler_lock:
+        if not scheduler or scheduler.pid != os.getpid():
+            scheduler = Scheduler()
+    return scheduler
@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
 import sys
-import socket
+import bisect
 import logging
 import multiprocessing
 from collections import defaultdict
 
 import Decorators
 
+# Upper bounds in seconds of the processing time histogram buckets. The last bucket holds all slower events.
+PROCESSING_TIME_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+# Upper bounds in seconds of the end to end latency histogram buckets, @see: output.BenchmarkSink.
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+MODULE_STATISTICS_COUNTERS = ('events_in', 'events_out', 'events_dropped', 'filter_passed', 'filter_skipped', 'timed_events', 'processing_time')
+
 
 @Decorators.Singleton
 class StatisticCollector:
@@ -39,96 +45,194 @@ class StatisticCollector:
 
 @Decorators.Singleton
 class MultiProcessStatisticCollector:
-
-    def __init__(self):
+    """
+    Counters shared by all LumberMill processes.
+
+    The counters are kept in shared memory, with one slot per worker. Each process only writes to its own slot, so
+    incrementing a counter needs neither a lock nor a round trip to another process. Readers sum up the slots of all
+    workers when a counter is read.
+
+    Counter names are mapped to indices in a shared name table. Register known names up front via registerCounter.
+    Unknown names are registered on first use, which takes a lock once per name and process. If the table is full,
+    counters with unknown names are skipped by incrementCounter, decrementCounter and setCounter. This is logged once
+    per process.
+
+    Needs to be created before the workers are forked. All values are stored as doubles, integral values are returned
+    as ints.
+    A slot must only be written by one thread of a process at a time. resetCounter only affects the process calling
+    it, as other processes might still write to their slots.
+    """
+
+    def __init__(self, worker_count=1, get_worker_index=lambda: 0, max_counters=2048, max_name_length=256):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.worker_count = worker_count
+        self.get_worker_index = get_worker_index
+        self.max_counters = max_counters
+        self.max_name_length = max_name_length
         self.lock = multiprocessing.Lock()
-        self.sync_manager = multiprocessing.Manager()
-        self.counter_stats = self.sync_manager.dict()
-        """ Stores the statistic data """
-
-    def incrementCounter(self, name, increment_value=1):
+        self.values = multiprocessing.RawArray('d', worker_count * max_counters)
+        self.names = multiprocessing.RawArray('c', max_counters * max_name_length)
+        self.counter_count = multiprocessing.RawValue('i', 0)
+        # Process local mapping of counter names to indices and the values of the last reset per counter.
+        self.counter_indices = {}
+        self.reset_values = {}
+        # Process local set of counter names that could not be registered.
+        self.skipped_counters = set()
+
+    def syncCounterNames(self):
+        """ Read the counter names registered by other processes. """
+        for counter_idx in range(len(self.counter_indices), self.counter_count.value):
+            offset = counter_idx * self.max_name_length
+            self.counter_indices[self.names[offset:offset + self.max_name_length].rstrip('\x00').decode('utf-8')] = counter_idx
+
+    def registerCounter(self, name):
+        """ Return the index of counter name. Registers the name if it is unknown. """
+        try:
+            return self.counter_indices[name]
+        except KeyError:
+            pass
         with self.lock:
+            # Another process might have registered the name in the meantime.
+            self.syncCounterNames()
+            if name in self.counter_indices:
+                return self.counter_indices[name]
+            encoded_name = name.encode('utf-8')
+            if len(encoded_name) > self.max_name_length:
+                raise ValueError("Counter name %s is longer than %s bytes." % (name, self.max_name_length))
+            counter_idx = self.counter_count.value
+            if counter_idx >= self.max_counters:
+                raise ValueError("Can not register counter %s. All %s counters are in use." % (name, self.max_counters))
+            offset = counter_idx * self.max_name_length
+            self.names[offset:offset + len(encoded_name)] = encoded_name
+            # Publish the name only after it was written.
+            self.counter_count.value = counter_idx + 1
+            self.counter_indices[name] = counter_idx
+            return counter_idx
+
+    def getSlotOffset(self, name):
+        """ Return the offset of the slot of counter name for the current worker or None if the counter is skipped. """
+        try:
+            counter_idx = self.counter_indices[name]
+        except KeyError:
+            if name in self.skipped_counters:
+                return None
             try:
-                self.counter_stats[name] += increment_value
-            except KeyError:
-                self.counter_stats[name] = increment_value
-            except (OSError, IOError):
-                # OSError: [Errno 32] and IOError Broken pipe may be thrown when exiting lumbermill via CTRL+C. Ignore it.
-                pass
-            except socket.error:
-                # socket.error: [Errno 2] No such file or directory may be thrown when exiting lumbermill via CTRL+C. Ignore it
+                counter_idx = self.registerCounter(name)
+            except ValueError:
                 etype, evalue, etb = sys.exc_info()
-                if "No such file or directory" in evalue:
-                    return 0
-                else:
-                    raise etype, evalue, etb
+                if not self.skipped_counters:
+                    self.logger.warning("%s Skipping this and further counters that can not be registered." % evalue)
+                self.skipped_counters.add(name)
+                return None
+        return self.get_worker_index() * self.max_counters + counter_idx
+
+    def getRawValue(self, counter_idx):
+        return sum(self.values[worker_idx * self.max_counters + counter_idx] for worker_idx in range(0, self.worker_count))
+
+    def toNumber(self, value):
+        return int(value) if value.is_integer() else value
+
+    def incrementCounter(self, name, increment_value=1):
+        slot_offset = self.getSlotOffset(name)
+        if slot_offset is not None:
+            self.values[slot_offset] += increment_value
 
     def decrementCounter(self, name, decrement_value=1):
-        with self.lock:
-            try:
-                self.counter_stats[name] -= decrement_value
-            except KeyError:
-                self.counter_stats[name] = 0
-            except OSError:
-                # OSError: [Errno 32] Broken pipe may be thrown when exiting lumbermill via CTRL+C. Ignore it.
-                pass
-            except socket.error:
-                # socket.error: [Errno 2] No such file or directory may be thrown when exiting lumbermill via CTRL+C. Ignore it
-                etype, evalue, etb = sys.exc_info()
-                if "No such file or directory" in evalue:
-                    return 0
-                else:
-                    raise etype, evalue, etb
+        slot_offset = self.getSlotOffset(name)
+        if slot_offset is not None:
+            self.values[slot_offset] -= decrement_value
 
-    def resetCounter(self,name):
-        with self.lock:
-            try:
-                self.counter_stats[name] = 0
-            except OSError:
-                # OSError: [Errno 32] Broken pipe may be thrown when exiting lumbermill via CTRL+C. Ignore it.
-                pass
-            except socket.error:
-                # socket.error: [Errno 2] No such file or directory may be thrown when exiting lumbermill via CTRL+C. Ignore it
-                etype, evalue, etb = sys.exc_info()
-                if "No such file or directory" in evalue:
-                    return 0
-                else:
-                    raise etype, evalue, etb
+    def resetCounter(self, name):
+        if name not in self.counter_indices:
+            self.syncCounterNames()
+        if name in self.counter_indices:
+            self.reset_values[name] = self.getRawValue(self.counter_indices[name])
 
     def setCounter(self, name, value):
-        with self.lock:
-            try:
-                self.counter_stats[name] = value
-            except OSError:
-                # OSError: [Errno 32] Broken pipe may be thrown when exiting lumbermill via CTRL+C. Ignore it.
-                pass
-            except socket.error:
-                # socket.error: [Errno 2] No such file or directory may be thrown when exiting lumbermill via CTRL+C. Ignore it
-                etype, evalue, etb = sys.exc_info()
-                if "No such file or directory" in evalue:
-                    return 0
-                else:
-                    raise etype, evalue, etb
+        """ Set the slot of the current worker to value. In this process, the counter then reads as value. """
+        slot_offset = self.getSlotOffset(name)
+        if slot_offset is None:
+            return
+        self.values[slot_offset] = value
+        # Hide the values of the other workers, as with a reset.
+        self.reset_values[name] = self.getRawValue(self.counter_indices[name]) - value
 
     def getCounter(self, name):
-        with self.lock:
-            try:
-                return self.counter_stats[name]
-            except KeyError:
-                return 0
-            except OSError:
-                # OSError: [Errno 32] Broken pipe may be thrown when exiting lumbermill via CTRL+C. Ignore it.
+        if name not in self.counter_indices:
+            self.syncCounterNames()
+            if name not in self.counter_indices:
                 return 0
-            except socket.error:
-                # socket.error: [Errno 2] No such file or directory may be thrown when exiting lumbermill via CTRL+C. Ignore it
-                etype, evalue, etb = sys.exc_info()
-                if "No such file or directory" in evalue:
-                    return 0
-                else:
-                    raise etype, evalue, etb
+        return self.toNumber(self.getRawValue(self.counter_indices[name]) - self.reset_values.get(name, 0))
+
+    def getCounterPerWorker(self, name):
+        """ Return the values of all worker slots of counter name. Resets are not taken into account. """
+        if name not in self.counter_indices:
+            self.syncCounterNames()
+            if name not in self.counter_indices:
+                return [0] * self.worker_count
+        counter_idx = self.counter_indices[name]
+        return [self.toNumber(self.values[worker_idx * self.max_counters + counter_idx]) for worker_idx in range(0, self.worker_count)]
 
     def getAllCounters(self):
-        return self.counter_stats
+        self.syncCounterNames()
+        return dict([(name, self.getCounter(name)) for name in self.counter_indices])
 
     def shutDown(self):
-        self.sync_manager.shutdown()
+        # Shared memory is released with the last process.
+        pass
+
+class ModuleStatistics:
+    """
+    Throughput and processing time statistics of a module instance in one process.
+
+    Events in and out, dropped events and input filter results are counted for each event. Only every
+    sample_rate'th event is timed, to keep the overhead low. The time spent in receivers is not included.
+    Batches are always timed, the time is split evenly on their events.
+
+    All values are totals since start. Readers get rates from the difference of two readings, @see: getDifference.
+    """
+    def __init__(self, sample_rate=16):
+        self.sample_rate = sample_rate
+        self.events_in = 0
+        self.events_out = 0
+        self.events_dropped = 0
+        self.filter_passed = 0
+        self.filter_skipped = 0
+        self.timed_events = 0
+        self.processing_time = 0
+        self.histogram = [0] * (len(PROCESSING_TIME_BUCKETS) + 1)
+
+    def addProcessingTime(self, processing_time, event_count=1):
+        self.timed_events += event_count
+        self.processing_time += processing_time
+        self.histogram[bisect.bisect_left(PROCESSING_TIME_BUCKETS, processing_time / event_count)] += event_count
+
+    def getStats(self):
+        stats = dict([(counter_name, getattr(self, counter_name)) for counter_name in MODULE_STATISTICS_COUNTERS])
+        stats['histogram'] = list(self.histogram)
+        return stats
+
+    @staticmethod
+    def getDifference(stats, previous_stats):
+        if not previous_stats:
+            return stats
+        difference = dict([(counter_name, stats[counter_name] - previous_stats[counter_name]) for counter_name in MODULE_STATISTICS_COUNTERS])
+        difference['histogram'] = [count - previous_count for count, previous_count in zip(stats['histogram'], previous_stats['histogram'])]
+        return difference
+
+    @staticmethod
+    def getPercentile(histogram, percentile, buckets=PROCESSING_TIME_BUCKETS):
+        """
+        Return the upper bound of the histogram bucket holding the percentile or None if no events were timed.
+        Returns the largest bucket bound, if the percentile is in the bucket of slower events.
+        """
+        total = sum(histogram)
+        if not total:
+            return None
+        threshold = total * percentile / 100.0
+        count = 0
+        for bucket_idx, bucket_count in enumerate(histogram):
+            count += bucket_count
+            if count >= threshold:
+                break
+        return buckets[min(bucket_idx, len(buckets) - 1)]
@@ -1,7 +1,232 @@
 # -*- coding: utf-8 -*-
-from pyparsing import *
+import re
+import ast
+import time
 
-identifier = Word(alphas).setName('identifier')
-literal = pyparsing.pyparsing_common.number
+from lumbermill.utils.DictUtils import compileFieldPath
+from lumbermill.utils.DynamicValues import GP_DYNAMIC_VAL_REGEX_WITH_TYPES
 
-print("%s" % identifier.parseString("12"))
\ No newline at end of file
+# Seconds a value from the internal datastore is cached in a process before it is fetched again.
+INTERNAL_VALUE_REFRESH_INTERVAL = 1
+# Only every nth evaluation of a filter is timed, to keep the overhead of the statistics low.
+TIMING_SAMPLE_RATE = 64
+
+# Cost of a term if its evaluation might raise an exception. These terms will never be moved to the front.
+UNSAFE_COST = 100
+# Cost estimates for the different nodes of a filter expression.
+NODE_COSTS = {ast.Num: 0,
+              ast.Str: 0,
+              ast.Name: 0,
+              ast.Compare: 1}
+ACCESSOR_COSTS = {'field_': 2,
+                  'internal_': 5}
+
+internal_values = {}
+"""Cached internal datastore values of this process: key -> (value, time of fetch)."""
+
+
+def getInternalValue(lumbermill, key, refresh_interval=INTERNAL_VALUE_REFRESH_INTERVAL):
+    """
+    Return a value from the internal datastore.
+
+    Values are cached and only fetched again after refresh_interval seconds, so a filter does not even pay for the
+    version check of the datastore on each event.
+    """
+    now = time.time()
+    try:
+        value, fetched_at = internal_values[key]
+        if now - fetched_at < refresh_interval:
+            return value
+    except KeyError:
+        pass
+    value = lumbermill.getFromInternalDataStore(key, False)
+    internal_values[key] = (value, now)
+    return value
+
+
+def setInternalValue(key, value):
+    """
+    Update the cached value, so values set in this process are visible to its filters right away.
+    """
+    internal_values[key] = (value, time.time())
+
+
+class InternalValue:
+
+    def __init__(self, key):
+        self.key = key
+
+    def __call__(self, lumbermill):
+        return getInternalValue(lumbermill, self.key)
+
+
+def estimateCost(node):
+    """
+    Return the estimated cost of evaluating node.
+
+    Calls other than field and internal accessors, attribute and item access, arithmetic and membership tests on
+    anything but literal lists and tuples might raise an exception, e.g. if a field is missing or False in 'abc'.
+    They are rated with UNSAFE_COST.
+    """
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        for prefix, cost in ACCESSOR_COSTS.items():
+            if node.func.id.startswith(prefix):
+                return cost
+    if isinstance(node, ast.BoolOp):
+        return sum([estimateCost(value) for value in node.values])
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return estimateCost(node.operand)
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return sum([estimateCost(element) for element in node.elts])
+    if isinstance(node, ast.Compare):
+        for op, comparator in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)) and not isinstance(comparator, (ast.List, ast.Tuple)):
+                return UNSAFE_COST
+        return NODE_COSTS[ast.Compare] + sum([estimateCost(child) for child in [node.left] + node.comparators])
+    try:
+        return NODE_COSTS[node.__class__]
+    except KeyError:
+        return UNSAFE_COST
+
+
+def isLiteral(node):
+    return isinstance(node, (ast.Num, ast.Str)) or (isinstance(node, ast.Name) and node.id in ('True', 'False', 'None'))
+
+
+def getEqualityTest(node, field_names):
+    """
+    Return (field_name, values) if node only tests a single field for equality with literals, e.g.:
+    $(lumbermill.event_type) == 'httpd_access_log'
+    $(lumbermill.event_type) in ['httpd_access_log', 'httpd_error_log']
+    $(http_status) == 404 or $(http_status) == 500
+    Return None for all other expressions.
+    """
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.Or):
+        tests = [getEqualityTest(value, field_names) for value in node.values]
+        if None in tests or len(set([field_name for field_name, values in tests])) != 1:
+            return None
+        return (tests[0][0], tuple([value for field_name, values in tests for value in values]))
+    if not isinstance(node, ast.Compare) or len(node.ops) != 1:
+        return None
+    left, op, right = node.left, node.ops[0], node.comparators[0]
+    if isinstance(op, ast.Eq) and isLiteral(left):
+        left, right = right, left
+    if not isinstance(left, ast.Call) or not isinstance(left.func, ast.Name) or left.func.id not in field_names:
+        return None
+    if isinstance(op, ast.Eq) and isLiteral(right):
+        values = (ast.literal_eval(right),)
+    elif isinstance(op, ast.In) and isinstance(right, (ast.List, ast.Tuple, ast.Set)) and all(map(isLiteral, right.elts)):
+        values = tuple([ast.literal_eval(element) for element in right.elts])
+    else:
+        return None
+    try:
+        # Values will be used as dictionary keys.
+        map(hash, values)
+    except TypeError:
+        return None
+    return (field_names[left.func.id], values)
+
+
+class TermReorderer(ast.NodeTransformer):
+    """
+    Reorder the terms of and/or expressions from cheapest to most expensive.
+
+    The truth value of an and/or expression does not depend on the order of its terms. But a term can guard
+    another one, as in $(url) and $(url).startswith('GET'). So terms that might raise an exception keep their
+    position, only cheaper safe terms are moved in front of them.
+    """
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        terms = []
+        for term in node.values:
+            cost = estimateCost(term)
+            position = len(terms)
+            if cost < UNSAFE_COST:
+                while position > 0 and terms[position - 1][0] > cost:
+                    position -= 1
+            terms.insert(position, (cost, term))
+        node.values = [term for cost, term in terms]
+        return node
+
+
+class CompiledFilter:
+    """
+    A filter expression, parsed once and compiled to a function of lumbermill and event.
+
+    E.g. the filter:
+    $(lumbermill.source_module) == 'TcpServer' and %(internal.enabled)s
+    compiles to:
+    lambda lumbermill, event : field_1(event, False) == 'TcpServer' and internal_2(lumbermill)
+    field_1 is a compiled field path accessor, internal_2 returns a locally cached value from the internal datastore.
+
+    The number of evaluations and matches are counted. Every TIMING_SAMPLE_RATE evaluation is timed.
+
+    If the filter just tests one field for equality with literals, equality_test holds the field name and the
+    values, so the filter can be replaced by a hash lookup. @see: OutputRouter. The lookups are then counted by the
+    router, see setLookupCounter.
+    """
+    def __init__(self, filter_string, namespace=None):
+        self.filter_string = filter_string
+        self.namespace = dict(namespace or {})
+        self.accessor_count = 0
+        self.field_names = {}
+        expression = re.sub('^if\s+', "", filter_string.strip())
+        expression = GP_DYNAMIC_VAL_REGEX_WITH_TYPES.sub(self.replaceReference, expression)
+        tree = ast.parse("lambda lumbermill, event : (%s)" % expression, mode='eval')
+        self.equality_test = getEqualityTest(tree.body.body, self.field_names)
+        tree = ast.fix_missing_locations(TermReorderer().visit(tree))
+        self.function = eval(compile(tree, "<filter>", "eval"), self.namespace)
+        self.evaluations = 0
+        self.matches = 0
+        self.timed_evaluations = 0
+        self.evaluation_time = 0
+        self.lookup_counter = None
+        self.lookup_evaluations_read = 0
+
+    def replaceReference(self, match):
+        field_name = match.group(1)
+        self.accessor_count += 1
+        if field_name.startswith('internal.'):
+            accessor_name = "internal_%d" % self.accessor_count
+            self.namespace[accessor_name] = InternalValue(field_name[len('internal.'):])
+            return "%s(lumbermill)" % accessor_name
+        accessor_name = "field_%d" % self.accessor_count
+        self.field_names[accessor_name] = field_name
+        self.namespace[accessor_name] = compileFieldPath(field_name).peek
+        return "%s(event, False)" % accessor_name
+
+    def __call__(self, lumbermill, event):
+        self.evaluations += 1
+        if self.evaluations % TIMING_SAMPLE_RATE:
+            matched = self.function(lumbermill, event)
+        else:
+            started_at = time.time()
+            matched = self.function(lumbermill, event)
+            self.evaluation_time += time.time() - started_at
+            self.timed_evaluations += 1
+        if matched:
+            self.matches += 1
+        return matched
+
+    def setLookupCounter(self, lookup_counter):
+        """
+        Count the evaluations of lookup_counter as evaluations of this filter. The matches are incremented by the router.
+        """
+        self.lookup_counter = lookup_counter
+        self.lookup_evaluations_read = lookup_counter.evaluations
+
+    def resetStats(self):
+        """
+        Return the statistics since the last reset and start counting anew.
+        """
+        if self.lookup_counter:
+            lookup_evaluations = self.lookup_counter.evaluations
+            self.evaluations += lookup_evaluations - self.lookup_evaluations_read
+            self.lookup_evaluations_read = lookup_evaluations
+        stats = {'evaluations': self.evaluations,
+                 'matches': self.matches,
+                 'timed_evaluations': self.timed_evaluations,
+                 'evaluation_time': self.evaluation_time}
+        self.evaluations = self.matches = self.timed_evaluations = 0
+        self.evaluation_time = 0
+        return stats
@@ -8,15 +8,15 @@ import subprocess
 class TimedFunctionManager:
     """
     The decorator setInterval provides a simple way to repeatedly execute a function in intervals.
-    This is done by starting a thread that calls the decorated method every interval seconds.
-    To make sure, all threads get stopped when exiting or reloading LumberMill, the decorated functions
+    All timed functions of a process are called from a single scheduler thread, see utils.Scheduler.
+    To make sure, all timed functions get stopped when exiting or reloading LumberMill, the decorated functions
     should be started like this e.g.:
     ...
     Utils.TimedFunctionManager.startTimedFunction(self.sendAliveRequests)
     ...
 
     The main process will call TimedFunctionManager.stopTimedFunctions() on exit or reload.
-    This makes sure all thread get terminated.
+    This makes sure all timed functions get stopped.
     """
 
     timed_function_handlers = []
@@ -48,6 +48,7 @@ class WebserverTornado(BaseThreadedModule):
                      (r"/rest/server/info", handler.ActionHandler.GetServerInformation),
                      (r"/rest/server/statistics", handler.ActionHandler.GetServerStatistics),
                      (r"/rest/server/configuration", handler.ActionHandler.GetServerConfiguration),
+                     (r"/rest/server/profile", handler.ActionHandler.ProfileHandler),
                       # WebsocketHandler
                       (r"/websockets/statistics", handler.WebsocketHandler.StatisticsWebSocketHandler),
                       (r"/websockets/get_logs", handler.WebsocketHandler.LogToWebSocketHandler) ]
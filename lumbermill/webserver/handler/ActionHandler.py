@@ -80,6 +80,8 @@ class GetServerStatistics(BaseHandler):
             statistic_data['event_type_statistics'] = self.eventTypeStatistics(statistic_module)
         if statistic_module.getConfigurationValue('process_statistics'):
             statistic_data['process_statistics'] = statistic_module.getProcessStatistics()
+        if statistic_module.getConfigurationValue('module_statistics'):
+            statistic_data['module_statistics'] = statistic_module.getLastModuleStatistics()
         self.write(tornado.escape.json_encode(statistic_data))
 
 class GetServerInformation(BaseHandler):
@@ -124,6 +126,27 @@ class RestartHandler(BaseHandler):
         self.flush()
         self.webserver_module.lumbermill.restart()
 
+class ProfileHandler(BaseHandler):
+    """
+    Profile all LumberMill processes, @see: LumberMill.startProfiling.
+    The duration in seconds can be set via the duration argument.
+    """
+    def get(self):
+        self.add_header('Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0')
+        try:
+            duration = float(self.get_argument('duration', 0))
+        except ValueError:
+            raise tornado.web.HTTPError(400, "duration must be a number")
+        run_directory = self.webserver_module.lumbermill.startProfiling(duration)
+        if run_directory is True:
+            # Handled by a worker, which only requested the run from the master.
+            response = {'profiling': True, 'status': 'requested', 'directory': None}
+        elif run_directory:
+            response = {'profiling': True, 'status': 'started', 'directory': run_directory}
+        else:
+            response = {'profiling': False, 'status': 'in progress', 'directory': None}
+        self.write(tornado.escape.json_encode(response))
+
 class AuthLoginHandler(BaseHandler):
     @tornado.gen.coroutine
     def get(self):
@@ -58,6 +58,12 @@ class MockLumberMill(mock.Mock):
     def getWorkerCount(self):
         return self.worker_count
 
+    def getWorkerIndex(self):
+        return 0
+
+    def getAllModuleStatistics(self):
+        return {}
+
     def getInternalDataStore(self):
         return self.internal_datastore;
 
@@ -108,10 +114,18 @@ class MockReceiver(mock.Mock):
     def getFilter(self):
         return self.filter
 
+    def isSaturated(self, visited=None):
+        return False
+
     def receiveEvent(self, event):
         self.handleEvent(event)
         return event
 
+    def receiveEvents(self, events):
+        for event in events:
+            self.handleEvent(event)
+        return events
+
     def handleEvent(self, event):
         self.events.append(event)
 
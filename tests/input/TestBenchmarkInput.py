@@ -0,0 +1,40 @@
+import os
+import time
+import tempfile
+
+from tests.ModuleBaseTestCase import ModuleBaseTestCase, MockLumberMill
+from lumbermill.input import BenchmarkInput
+
+
+class TestBenchmarkInput(ModuleBaseTestCase):
+
+    def setUp(self):
+        super(TestBenchmarkInput, self).setUp(BenchmarkInput.BenchmarkInput(MockLumberMill()))
+
+    def testFixedRate(self):
+        self.test_object.configure({'event': {'Lobster': 'Thermidor'},
+                                    'rate': 100})
+        self.checkConfiguration()
+        self.test_object.initAfterFork()
+        started_at = time.time()
+        self.test_object.start()
+        time.sleep(.5)
+        self.test_object.shutDown()
+        events = list(self.receiver.getEvent())
+        self.assertTrue(40 <= len(events) <= 60)
+        self.assertEquals(events[0]['Lobster'], 'Thermidor')
+        self.assertTrue(started_at <= events[0]['lumbermill']['sent_at'] <= events[-1]['lumbermill']['sent_at'])
+
+    def testReplayFile(self):
+        replay_file, replay_file_path = tempfile.mkstemp()
+        os.write(replay_file, "Spam\nEggs\n")
+        os.close(replay_file)
+        self.test_object.configure({'file': replay_file_path, 'rate': 100})
+        os.remove(replay_file_path)
+        self.checkConfiguration()
+        self.test_object.initAfterFork()
+        self.test_object.start()
+        time.sleep(.1)
+        self.test_object.shutDown()
+        events = list(self.receiver.getEvent())
+        self.assertEquals([event['data'] for event in events[:3]], ['Spam', 'Eggs', 'Spam'])
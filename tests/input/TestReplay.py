@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+import lumbermill.utils.CaptureFile as CaptureFile
+import lumbermill.utils.DictUtils as DictUtils
+from tests.ModuleBaseTestCase import ModuleBaseTestCase, MockLumberMill
+from lumbermill.input import Replay
+
+
+class TestReplay(ModuleBaseTestCase):
+
+    def setUp(self):
+        super(TestReplay, self).setUp(Replay.Replay(MockLumberMill()))
+        self.capture_file_name = tempfile.mktemp()
+        # Three events, captured one second apart.
+        records = [CaptureFile.encodeRecord(DictUtils.getDefaultEventDict({'data': 'Spam %d' % idx}), 100 + idx) for idx in range(0, 3)]
+        with open(self.capture_file_name, 'wb') as capture_file:
+            capture_file.write(CaptureFile.MAGIC)
+            capture_file.write(CaptureFile.encodeBlock(records))
+
+    def tearDown(self):
+        os.remove(self.capture_file_name)
+
+    def testReplayAsFastAsPossible(self):
+        self.test_object.configure({'file_name': self.capture_file_name,
+                                    'speed': 0})
+        self.checkConfiguration()
+        self.assertEqual(self.test_object.replay(0), 3)
+        events = list(self.receiver.getEvent())
+        self.assertEqual([event['data'] for event in events], ['Spam 0', 'Spam 1', 'Spam 2'])
+        self.assertEqual(events[0]['lumbermill']['source_module'], 'Replay')
+        self.assertTrue('sent_at' in events[0]['lumbermill'])
+
+    def testReplaySpeed(self):
+        self.test_object.configure({'file_name': self.capture_file_name,
+                                    'speed': 4})
+        self.test_object.replay(0)
+        events = list(self.receiver.getEvent())
+        # Two seconds of captured events, replayed four times as fast.
+        self.assertAlmostEqual(events[-1]['lumbermill']['sent_at'] - events[0]['lumbermill']['sent_at'], 0.5, delta=0.1)
+
+    def testEventsCount(self):
+        self.test_object.configure({'file_name': self.capture_file_name,
+                                    'speed': 0,
+                                    'events_count': 2})
+        self.assertEqual(self.test_object.replay(0), 2)
+        self.assertEqual(len(list(self.receiver.getEvent())), 2)
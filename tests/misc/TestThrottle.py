@@ -62,4 +62,11 @@ class TestThrottle(ModuleBaseTestCase):
         event_counter = 0
         for _ in self.receiver.getEvent():
             event_counter += 1
-        self.assertEquals(event_counter, 6)
\ No newline at end of file
+        self.assertEquals(event_counter, 6)
+
+    def testPartitionKey(self):
+        self.test_object.configure({'key': '$(Spam)',
+                                    'partition_events': True})
+        self.checkConfiguration()
+        self.assertTrue(self.test_object.isPartitioned())
+        self.assertEquals(self.test_object.getPartitionKey(DictUtils.getDefaultEventDict({'Spam': 'Eggs'})), 'Eggs')
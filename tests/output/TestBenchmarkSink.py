@@ -0,0 +1,36 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+
+import lumbermill.utils.DictUtils as DictUtils
+from tests.ModuleBaseTestCase import ModuleBaseTestCase, MockLumberMill
+from lumbermill.output import BenchmarkSink
+
+
+class TestBenchmarkSink(ModuleBaseTestCase):
+
+    def setUp(self):
+        super(TestBenchmarkSink, self).setUp(BenchmarkSink.BenchmarkSink(MockLumberMill()))
+        self.results_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.results_path)
+
+    def testResultsAreWrittenOnShutdown(self):
+        self.test_object.configure({'id': 'Sink', 'results_path': self.results_path})
+        self.checkConfiguration()
+        for sent_at in [time.time() - 0.002, time.time() - 20, None]:
+            event = DictUtils.getDefaultEventDict({})
+            if sent_at:
+                event['lumbermill']['sent_at'] = sent_at
+            self.test_object.receiveEvent(event)
+        self.test_object.shutDown()
+        with open(os.path.join(self.results_path, 'Sink_0.json')) as results_file:
+            results = json.load(results_file)
+        self.assertEquals(results['events'], 3)
+        self.assertEquals(results['timed_events'], 2)
+        # 2ms are in the 5ms bucket, 20s in the bucket of slower events.
+        self.assertEquals(results['latency_histogram'][3], 1)
+        self.assertEquals(results['latency_histogram'][-1], 1)
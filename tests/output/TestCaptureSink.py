@@ -0,0 +1,53 @@
+import os
+import mock
+import tempfile
+
+import lumbermill.utils.CaptureFile as CaptureFile
+import lumbermill.utils.DictUtils as DictUtils
+from tests.ModuleBaseTestCase import ModuleBaseTestCase
+from lumbermill.output import CaptureSink
+
+
+class TestCaptureSink(ModuleBaseTestCase):
+
+    def setUp(self):
+        super(TestCaptureSink, self).setUp(CaptureSink.CaptureSink(mock.Mock()))
+        self.capture_file_name = tempfile.mktemp()
+
+    def tearDown(self):
+        if os.path.exists(self.capture_file_name):
+            os.remove(self.capture_file_name)
+
+    def readCapture(self):
+        reader = CaptureFile.CaptureFileReader(self.capture_file_name)
+        try:
+            return [event for captured_at, event in reader.iterRecords()]
+        finally:
+            reader.close()
+
+    def testCapture(self):
+        self.test_object.configure({'file_name': self.capture_file_name,
+                                    'compress': 'zlib'})
+        self.checkConfiguration()
+        event = DictUtils.getDefaultEventDict({'data': 'Lobster Thermidor'})
+        self.test_object.receiveEvent(event)
+        # Changes after the event was received are not captured.
+        event['data'] = 'Spam'
+        self.test_object.shutDown()
+        events = self.readCapture()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['data'], 'Lobster Thermidor')
+
+    def testAppendToCapture(self):
+        for data in ['Lobster Thermidor', 'Spam']:
+            capture_sink = CaptureSink.CaptureSink(mock.Mock())
+            capture_sink.configure({'file_name': self.capture_file_name})
+            capture_sink.receiveEvent(DictUtils.getDefaultEventDict({'data': data}))
+            capture_sink.shutDown()
+        self.assertEqual([event['data'] for event in self.readCapture()], ['Lobster Thermidor', 'Spam'])
+
+    def testNoCaptureFile(self):
+        with open(self.capture_file_name, 'w') as capture_file:
+            capture_file.write('Spam, spam, spam, egg and spam.\n')
+        self.test_object.configure({'file_name': self.capture_file_name})
+        self.assertTrue(self.test_object.lumbermill.shutDown.called)
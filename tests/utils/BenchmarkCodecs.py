@@ -0,0 +1,62 @@
+"""
+Benchmark for the inter process queue codecs.
+
+Events are built from the lines in tests/test_data/file_input, plus a parsed httpd access log event.
+Reports encoded plus decoded events per second and the encoded bytes per event for each registered codec.
+
+Run with:
+python tests/utils/BenchmarkCodecs.py
+"""
+import os
+import sys
+import copy
+import glob
+import time
+
+pathname = os.path.abspath(__file__)
+sys.path.insert(0, pathname[:pathname.rfind("/tests/")])
+
+import lumbermill.utils.DictUtils as DictUtils
+from lumbermill.utils.Codecs import getCodec, getCodecNames
+
+BATCH_SIZE = 50
+ROUNDS = 200
+
+
+def getEvents():
+    events = []
+    test_data_path = pathname[:pathname.rfind("/tests/")] + "/tests/test_data/file_input"
+    for file_name in sorted(glob.glob(test_data_path + "/*") + glob.glob(test_data_path + "/*/*")):
+        if not os.path.isfile(file_name):
+            continue
+        with open(file_name, "r") as data_file:
+            for line in data_file:
+                events.append(DictUtils.getDefaultEventDict({'data': line.rstrip(), 'filename': file_name}, caller_class_name='File', event_type='file'))
+    events.append(DictUtils.getDefaultEventDict({'data': '192.168.2.20 - - [28/Jul/2006:10:27:10 -0300] "GET /cgi-bin/try/ HTTP/1.0" 200 3395',
+                                                 'remote_ip': '192.168.2.20',
+                                                 'identd': '-',
+                                                 'user': '-',
+                                                 'datetime': '28/Jul/2006:10:27:10 -0300',
+                                                 'url': 'GET /cgi-bin/try/ HTTP/1.0',
+                                                 'http_status': 200,
+                                                 'bytes_send': 3395,
+                                                 'params': {u'spanish': [u'inquisition']}},
+                                                caller_class_name='TcpServer', event_type='httpd_access_log'))
+    # Use distinct objects, pickle would only store references to repeated ones.
+    events = [copy.deepcopy(event) for event in (events * BATCH_SIZE)[:BATCH_SIZE]]
+    for idx, event in enumerate(events):
+        event['data'] = "%s %d" % (event['data'], idx)
+    return events
+
+
+if __name__ == "__main__":
+    events = getEvents()
+    print("%-12s %12s %16s" % ("codec", "eps", "bytes per event"))
+    for codec_name in getCodecNames():
+        codec = getCodec(codec_name)
+        start_time = time.time()
+        for _ in range(0, ROUNDS):
+            encoded_events = codec.encode(events)
+            codec.decode(encoded_events)
+        duration = time.time() - start_time
+        print("%-12s %12d %16d" % (codec_name, (ROUNDS * BATCH_SIZE) / duration, len(encoded_events) / BATCH_SIZE))
@@ -0,0 +1,55 @@
+"""
+Micro benchmark for event creation via getDefaultEventDict.
+
+Compares the lazy EventMetadata with the former eagerly filled metadata dict.
+
+Run with:
+python tests/utils/BenchmarkDefaultEventDict.py
+"""
+import os
+import sys
+import random
+import timeit
+
+pathname = os.path.abspath(__file__)
+sys.path.insert(0, pathname[:pathname.rfind("/tests/")])
+
+import lumbermill.utils.DictUtils as DictUtils
+from lumbermill.constants import MY_HOSTNAME
+
+
+def getEagerEventDict(dict={}, caller_class_name='', received_from="Unknown", event_type="Unknown"):
+    default_dict = { "data": "",
+                     "lumbermill": {
+                         'pid': os.getpid(),
+                         'event_type': event_type,
+                         'event_id': "%032x%s" % (random.getrandbits(128), os.getpid()),
+                         'source_module': caller_class_name,
+                         'received_from': received_from,
+                         'received_by': MY_HOSTNAME
+                     }
+                }
+    default_dict.update(dict)
+    default_dict = DictUtils.KeyDotNotationDict(default_dict)
+    return default_dict
+
+
+def getEventSize(event):
+    size = sys.getsizeof(event)
+    for key, value in dict.iteritems(event):
+        size += sys.getsizeof(value)
+    for key, value in dict.iteritems(event['lumbermill']):
+        size += sys.getsizeof(value)
+    return size
+
+
+if __name__ == "__main__":
+    repeat = 100000
+    data = {'data': '192.168.2.20 - - [28/Jul/2006:10:27:10 -0300] "GET /cgi-bin/try/ HTTP/1.0" 200 3395'}
+    print("%-24s %12s %12s" % ("", "eager", "lazy"))
+    eager_time = min(timeit.repeat(lambda: getEagerEventDict(data, 'Spam'), number=repeat, repeat=3))
+    lazy_time = min(timeit.repeat(lambda: DictUtils.getDefaultEventDict(data, 'Spam'), number=repeat, repeat=3))
+    print("%-24s %12.4f %12.4f" % ("create %d events (s)" % repeat, eager_time, lazy_time))
+    eager_size = getEventSize(getEagerEventDict(data, 'Spam'))
+    lazy_size = getEventSize(DictUtils.getDefaultEventDict(data, 'Spam'))
+    print("%-24s %12d %12d" % ("bytes per event", eager_size, lazy_size))
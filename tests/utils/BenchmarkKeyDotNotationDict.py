@@ -0,0 +1,34 @@
+"""
+Micro benchmark for dotted field access via KeyDotNotationDict and compiled field paths.
+
+Run with:
+python tests/utils/BenchmarkKeyDotNotationDict.py
+"""
+import os
+import sys
+import timeit
+
+pathname = os.path.abspath(__file__)
+sys.path.insert(0, pathname[:pathname.rfind("/tests/")])
+
+import lumbermill.utils.DictUtils as DictUtils
+from lumbermill.utils.DynamicValues import getFieldPathsInString, resolveFieldPaths
+
+event = DictUtils.getDefaultEventDict({'data': 'Spam, bacon, sausage and spam.',
+                                       'params': {'spanish': ['inquisition']}})
+event_type = DictUtils.compileFieldPath('lumbermill.event_type')
+spanish = DictUtils.compileFieldPath('params.spanish.0')
+source_module = DictUtils.compileFieldPath('lumbermill.source_module')
+
+benchmarks = [('get lumbermill.event_type', lambda: event['lumbermill.event_type'], lambda: event_type.getValue(event)),
+              ('get params.spanish.0', lambda: event['params.spanish.0'], lambda: spanish.getValue(event)),
+              ('set lumbermill.source_module', lambda: event.__setitem__('lumbermill.source_module', 'Spam'), lambda: source_module.set(event, 'Spam')),
+              ('map %(lumbermill.event_type)s', lambda: '%(lumbermill.event_type)s' % event, lambda: '%(lumbermill.event_type)s' % resolveFieldPaths(getFieldPathsInString('%(lumbermill.event_type)s'), event))]
+
+if __name__ == "__main__":
+    repeat = 200000
+    print("%-32s %12s %12s %8s" % ("benchmark", "dict (s)", "compiled (s)", "speedup"))
+    for name, dict_access, compiled_access in benchmarks:
+        dict_time = min(timeit.repeat(dict_access, number=repeat, repeat=3))
+        compiled_time = min(timeit.repeat(compiled_access, number=repeat, repeat=3))
+        print("%-32s %12.4f %12.4f %7.2fx" % (name, dict_time, compiled_time, dict_time / compiled_time))
@@ -0,0 +1,73 @@
+"""
+Startup benchmark: instantiate every module in lumbermill/.
+
+Compares instantiation with a freshly parsed docstring, as for the first instance of a module class, with
+instantiation using the per class cache of ModuleDocstringParser.
+Modules whose dependencies are not installed are listed as skipped.
+
+Run with:
+python tests/utils/BenchmarkModuleStartup.py
+"""
+import os
+import sys
+import timeit
+import logging
+import importlib
+import mock
+
+pathname = os.path.abspath(__file__)
+lumbermill_basepath = pathname[:pathname.rfind("/tests/")]
+sys.path.insert(0, lumbermill_basepath)
+
+import lumbermill.utils.Decorators as Decorators
+
+MODULE_DIRECTORIES = ['cluster', 'input', 'misc', 'modifier', 'output', 'parser', 'webserver']
+
+
+def getModuleClasses():
+    module_classes = []
+    skipped_modules = []
+    for module_directory in MODULE_DIRECTORIES:
+        module_path = os.path.join(lumbermill_basepath, 'lumbermill', module_directory)
+        for filename in sorted(os.listdir(module_path)):
+            module_name, extension = os.path.splitext(filename)
+            if extension != '.py' or module_name.startswith('_'):
+                continue
+            try:
+                module = importlib.import_module("lumbermill.%s.%s" % (module_directory, module_name))
+                module_class = getattr(module, module_name)
+            except Exception:
+                etype, evalue, etb = sys.exc_info()
+                skipped_modules.append((module_name, evalue))
+                continue
+            module_classes.append((module_name, module_class))
+    return module_classes, skipped_modules
+
+
+def instantiate(module_class, use_cache):
+    if not use_cache:
+        Decorators.parsed_module_docstrings.clear()
+    return module_class(mock.Mock())
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    repeat = 50
+    module_classes, skipped_modules = getModuleClasses()
+    print("%-28s %12s %12s" % ("ms per instance", "uncached", "cached"))
+    total_uncached = total_cached = 0
+    for module_name, module_class in module_classes:
+        try:
+            instantiate(module_class, True)
+        except Exception:
+            etype, evalue, etb = sys.exc_info()
+            skipped_modules.append((module_name, evalue))
+            continue
+        uncached_time = min(timeit.repeat(lambda: instantiate(module_class, False), number=repeat, repeat=3)) / repeat * 1000
+        cached_time = min(timeit.repeat(lambda: instantiate(module_class, True), number=repeat, repeat=3)) / repeat * 1000
+        total_uncached += uncached_time
+        total_cached += cached_time
+        print("%-28s %12.4f %12.4f" % (module_name, uncached_time, cached_time))
+    print("%-28s %12.4f %12.4f" % ("all modules", total_uncached, total_cached))
+    for module_name, reason in skipped_modules:
+        print("Skipped %s: %s" % (module_name, reason))
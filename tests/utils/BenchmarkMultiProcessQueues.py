@@ -0,0 +1,76 @@
+"""
+Benchmark for the inter process queues, as used between LumberMill workers and the main process.
+
+Each producer process sends msgpack serialized batches of events, prefixed with the send time. The consumer only
+reads the send time, so the results show the transport costs, not the costs of msgpack.
+ZeroMqMpQueue only supports a single producer and is only run with one.
+
+Run with:
+python tests/utils/BenchmarkMultiProcessQueues.py
+"""
+import os
+import sys
+import time
+import struct
+import multiprocessing
+
+import msgpack
+
+pathname = os.path.abspath(__file__)
+sys.path.insert(0, pathname[:pathname.rfind("/tests/")])
+
+import lumbermill.utils.DictUtils as DictUtils
+from lumbermill.constants import ZMQ_AVAILABLE
+from lumbermill.utils.Buffers import SharedMemoryRingQueue, ZeroMqMpQueue
+
+PRODUCERS = 3
+BATCHES_PER_PRODUCER = 2000
+BATCH_SIZE = 50
+# Set in each producer process, like the worker index of a LumberMill worker.
+worker_index = 0
+
+
+def getWorkerIndex():
+    return worker_index
+
+
+def produceBatches(queue, done, index):
+    global worker_index
+    worker_index = index
+    batch = msgpack.packb([DictUtils.getDefaultEventDict({'data': '192.168.2.20 - - [28/Jul/2006:10:27:10 -0300] "GET /cgi-bin/try/ HTTP/1.0" 200 3395'}) for _ in range(0, BATCH_SIZE)])
+    for _ in range(0, BATCHES_PER_PRODUCER):
+        queue.put(struct.pack("d", time.time()) + batch)
+    # Keep the process alive until everything is received. Pending zmq messages would be lost otherwise.
+    done.wait()
+
+
+def runBenchmark(queue, producer_count):
+    done = multiprocessing.Event()
+    producers = [multiprocessing.Process(target=produceBatches, args=(queue, done, index)) for index in range(0, producer_count)]
+    start_time = time.time()
+    for producer in producers:
+        producer.start()
+    latencies = []
+    events = 0
+    for _ in range(0, producer_count * BATCHES_PER_PRODUCER):
+        sent, = struct.unpack_from("d", queue.get())
+        latencies.append(time.time() - sent)
+        events += BATCH_SIZE
+    duration = time.time() - start_time
+    done.set()
+    for producer in producers:
+        producer.join()
+    latencies.sort()
+    return events / duration, latencies[int(len(latencies) * .99)] * 1000
+
+
+if __name__ == "__main__":
+    queues = [('multiprocessing.Queue', lambda: multiprocessing.Queue(20), [1, PRODUCERS]),
+              ('SharedMemoryRingQueue', lambda: SharedMemoryRingQueue(20, rings=PRODUCERS, get_worker_index=getWorkerIndex), [1, PRODUCERS])]
+    if ZMQ_AVAILABLE:
+        queues.append(('ZeroMqMpQueue', lambda: ZeroMqMpQueue(20), [1]))
+    print("%-24s %10s %12s %18s" % ("queue", "producers", "eps", "p99 latency (ms)"))
+    for name, queue_factory, producer_counts in queues:
+        for producer_count in producer_counts:
+            eps, p99_latency = runBenchmark(queue_factory(), producer_count)
+            print("%-24s %10d %12d %18.3f" % (name, producer_count, eps, p99_latency))
@@ -0,0 +1,43 @@
+import time
+import Queue
+import mock
+import lumbermill.utils.DictUtils as DictUtils
+
+from tests.ModuleBaseTestCase import ModuleBaseTestCase
+from lumbermill.constants import BACKPRESSURE_CHECK_INTERVAL
+from lumbermill.misc import Noop
+from lumbermill.utils.Buffers import BufferedQueue
+
+
+class TestBackpressure(ModuleBaseTestCase):
+
+    def setUp(self):
+        super(TestBackpressure, self).setUp(Noop.Noop(mock.Mock()))
+        self.test_object.configure({})
+
+    def testSaturatedQueueDownstream(self):
+        second_noop = Noop.Noop(mock.Mock())
+        second_noop.configure({})
+        queue = BufferedQueue(queue=Queue.Queue(1), buffersize=1, serialize=False)
+        self.addCleanup(queue.buffer.stopInterval)
+        second_noop.addReceiver('Queue', queue)
+        self.test_object.addReceiver('SecondNoop', second_noop)
+        # Loops in the module graph must not lead to endless recursion.
+        second_noop.addReceiver('Noop', self.test_object)
+        self.assertFalse(self.test_object.isSaturated())
+        queue.put(DictUtils.getDefaultEventDict({'data': 'spam'}))
+        # Wait for the flusher thread to put the batch into the queue.
+        queue.buffer.flush()
+        self.assertTrue(self.test_object.isSaturated())
+
+    def testSaturationIsCached(self):
+        queue = BufferedQueue(queue=Queue.Queue(1), buffersize=1, serialize=False)
+        self.addCleanup(queue.buffer.stopInterval)
+        self.test_object.addReceiver('Queue', queue)
+        self.assertFalse(self.test_object.isSaturatedCached())
+        queue.put(DictUtils.getDefaultEventDict({'data': 'spam'}))
+        queue.buffer.flush()
+        # The cached result is used till BACKPRESSURE_CHECK_INTERVAL passed.
+        self.assertFalse(self.test_object.isSaturatedCached())
+        time.sleep(BACKPRESSURE_CHECK_INTERVAL)
+        self.assertTrue(self.test_object.isSaturatedCached())
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+import lumbermill.utils.CaptureFile as CaptureFile
+from lumbermill.Benchmark import rewriteConfiguration, summarizeResults
+from lumbermill.constants import LUMBERMILL_BASEPATH
+from lumbermill.utils.ModuleRegistry import ModuleRegistry
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.module_registry = ModuleRegistry(LUMBERMILL_BASEPATH, ['input', 'parser', 'modifier', 'misc', 'output'])
+        self.configuration = [{'Global': {'workers': 4}},
+                              {'TcpServer': {'port': 5151}},
+                              {'JsonParser': {'receivers': ['StdOutSink', {'DevNullSink': {'filter': '$(a) == 1'}}]}},
+                              'StdOutSink',
+                              'DevNullSink']
+
+    def testInputsAndOutputsAreReplaced(self):
+        configuration = rewriteConfiguration(self.configuration, self.module_registry, '/tmp/results', rate=1000, workers=2)
+        self.assertEqual(configuration[0], {'Global': {'workers': 2, 'module_statistics': True}})
+        self.assertEqual(configuration[1], {'BenchmarkInput': {'id': 'TcpServer', 'receivers': ['JsonParser'], 'rate': 1000.0}})
+        self.assertEqual(configuration[2]['JsonParser']['receivers'], ['StdOutSink', {'DevNullSink': {'filter': '$(a) == 1'}}])
+        self.assertEqual(configuration[3], {'BenchmarkSink': {'id': 'StdOutSink', 'results_path': '/tmp/results'}})
+        self.assertEqual(configuration[4], {'BenchmarkSink': {'id': 'DevNullSink', 'results_path': '/tmp/results'}})
+
+    def testKeepOutputs(self):
+        configuration = rewriteConfiguration(self.configuration, self.module_registry, '/tmp/results', keep_outputs=True)
+        self.assertEqual(configuration[2]['JsonParser']['receivers'], ['StdOutSink', {'DevNullSink': {'filter': '$(a) == 1'}}, 'BenchmarkSink'])
+        self.assertEqual(configuration[3], {'StdOutSink': {'id': 'StdOutSink'}})
+        self.assertEqual(configuration[-1], {'BenchmarkSink': {'id': 'BenchmarkSink', 'results_path': '/tmp/results'}})
+
+    def testSummarizeResults(self):
+        module_stats = {'events_in': 100, 'events_out': 100, 'events_dropped': 0, 'filter_passed': 0, 'filter_skipped': 0,
+                        'timed_events': 10, 'processing_time': 0.001, 'histogram': [0, 10, 0, 0, 0, 0, 0, 0, 0, 0]}
+        sink_results = [('Sink', {'worker': worker, 'pid': 100 + worker, 'events': 100, 'first_event_at': 10, 'last_event_at': 20,
+                                  'timed_events': 100, 'latency': 0.1, 'latency_histogram': [100] + [0] * 11,
+                                  'module_statistics': {'JsonParser': module_stats}}) for worker in [0, 1]]
+        report = summarizeResults(sink_results, {'100': {'cpu_percent': 50, 'max_rss': 1024}}, 10)
+        self.assertEqual(report['events'], 200)
+        self.assertEqual(report['eps'], 20)
+        self.assertEqual(report['eps_per_worker'], {'0': 10, '1': 10})
+        self.assertEqual(report['latency']['p99'], 0.0001)
+        self.assertEqual(report['processes']['100']['worker'], 0)
+        self.assertEqual(report['modules']['JsonParser']['events_in'], 200)
+        self.assertEqual(report['modules']['JsonParser']['avg_processing_time'], 0.0001)
+        self.assertEqual(report['modules']['JsonParser']['p50'], 0.00005)
+
+    def testReplayCapture(self):
+        capture_file_name = tempfile.mktemp()
+        with open(capture_file_name, 'wb') as capture_file:
+            capture_file.write(CaptureFile.MAGIC)
+        try:
+            configuration = rewriteConfiguration(self.configuration, self.module_registry, '/tmp/results', replay_file=capture_file_name, speed=2)
+        finally:
+            os.remove(capture_file_name)
+        self.assertEqual(configuration[1], {'Replay': {'id': 'TcpServer', 'receivers': ['JsonParser'], 'file_name': capture_file_name, 'speed': 2, 'loop': True}})
@@ -0,0 +1,143 @@
+import time
+import threading
+import unittest
+
+from lumbermill.utils.Buffers import Buffer
+
+
+class TestBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.stored_batches = []
+        self.store_allowed = threading.Event()
+        self.store_allowed.set()
+
+    def storeBatch(self, batch):
+        self.store_allowed.wait(2)
+        self.stored_batches.append(list(batch))
+        return True
+
+    def getBuffer(self, callback=None, maxsize=5000, max_in_flight=1, interval=60, max_retries=10):
+        buffer = Buffer(flush_size=2, callback=callback or self.storeBatch, interval=interval, maxsize=maxsize, max_in_flight=max_in_flight,
+                        max_retries=max_retries)
+        self.addCleanup(buffer.stopInterval)
+        return buffer
+
+    def testFlushOnFlushSize(self):
+        buffer = self.getBuffer()
+        buffer.put('spam')
+        buffer.flush()
+        self.assertEqual(self.stored_batches, [['spam']])
+        buffer.put('eggs')
+        buffer.put('ham')
+        buffer.flush()
+        self.assertEqual(self.stored_batches, [['spam'], ['eggs', 'ham']])
+        self.assertEqual(buffer.bufsize(), 0)
+
+    def testAppendWhileFlushing(self):
+        self.store_allowed.clear()
+        buffer = self.getBuffer()
+        buffer.extend(['spam', 'eggs'])
+        # The callback is blocked, but new items are still accepted.
+        buffer.extend(['ham', 'bacon', 'sausage'])
+        self.assertEqual(buffer.bufsize(), 5)
+        self.store_allowed.set()
+        buffer.flush()
+        self.assertEqual(self.stored_batches, [['spam', 'eggs'], ['ham', 'bacon', 'sausage']])
+
+    def testRetryFailedBatch(self):
+        results = [False, True]
+        def storeBatch(batch):
+            self.stored_batches.append(list(batch))
+            return results.pop(0)
+        buffer = self.getBuffer(storeBatch, interval=.05)
+        buffer.extend(['spam', 'eggs'])
+        for _ in range(0, 50):
+            if buffer.bufsize() == 0:
+                break
+            time.sleep(.02)
+        self.assertEqual(self.stored_batches, [['spam', 'eggs'], ['spam', 'eggs']])
+        self.assertEqual(buffer.bufsize(), 0)
+
+    def testDropBatchAfterMaxRetries(self):
+        def storeBatch(batch):
+            self.stored_batches.append(list(batch))
+            return batch != ['spam', 'eggs']
+        buffer = self.getBuffer(storeBatch, interval=.02, max_retries=2)
+        buffer.extend(['spam', 'eggs'])
+        for _ in range(0, 50):
+            if buffer.bufsize() == 0:
+                break
+            time.sleep(.02)
+        self.assertEqual(self.stored_batches, [['spam', 'eggs']] * 3)
+        self.assertEqual(buffer.getStats()['dropped_items'], 2)
+        # The next batch is not blocked by the dropped one.
+        buffer.extend(['ham', 'bacon'])
+        buffer.flush()
+        self.assertEqual(self.stored_batches[-1], ['ham', 'bacon'])
+
+    def testDirectFlushKeepsItemsOnFailure(self):
+        buffer = self.getBuffer(lambda batch: False, max_in_flight=0)
+        buffer.extend(['spam', 'eggs'])
+        buffer.put('ham')
+        self.assertEqual(buffer.buffer, ['spam', 'eggs', 'ham'])
+
+    def testDirectFlushDropsItemsAfterMaxRetries(self):
+        buffer = self.getBuffer(lambda batch: False, max_in_flight=0, max_retries=1)
+        buffer.extend(['spam', 'eggs'])
+        buffer.put('ham')
+        self.assertEqual(buffer.bufsize(), 0)
+        self.assertEqual(buffer.getStats()['dropped_items'], 3)
+
+    def testFullBufferBlocksTillFlushed(self):
+        self.store_allowed.clear()
+        buffer = self.getBuffer(maxsize=2)
+        buffer.extend(['spam', 'eggs'])
+        buffer.extend(['ham', 'bacon', 'sausage'])
+        self.assertTrue(buffer.isFull())
+        put_done = threading.Event()
+        def putItem():
+            buffer.put('beans')
+            put_done.set()
+        producer = threading.Thread(target=putItem)
+        producer.daemon = True
+        producer.start()
+        time.sleep(.1)
+        self.assertFalse(put_done.is_set())
+        self.store_allowed.set()
+        self.assertTrue(put_done.wait(2))
+        buffer.flush()
+        self.assertEqual(self.stored_batches, [['spam', 'eggs'], ['ham', 'bacon', 'sausage'], ['beans']])
+
+    def testAdaptiveFlushSizeGrowsWithFastCallback(self):
+        buffer = Buffer(flush_size=10, callback=self.storeBatch, interval=60, max_in_flight=0, adaptive=True,
+                        min_flush_size=5, max_flush_size=80, target_latency=1)
+        self.addCleanup(buffer.stopInterval)
+        for _ in range(0, 10):
+            buffer.extend(['spam'] * buffer.flush_size)
+        # A fast callback and a high incoming rate grow the flush size up to its upper bound.
+        self.assertEqual(buffer.getStats()['flush_size'], 80)
+        self.assertTrue(buffer.getStats()['adaptive'])
+
+    def testAdaptiveFlushSizeShrinksWithSlowCallback(self):
+        def storeBatch(batch):
+            time.sleep(.002 * len(batch))
+            return True
+        buffer = Buffer(flush_size=40, callback=storeBatch, interval=60, max_in_flight=0, adaptive=True,
+                        min_flush_size=5, max_flush_size=80, target_latency=.02)
+        self.addCleanup(buffer.stopInterval)
+        for _ in range(0, 5):
+            buffer.extend(['spam'] * buffer.flush_size)
+        # Storing 10 items takes about the target latency of 20ms.
+        self.assertTrue(5 <= buffer.getStats()['flush_size'] <= 12)
+
+    def testAdaptiveFlushSizeFollowsIncomingRate(self):
+        buffer = Buffer(flush_size=40, callback=self.storeBatch, interval=60, max_in_flight=0, adaptive=True,
+                        min_flush_size=5, max_flush_size=80, target_latency=.1)
+        self.addCleanup(buffer.stopInterval)
+        for _ in range(0, 5):
+            buffer.extend(['spam', 'eggs'])
+            time.sleep(.05)
+            buffer.flush()
+        # With 40 items per second, a batch fills up in target_latency seconds with 4 items.
+        self.assertEqual(buffer.getStats()['flush_size'], 5)
@@ -0,0 +1,59 @@
+import time
+import Queue
+import unittest
+import lumbermill.utils.DictUtils as DictUtils
+
+from lumbermill.utils.Buffers import BufferedQueue
+
+
+class TestBufferedQueue(unittest.TestCase):
+
+    def getQueue(self, serialize):
+        queue = BufferedQueue(queue=Queue.Queue(20), buffersize=2, serialize=serialize)
+        self.addCleanup(queue.buffer.stopInterval)
+        return queue
+
+    def testSimpleQueuePassesEventsByReference(self):
+        queue = self.getQueue(serialize=False)
+        events = [DictUtils.getDefaultEventDict({'data': 'spam'}), DictUtils.getDefaultEventDict({'data': 'eggs'})]
+        queue.extend(events)
+        received_events = list(queue.get(timeout=1))
+        self.assertEqual(len(received_events), 2)
+        self.assertIs(received_events[0], events[0])
+        self.assertIs(received_events[1], events[1])
+
+    def testSerializingQueue(self):
+        queue = self.getQueue(serialize=True)
+        event = DictUtils.getDefaultEventDict({'data': 'spam'})
+        queue.put(event)
+        queue.put(DictUtils.getDefaultEventDict({'data': 'eggs'}))
+        received_events = list(queue.get(timeout=1))
+        self.assertEqual(len(received_events), 2)
+        self.assertIsNot(received_events[0], event)
+        self.assertEqual(received_events[0]['data'], 'spam')
+        self.assertEqual(received_events[0]['lumbermill.event_id'], event['lumbermill.event_id'])
+        self.assertEqual(received_events[0].__class__.__name__, 'KeyDotNotationDict')
+
+    def testIsSaturated(self):
+        queue = BufferedQueue(queue=Queue.Queue(1), buffersize=1, serialize=False)
+        self.addCleanup(queue.buffer.stopInterval)
+        self.assertFalse(queue.isSaturated())
+        queue.put(DictUtils.getDefaultEventDict({'data': 'spam'}))
+        # Wait for the flusher thread to put the batch into the queue.
+        queue.buffer.flush()
+        self.assertTrue(queue.isSaturated())
+        list(queue.get(timeout=1))
+        self.assertFalse(queue.isSaturated())
+
+    def testTimedFlushDoesNotBlockOnFullQueue(self):
+        queue = BufferedQueue(queue=Queue.Queue(1), buffersize=10, serialize=False)
+        self.addCleanup(queue.buffer.stopInterval)
+        queue.queue.put(['spam'])
+        queue.put(DictUtils.getDefaultEventDict({'data': 'eggs'}))
+        started_at = time.time()
+        # Called by the scheduler thread on each interval.
+        queue.buffer.startFlush()
+        self.assertLess(time.time() - started_at, .5)
+        self.assertEqual(list(queue.get(timeout=1)), ['spam'])
+        received_events = list(queue.get(timeout=1))
+        self.assertEqual(received_events[0]['data'], 'eggs')
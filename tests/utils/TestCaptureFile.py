@@ -0,0 +1,63 @@
+import os
+import datetime
+import tempfile
+import unittest
+
+import lumbermill.utils.CaptureFile as CaptureFile
+import lumbermill.utils.DictUtils as DictUtils
+
+
+class TestCaptureFile(unittest.TestCase):
+
+    def setUp(self):
+        self.capture_file_name = tempfile.mktemp()
+
+    def tearDown(self):
+        if os.path.exists(self.capture_file_name):
+            os.remove(self.capture_file_name)
+
+    def writeCapture(self, blocks):
+        with open(self.capture_file_name, 'wb') as capture_file:
+            capture_file.write(CaptureFile.MAGIC)
+            for block in blocks:
+                capture_file.write(block)
+
+    def readCapture(self, worker_count=1, worker_index=0):
+        reader = CaptureFile.CaptureFileReader(self.capture_file_name)
+        try:
+            return list(reader.iterRecords(worker_count, worker_index))
+        finally:
+            reader.close()
+
+    def testRoundTrip(self):
+        event = DictUtils.getDefaultEventDict({'data': 'Spam', 'price': 1.5, 'tags': ['a'], 'name': u'Gambolputty', 'date': datetime.date(2017, 11, 3)},
+                                              event_type='menu')
+        self.writeCapture([CaptureFile.encodeBlock([CaptureFile.encodeRecord(event, 100)]),
+                           CaptureFile.encodeBlock([CaptureFile.encodeRecord(event, 101)], 'zlib')])
+        records = self.readCapture()
+        self.assertEqual([captured_at for captured_at, _ in records], [100, 101])
+        for captured_at, captured_event in records:
+            self.assertEqual(captured_event['data'], 'Spam')
+            self.assertEqual(captured_event['tags'], ['a'])
+            self.assertTrue(isinstance(captured_event['name'], unicode))
+            self.assertEqual(captured_event['date'], '2017-11-03')
+            self.assertEqual(captured_event['lumbermill']['event_type'], 'menu')
+            # The event id was not captured, a new one is generated.
+            self.assertNotEqual(captured_event['lumbermill']['event_id'], event['lumbermill']['event_id'])
+
+    def testTruncatedBlockIsIgnored(self):
+        block = CaptureFile.encodeBlock([CaptureFile.encodeRecord(DictUtils.getDefaultEventDict({'data': 'Spam'}), 100)])
+        self.writeCapture([block, block[:-3]])
+        self.assertEqual(len(self.readCapture()), 1)
+
+    def testRecordsAreSplitBetweenWorkers(self):
+        records = [CaptureFile.encodeRecord(DictUtils.getDefaultEventDict({'data': str(idx)}), 100 + idx) for idx in range(0, 5)]
+        self.writeCapture([CaptureFile.encodeBlock(records[:3]), CaptureFile.encodeBlock(records[3:])])
+        self.assertEqual([event['data'] for _, event in self.readCapture(2, 0)], ['0', '2', '4'])
+        self.assertEqual([event['data'] for _, event in self.readCapture(2, 1)], ['1', '3'])
+
+    def testNoCaptureFile(self):
+        with open(self.capture_file_name, 'w') as capture_file:
+            capture_file.write('Spam, spam, spam, egg and spam.\n')
+        self.assertFalse(CaptureFile.isCaptureFile(self.capture_file_name))
+        self.assertRaises(ValueError, CaptureFile.CaptureFileReader, self.capture_file_name)
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import unittest
+import lumbermill.utils.DictUtils as DictUtils
+
+from lumbermill.utils.Codecs import getCodec, getCodecNames
+
+
+class TestCodecs(unittest.TestCase):
+
+    def setUp(self):
+        self.event = DictUtils.getDefaultEventDict({'data': '192.168.2.20 - - [28/Jul/2006:10:27:10 -0300] "GET /cgi-bin/try/ HTTP/1.0" 200 3395',
+                                                    'bytes_send': 3395,
+                                                    'ratio': 0.5,
+                                                    'cached': False,
+                                                    'user': None,
+                                                    'params': {u'spanish': [u'inquisition', u'überraschung']},
+                                                    'fields': ['nobody', 'expects', {'the': 'spanish inquisition'}]},
+                                                   caller_class_name='Spam')
+
+    def testRegisteredCodecs(self):
+        self.assertTrue(set(['pickle', 'marshal']).issubset(getCodecNames()))
+        self.assertRaises(KeyError, getCodec, 'spam')
+
+    def testRoundTrip(self):
+        for codec_name in getCodecNames():
+            codec = getCodec(codec_name)
+            events = codec.decode(codec.encode([self.event, self.event.copy()]))
+            self.assertEqual(len(events), 2)
+            event = events[0]
+            self.assertEqual(event.__class__.__name__, 'KeyDotNotationDict', codec_name)
+            self.assertEqual(event['lumbermill'].__class__.__name__, 'EventMetadata', codec_name)
+            self.assertEqual(event, self.event, codec_name)
+            self.assertEqual(event['lumbermill.event_id'], self.event['lumbermill.event_id'], codec_name)
+            self.assertNotEqual(events[1]['lumbermill.event_id'], self.event['lumbermill.event_id'], codec_name)
+            self.assertEqual(type(event['data']), str, codec_name)
+            self.assertEqual(type(event['params.spanish.1']), unicode, codec_name)
+            self.assertEqual(event['fields.2.the'], 'spanish inquisition', codec_name)
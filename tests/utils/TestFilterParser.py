@@ -0,0 +1,90 @@
+import ast
+import mock
+import unittest
+
+import lumbermill.utils.DictUtils as DictUtils
+from lumbermill.utils.filterparser import FilterParser
+from lumbermill.utils.filterparser.FilterParser import CompiledFilter, TermReorderer
+
+
+class TestFilterParser(unittest.TestCase):
+
+    def setUp(self):
+        self.event = DictUtils.getDefaultEventDict({'url': 'GET /wiki/Monty_Python HTTP/1.0',
+                                                    'http_status': 200,
+                                                    'fields': ['nobody', 'expects']})
+        self.lumbermill = mock.Mock()
+        FilterParser.internal_values.clear()
+
+    def reorder(self, expression):
+        tree = TermReorderer().visit(ast.parse(expression, mode='eval'))
+        return [ast.dump(term) for term in tree.body.values]
+
+    def testFieldReferences(self):
+        event_filter = CompiledFilter('if $(http_status) == 200 and %(lumbermill.event_type)s == "Unknown"')
+        self.assertTrue(event_filter(self.lumbermill, self.event))
+        self.event['http_status'] = 404
+        self.assertFalse(event_filter(self.lumbermill, self.event))
+
+    def testMissingFieldIsFalse(self):
+        event_filter = CompiledFilter('not $(does.not.exist)')
+        self.assertTrue(event_filter(self.lumbermill, self.event))
+
+    def testMethodCallOnField(self):
+        self.assertTrue(CompiledFilter('$(url).startswith("GET")')(self.lumbermill, self.event))
+        self.assertTrue(CompiledFilter('%(url).startswith("GET")')(self.lumbermill, self.event))
+        self.assertFalse(CompiledFilter('%(url)s.startswith("POST")')(self.lumbermill, self.event))
+
+    def testSyntaxErrorRaises(self):
+        self.assertRaises(SyntaxError, CompiledFilter, '$(url) ==')
+
+    def testCheapTermsFirst(self):
+        terms = self.reorder('internal_1(lumbermill) and field_2(event, False) == 1')
+        self.assertEqual(terms, self.reorder('field_2(event, False) == 1 and internal_1(lumbermill)'))
+
+    def testUnsafeTermsNeverMoveForward(self):
+        # The internal lookup is safe and cheaper than the method call, so it moves in front of it.
+        terms = self.reorder('field_1(event, False) and field_1(event, False).startswith("GET") and internal_2(lumbermill)')
+        self.assertEqual(terms, self.reorder('field_1(event, False) and internal_2(lumbermill) and field_1(event, False).startswith("GET")'))
+        # Unsafe terms keep their order.
+        expression = 'field_1(event, False).endswith("0") and field_1(event, False).startswith("GET")'
+        self.assertEqual(self.reorder(expression), [ast.dump(term) for term in ast.parse(expression, mode='eval').body.values])
+
+    def testMembershipInFieldIsUnsafe(self):
+        self.assertEqual(FilterParser.estimateCost(ast.parse('"nobody" in field_1(event, False)', mode='eval').body), FilterParser.UNSAFE_COST)
+        self.assertTrue(FilterParser.estimateCost(ast.parse('field_1(event, False) in ["GET", "POST"]', mode='eval').body) < FilterParser.UNSAFE_COST)
+
+    def testMembershipInStringOrSetIsUnsafe(self):
+        # A missing field is False, and False in 'GET' raises a TypeError, as does an unhashable value in a set.
+        self.assertEqual(FilterParser.estimateCost(ast.parse('field_1(event, False) in "GET"', mode='eval').body), FilterParser.UNSAFE_COST)
+        self.assertEqual(FilterParser.estimateCost(ast.parse('field_1(event, False) not in "GET"', mode='eval').body), FilterParser.UNSAFE_COST)
+        self.assertEqual(FilterParser.estimateCost(ast.parse('field_1(event, False) in {"GET", "POST"}', mode='eval').body), FilterParser.UNSAFE_COST)
+
+    def testInternalValuesAreCached(self):
+        self.lumbermill.getFromInternalDataStore.return_value = 'spam'
+        event_filter = CompiledFilter('%(internal.food)s == "spam"')
+        for _ in range(0, 3):
+            self.assertTrue(event_filter(self.lumbermill, self.event))
+        self.assertEqual(self.lumbermill.getFromInternalDataStore.call_count, 1)
+        # Values set in this process are visible right away.
+        FilterParser.setInternalValue('food', 'eggs')
+        self.assertFalse(event_filter(self.lumbermill, self.event))
+
+    def testStats(self):
+        event_filter = CompiledFilter('$(http_status) == 200')
+        for _ in range(0, FilterParser.TIMING_SAMPLE_RATE):
+            event_filter(self.lumbermill, self.event)
+        self.event['http_status'] = 404
+        event_filter(self.lumbermill, self.event)
+        stats = event_filter.resetStats()
+        self.assertEqual(stats['evaluations'], FilterParser.TIMING_SAMPLE_RATE + 1)
+        self.assertEqual(stats['matches'], FilterParser.TIMING_SAMPLE_RATE)
+        self.assertEqual(stats['timed_evaluations'], 1)
+        self.assertEqual(event_filter.resetStats()['evaluations'], 0)
+
+    def testEqualityTest(self):
+        self.assertEqual(CompiledFilter("$(lumbermill.event_type) == 'httpd_access_log'").equality_test, ('lumbermill.event_type', ('httpd_access_log',)))
+        self.assertEqual(CompiledFilter("404 == $(http_status) or $(http_status) in [500, 503]").equality_test, ('http_status', (404, 500, 503)))
+        self.assertEqual(CompiledFilter("$(http_status) == 404 or $(url) == '/'").equality_test, None)
+        self.assertEqual(CompiledFilter("$(http_status) != 404").equality_test, None)
+        self.assertEqual(CompiledFilter("$(url).lower() == 'get'").equality_test, None)
@@ -1,3 +1,4 @@
+import copy
 import unittest
 import lumbermill.utils.DictUtils as DictUtils
 
@@ -48,5 +49,105 @@ class TestKeyDotNotationDict(unittest.TestCase):
         self.assertTrue(self.event.get('empty.nobody') == 'expects')
         self.assertTrue(self.event.get('params.spanish.0') == 'inquisition')
 
+    def testCopyHasNewEventId(self):
+        event_copy = self.event.copy()
+        self.assertNotEqual(event_copy['lumbermill.event_id'], self.event['lumbermill.event_id'])
+        self.assertEqual(self.event['lumbermill.event_id'], "715bd321b1016a442bf046682722c78e")
+
+    def testCopyOnWriteViaDotAccess(self):
+        event_copy = self.event.copy()
+        event_copy['params.spanish'] = 'inquisition'
+        event_copy['lumbermill.event_type'] = 'sketch'
+        self.assertEqual(self.event['params.spanish'], [u'inquisition'])
+        self.assertEqual(self.event['lumbermill.event_type'], 'httpd_access_log')
+        self.assertEqual(event_copy['params.spanish'], 'inquisition')
+        self.assertEqual(event_copy['lumbermill.event_type'], 'sketch')
+
+    def testCopyOnWriteViaNestedContainer(self):
+        event_copy = self.event.copy()
+        event_copy['fields'].append('spanish inquisition')
+        event_copy['lumbermill']['event_type'] = 'sketch'
+        self.assertEqual(self.event['fields'], ['nobody', 'expects', 'the'])
+        self.assertEqual(self.event['lumbermill']['event_type'], 'httpd_access_log')
+        self.assertEqual(event_copy['fields'], ['nobody', 'expects', 'the', 'spanish inquisition'])
+        self.assertEqual(event_copy['lumbermill']['event_type'], 'sketch')
+
+    def testCopyOnWriteOfOriginal(self):
+        event_copy = self.event.copy()
+        self.event['params']['spanish'].append('surprise')
+        self.event.pop('fields').append('spanish inquisition')
+        for key, value in self.event.items():
+            if key == 'empty':
+                value['nobody'] = 'expects'
+        self.assertEqual(event_copy['params.spanish'], [u'inquisition'])
+        self.assertEqual(event_copy['fields'], ['nobody', 'expects', 'the'])
+        self.assertEqual(event_copy['empty'], {})
+
+    def testCopyOfCopy(self):
+        event_copy = self.event.copy()
+        event_copy_copy = event_copy.copy()
+        event_copy_copy['params']['spanish'] = 'surprise'
+        event_copy.update({'params': {}})
+        self.assertEqual(self.event['params.spanish'], [u'inquisition'])
+        self.assertEqual(event_copy['params'], {})
+        self.assertEqual(event_copy_copy['params.spanish'], 'surprise')
+
+    def testFieldPathGet(self):
+        self.assertEqual(DictUtils.compileFieldPath('bytes_send').get(self.event), 3395)
+        self.assertEqual(DictUtils.compileFieldPath('lumbermill.event_id').get(self.event), "715bd321b1016a442bf046682722c78e")
+        self.assertEqual(DictUtils.compileFieldPath('lumbermill.list.2.hovercraft').get(self.event), 'eels')
+        self.assertEqual(DictUtils.compileFieldPath('lumbermill.list.3.hovercraft').get(self.event, 'default value'), 'default value')
+        self.assertEqual(DictUtils.compileFieldPath('lumbermill.list.spam').get(self.event, 'default value'), 'default value')
+        self.assertRaises(KeyError, DictUtils.compileFieldPath('http_status.faller').getValue, self.event)
+
+    def testFieldPathSetDeletePop(self):
+        DictUtils.compileFieldPath('params.nobody').set(self.event, 'expects')
+        DictUtils.compileFieldPath('lumbermill.list.0').set(self.event, 30)
+        self.assertEqual(self.event['params.nobody'], 'expects')
+        self.assertEqual(self.event['lumbermill.list.0'], 30)
+        self.assertRaises(KeyError, DictUtils.compileFieldPath('missing.nobody').set, self.event, 'expects')
+        DictUtils.compileFieldPath('params.nobody').delete(self.event)
+        self.assertFalse(DictUtils.compileFieldPath('params.nobody').contains(self.event))
+        self.assertEqual(DictUtils.compileFieldPath('fields.1').pop(self.event), 'expects')
+        self.assertEqual(self.event['fields'], ['nobody', 'the'])
+        self.assertEqual(DictUtils.compileFieldPath('fields.5').pop(self.event, 'default value'), 'default value')
+
+    def testFieldPathIsCached(self):
+        self.assertIs(DictUtils.compileFieldPath('lumbermill.event_id'), DictUtils.compileFieldPath('lumbermill.event_id'))
+
+    def testFieldPathCopyOnWrite(self):
+        event_copy = self.event.copy()
+        DictUtils.compileFieldPath('params.spanish').get(event_copy).append('surprise')
+        DictUtils.compileFieldPath('lumbermill.event_type').set(event_copy, 'sketch')
+        DictUtils.compileFieldPath('fields').set(event_copy, [])
+        self.assertEqual(self.event['params.spanish'], [u'inquisition'])
+        self.assertEqual(self.event['lumbermill.event_type'], 'httpd_access_log')
+        self.assertEqual(self.event['fields'], ['nobody', 'expects', 'the'])
+        self.assertEqual(event_copy['params.spanish'], [u'inquisition', 'surprise'])
+
+    def testLazyEventId(self):
+        event = DictUtils.getDefaultEventDict({'data': 'spam'})
+        self.assertTrue('event_id' in event['lumbermill'])
+        event_id = event['lumbermill.event_id']
+        self.assertEqual(event['lumbermill'].get('event_id'), event_id)
+        self.assertEqual(dict(event['lumbermill'].items())['event_id'], event_id)
+        event_copy = event.copy()
+        self.assertNotEqual(event_copy['lumbermill.event_id'], event_id)
+        self.assertEqual(event['lumbermill.event_id'], event_id)
+
+    def testLazyEventIdOfCopies(self):
+        event = DictUtils.getDefaultEventDict({'data': 'spam'})
+        event_copy = event.copy()
+        self.assertNotEqual(event_copy['lumbermill.event_id'], event['lumbermill.event_id'])
+        self.assertEqual(copy.deepcopy(event)['lumbermill.event_id'], event['lumbermill.event_id'])
+
+    def testMaterializeEventId(self):
+        event = DictUtils.getDefaultEventDict({'data': 'spam'})
+        DictUtils.materializeEventId(event)
+        # Serializers like ujson or bson read the dict internals directly.
+        event_id = dict.get(event['lumbermill'], 'event_id')
+        self.assertIsNotNone(event_id)
+        self.assertEqual(event['lumbermill.event_id'], event_id)
+
     def testInStringFails(self):
         print(self.event['http_status.faller'])
\ No newline at end of file
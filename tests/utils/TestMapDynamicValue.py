@@ -3,7 +3,7 @@ import logging
 import unittest
 import lumbermill.utils.DictUtils as DictUtils
 
-from lumbermill.utils.DynamicValues import mapDynamicValue
+from lumbermill.utils.DynamicValues import mapDynamicValue, compileDynamicValue
 
 
 class TestMapDynaimcValue(unittest.TestCase):
@@ -70,4 +70,32 @@ class TestMapDynaimcValue(unittest.TestCase):
         self.assertEquals(mapping_list, ['%(lumbermill.event_id)s'])
 
     def testMapDynamicValueWithNoneType(self):
-        self.assertEquals(mapDynamicValue(None, self.event), None)
\ No newline at end of file
+        self.assertEquals(mapDynamicValue(None, self.event), None)
+    def testCompiledTemplate(self):
+        template = compileDynamicValue('%(lumbermill.event_type)s: %(http_status)d %(missing_key)s')
+        self.assertFalse(template.is_static)
+        self.assertEquals(template.render(self.event), '%(lumbermill.event_type)s: %(http_status)d %(missing_key)s')
+        template = compileDynamicValue('%(lumbermill.event_type)s: %(http_status)d 100%%')
+        self.assertEquals(template.render(self.event), 'httpd_access_log: 200 100%')
+        self.assertIs(template, compileDynamicValue('%(lumbermill.event_type)s: %(http_status)d 100%%'))
+
+    def testCompiledStaticTemplate(self):
+        self.assertTrue(compileDynamicValue('lumbermill').is_static)
+        self.assertTrue(compileDynamicValue(['lumbermill', 1]).is_static)
+        mapping_dict = {'spam': 'eggs'}
+        self.assertIs(compileDynamicValue(mapping_dict).render(self.event), mapping_dict)
+        self.assertFalse(compileDynamicValue('lumbermill-%Y', use_strftime=True).is_static)
+
+    def testCompiledTemplateWithTimePattern(self):
+        template = compileDynamicValue('test-%Y.%m.%d-%(lumbermill.event_id)s-%(missing_key)s', use_strftime=True)
+        timestring = datetime.datetime.utcnow().strftime('%Y.%m.%d')
+        self.assertEquals(template.render(self.event), 'test-%s-%%(lumbermill.event_id)s-%%(missing_key)s' % timestring)
+        self.assertEquals(template.render({}), 'test-%s-%%(lumbermill.event_id)s-%%(missing_key)s' % timestring)
+
+    def testCompiledNestedTemplate(self):
+        template = compileDynamicValue({'%(lumbermill.event_type)s': ['%(http_status)s', 1], 'static': 'value'})
+        self.assertEquals(template.render(self.event), {'httpd_access_log': ['200', 1], 'static': 'value'})
+
+    def testTemplateWithOtherFormatCharacters(self):
+        # Not a dynamic value, so this is rendered as before.
+        self.assertRaises(TypeError, compileDynamicValue('%(http_status)s %d').render, self.event)
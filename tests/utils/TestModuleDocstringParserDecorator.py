@@ -41,3 +41,12 @@ class TestModuleDocStringParserDecorator(unittest.TestCase):
 
 
 
+
+    def testDocstringIsParsedOncePerClass(self):
+        first_instance = DocStringExample()
+        second_instance = DocStringExample()
+        self.assertIs(first_instance.configuration_metadata, second_instance.configuration_metadata)
+        self.assertEquals(first_instance.configuration_metadata['none']['type'], ['None', 'string', 'Unicode'])
+        # Each instance gets its own copy of mutable defaults.
+        first_instance.configuration_data['list'].append('field4')
+        self.assertEquals(second_instance.configuration_data['list'], ['field2', 'field3'])
@@ -49,7 +49,6 @@ class TestModuleFilters(tests.ModuleBaseTestCase.ModuleBaseTestCase):
             self.assertTrue(event['test'] == 10)
 
 
-    @unittest.skip("Some methodcalls are still failing due to problems with regex. Work in progress.")
     def testInputFilterMatchWithMethodCall(self):
         self.test_object.configure({'filter': 'if $(url).startswith("GET")',
                                     'target_field': 'test',
@@ -68,6 +67,35 @@ class TestModuleFilters(tests.ModuleBaseTestCase.ModuleBaseTestCase):
         for event in self.receiver.getEvent():
             self.assertTrue('test' not in event)
 
+    def testInputFilterOnBatch(self):
+        self.test_object.configure({'filter': 'if $(lumbermill.source_module) == "StdIn"',
+                                    'target_field': 'test',
+                                    'function': 'int($(cache_hits)) * 2'})
+        self.checkConfiguration()
+        unmatched_event = self.event.copy()
+        unmatched_event['lumbermill']['source_module'] = 'TcpServer'
+        self.test_object.receiveEvents([self.event, unmatched_event])
+        events = list(self.receiver.getEvent())
+        self.assertEqual(len(events), 2)
+        for event in events:
+            if event['lumbermill']['source_module'] == 'StdIn':
+                self.assertEqual(event['test'], 10)
+            else:
+                self.assertTrue('test' not in event)
+
+    def testOutputFilterOnBatch(self):
+        self.test_object.configure({'target_field': 'test',
+                                    'function': 'int($(cache_hits)) * 2',
+                                    'receivers': [{'MockReceiver': {
+                                                      'filter': 'if $(lumbermill.source_module) == "StdIn"'}}]})
+        self.checkConfiguration()
+        unmatched_event = self.event.copy()
+        unmatched_event['lumbermill']['source_module'] = 'TcpServer'
+        self.test_object.receiveEvents([self.event, unmatched_event])
+        events = list(self.receiver.getEvent())
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['lumbermill']['source_module'], 'StdIn')
+
     def testOutputFilterMatch(self):
         self.test_object.configure({'target_field': 'test',
                                     'function': 'int($(cache_hits)) * 2',
@@ -92,7 +120,6 @@ class TestModuleFilters(tests.ModuleBaseTestCase.ModuleBaseTestCase):
             received_event = event
         self.assertTrue(received_event == None)
 
-    @unittest.skip("Some methodcalls are still failing due to problems with regex. Work in progress.")
     def testOutputFilterMatchWithMethodCall(self):
         self.test_object.configure({'target_field': 'test',
                                     'function': 'int($(cache_hits)) * 2',
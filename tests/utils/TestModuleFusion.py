@@ -0,0 +1,80 @@
+import mock
+import lumbermill.utils.DictUtils as DictUtils
+
+from tests.ModuleBaseTestCase import ModuleBaseTestCase
+from lumbermill.modifier import ModifyFields
+from lumbermill.parser import RegexParser
+from lumbermill.utils.ModuleFusion import ModuleFusion, isProcessEventModule
+
+
+class TestModuleFusion(ModuleBaseTestCase):
+
+    raw_data = '192.168.2.20 - - [28/Jul/2006:10:27:10 -0300] "GET /cgi-bin/try/ HTTP/1.0" 200 3395'
+
+    def setUp(self):
+        super(TestModuleFusion, self).setUp(RegexParser.RegexParser(mock.Mock()))
+        self.modify_fields = ModifyFields.ModifyFields(mock.Mock())
+        self.modify_fields.addReceiver('RegexParser', self.test_object)
+
+    def configureModules(self, modify_fields_config={}, regex_parser_config={}):
+        config = {'action': 'insert',
+                  'target_field': 'fused',
+                  'value': 'yes'}
+        config.update(modify_fields_config)
+        self.modify_fields.configure(config)
+        config = {'field_extraction_patterns': [{'http_access_log': '(?P<remote_ip>\d+\.\d+\.\d+\.\d+)\s+(?P<identd>\w+|-)\s+(?P<user>\w+|-)\s+\[(?P<datetime>\d+\/\w+\/\d+:\d+:\d+:\d+\s.\d+)\]\s+\"(?P<url>.*)\"\s+(?P<http_status>\d+)\s+(?P<bytes_send>\d+)'}]}
+        config.update(regex_parser_config)
+        self.test_object.configure(config)
+        self.checkConfiguration()
+
+    def fuse(self):
+        modules = {'ModifyFields': {'instances': [self.modify_fields]},
+                   'RegexParser': {'instances': [self.test_object]}}
+        return ModuleFusion(mock.Mock()).fuseModules(modules)
+
+    def testIsProcessEventModule(self):
+        self.assertTrue(isProcessEventModule(self.test_object))
+        self.assertTrue(isProcessEventModule(self.modify_fields))
+
+    def testFusedChain(self):
+        self.configureModules()
+        # Mock receivers can not be fused, so only ModifyFields -> RegexParser is fused.
+        self.assertEqual(self.fuse(), 1)
+        self.modify_fields.receiveEvent(DictUtils.getDefaultEventDict({'data': self.raw_data}))
+        events = list(self.receiver.getEvent())
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['fused'], 'yes')
+        self.assertEqual(events[0]['bytes_send'], '3395')
+        self.assertEqual(events[0]['lumbermill']['event_type'], 'http_access_log')
+
+    def testFusedChainWithBatch(self):
+        self.configureModules()
+        self.fuse()
+        self.modify_fields.receiveEvents([DictUtils.getDefaultEventDict({'data': self.raw_data}) for _ in range(0, 5)])
+        events = list(self.receiver.getEvent())
+        self.assertEqual(len(events), 5)
+        for event in events:
+            self.assertEqual(event['fused'], 'yes')
+            self.assertEqual(event['bytes_send'], '3395')
+
+    def testFusedChainWithCommonActions(self):
+        self.configureModules(modify_fields_config={'add_fields': {'common': 'action'}})
+        self.fuse()
+        self.modify_fields.receiveEvent(DictUtils.getDefaultEventDict({'data': self.raw_data}))
+        events = list(self.receiver.getEvent())
+        self.assertEqual(events[0]['common'], 'action')
+
+    def testFusedChainWithInputFilter(self):
+        self.configureModules(regex_parser_config={'filter': 'if $(fused) == "no"'})
+        self.assertEqual(self.fuse(), 1)
+        self.modify_fields.receiveEvent(DictUtils.getDefaultEventDict({'data': self.raw_data}))
+        events = list(self.receiver.getEvent())
+        self.assertEqual(len(events), 1)
+        self.assertTrue('bytes_send' not in events[0])
+
+    def testOutputFilterPreventsFusion(self):
+        self.configureModules(modify_fields_config={'receivers': [{'RegexParser': {'filter': 'if $(fused) == "yes"'}}]})
+        self.assertEqual(self.fuse(), 0)
+        self.modify_fields.receiveEvent(DictUtils.getDefaultEventDict({'data': self.raw_data}))
+        events = list(self.receiver.getEvent())
+        self.assertEqual(events[0]['bytes_send'], '3395')
@@ -0,0 +1,24 @@
+import unittest
+
+from lumbermill.constants import LUMBERMILL_BASEPATH
+from lumbermill.utils.ModuleRegistry import ModuleRegistry
+
+
+class TestModuleRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.module_registry = ModuleRegistry(LUMBERMILL_BASEPATH, ['input', 'parser', 'output'])
+
+    def testModulesAreNotImported(self):
+        self.assertEqual(self.module_registry.getImportPath('ElasticSearchSink'), 'lumbermill.output.ElasticSearchSink')
+        self.assertTrue('Spam' in self.module_registry.getModuleNames())
+        # Other tests might have imported the module already, so check the registry did not.
+        self.assertFalse('ElasticSearchSink' in self.module_registry.import_times)
+
+    def testGetModuleClass(self):
+        module_class = self.module_registry.getModuleClass('Spam')
+        self.assertEqual(module_class.__name__, 'Spam')
+        self.assertTrue('Spam' in self.module_registry.import_times)
+
+    def testUnknownModule(self):
+        self.assertRaises(ImportError, self.module_registry.getModuleClass, 'DoesNotExist')
@@ -0,0 +1,55 @@
+import mock
+import lumbermill.utils.DictUtils as DictUtils
+
+from tests.ModuleBaseTestCase import ModuleBaseTestCase
+from lumbermill.modifier import DropEvent
+from lumbermill.misc import Noop
+from lumbermill.utils.StatisticCollector import ModuleStatistics, PROCESSING_TIME_BUCKETS
+
+
+class TestModuleStatistics(ModuleBaseTestCase):
+
+    def setUp(self):
+        super(TestModuleStatistics, self).setUp(Noop.Noop(mock.Mock()))
+
+    def testEventCounts(self):
+        self.test_object.configure({'filter': "$(lumbermill.event_type) == 'spam'"})
+        self.test_object.enableStatistics(ModuleStatistics(sample_rate=2))
+        for event_type in ['spam', 'spam', 'spam', 'eggs']:
+            self.test_object.receiveEvent(DictUtils.getDefaultEventDict({}, event_type=event_type))
+        stats = self.test_object.module_statistics.getStats()
+        self.assertEqual(stats['events_in'], 3)
+        self.assertEqual(stats['events_out'], 3)
+        self.assertEqual(stats['events_dropped'], 0)
+        self.assertEqual((stats['filter_passed'], stats['filter_skipped']), (3, 1))
+        self.assertEqual(stats['timed_events'], 1)
+        self.assertEqual(sum(stats['histogram']), 1)
+        # Events skipped by the filter are still passed on.
+        self.assertEqual(len(self.receiver.events), 4)
+
+    def testBatchCounts(self):
+        self.test_object.configure({})
+        self.test_object.enableStatistics(ModuleStatistics())
+        self.test_object.receiveEvents([DictUtils.getDefaultEventDict({}) for _ in range(0, 5)])
+        stats = self.test_object.module_statistics.getStats()
+        self.assertEqual((stats['events_in'], stats['events_out'], stats['timed_events']), (5, 5, 5))
+
+    def testDroppedEvents(self):
+        self.test_object = DropEvent.DropEvent(mock.Mock())
+        self.test_object.configure({})
+        self.test_object.addReceiver('MockReceiver', self.receiver)
+        self.test_object.enableStatistics(ModuleStatistics())
+        self.test_object.receiveEvent(DictUtils.getDefaultEventDict({}))
+        self.assertEqual(self.test_object.module_statistics.events_dropped, 1)
+
+    def testDifferenceAndPercentile(self):
+        module_statistics = ModuleStatistics()
+        previous_stats = module_statistics.getStats()
+        for _ in range(0, 99):
+            module_statistics.addProcessingTime(0.000001)
+        module_statistics.addProcessingTime(10)
+        stats = ModuleStatistics.getDifference(module_statistics.getStats(), previous_stats)
+        self.assertEqual(stats['timed_events'], 100)
+        self.assertEqual(ModuleStatistics.getPercentile(stats['histogram'], 50), PROCESSING_TIME_BUCKETS[0])
+        self.assertEqual(ModuleStatistics.getPercentile(stats['histogram'], 100), PROCESSING_TIME_BUCKETS[-1])
+        self.assertEqual(ModuleStatistics.getPercentile(ModuleStatistics().histogram, 50), None)
@@ -0,0 +1,44 @@
+import multiprocessing
+import unittest
+
+from lumbermill.utils.MultiProcessDataStore import MultiProcessDataStore
+
+
+def setInWorker(datastore, key, value):
+    datastore.acquireLock()
+    datastore.setValue(key, datastore.getValue(key) + value)
+    datastore.releaseLock()
+
+
+class TestMultiProcessDataStore(unittest.TestCase):
+
+    def setUp(self):
+        # The datastore is a singleton. Each test uses its own keys.
+        self.datastore = MultiProcessDataStore()
+
+    def testGetValue(self):
+        self.datastore.setValue('maintenance', True)
+        self.assertEqual(self.datastore.getValue('maintenance'), True)
+        self.assertRaises(KeyError, self.datastore.getValue, 'does_not_exist')
+
+    def testWritesAreVisibleInOtherProcesses(self):
+        self.datastore.setValue('file_list_idx', 0)
+        workers = [multiprocessing.Process(target=setInWorker, args=(self.datastore, 'file_list_idx', 5)) for _ in range(0, 3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.datastore.getValue('file_list_idx'), 15)
+        self.assertEqual(self.datastore.getDataDict()['file_list_idx'], 15)
+
+    def testUnchangedValueIsNotWritten(self):
+        self.datastore.setValue('food', 'spam')
+        version = self.datastore.version.value
+        self.datastore.setValue('food', 'spam')
+        self.assertEqual(self.datastore.version.value, version)
+        self.datastore.setValue('food', 'eggs')
+        self.assertEqual(self.datastore.version.value, version + 2)
+
+    def testMaxSize(self):
+        self.assertRaises(ValueError, self.datastore.setValue, 'too_large', 'x' * (self.datastore.max_size + 1))
+        self.assertRaises(KeyError, self.datastore.getValue, 'too_large')
@@ -0,0 +1,72 @@
+import multiprocessing
+import unittest
+
+from lumbermill.utils.StatisticCollector import MultiProcessStatisticCollector
+
+worker_index = 0
+
+
+def getWorkerIndex():
+    return worker_index
+
+
+def incrementInWorker(stats_collector, index, counter_name, count):
+    global worker_index
+    worker_index = index
+    for _ in range(0, count):
+        stats_collector.incrementCounter(counter_name)
+    stats_collector.setCounter('flush_size', index * 10)
+
+
+class TestMultiProcessStatisticCollector(unittest.TestCase):
+
+    def setUp(self):
+        # The collector is a singleton. Each test uses its own counter names.
+        self.stats_collector = MultiProcessStatisticCollector(3, getWorkerIndex)
+
+    def runWorkers(self, counter_name, count):
+        workers = [multiprocessing.Process(target=incrementInWorker, args=(self.stats_collector, index, counter_name, count)) for index in [1, 2]]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def testCountersAreSummedOverWorkers(self):
+        self.stats_collector.registerCounter('events_received')
+        self.stats_collector.incrementCounter('events_received', 5)
+        self.runWorkers('events_received', 100)
+        self.assertEqual(self.stats_collector.getCounter('events_received'), 205)
+        self.assertEqual(self.stats_collector.getCounterPerWorker('events_received'), [5, 100, 100])
+
+    def testNamesRegisteredInWorkers(self):
+        self.runWorkers('event_type_httpd_access_log', 10)
+        self.assertEqual(self.stats_collector.getCounter('event_type_httpd_access_log'), 20)
+        self.assertEqual(self.stats_collector.getAllCounters()['event_type_httpd_access_log'], 20)
+        self.assertEqual(self.stats_collector.getCounterPerWorker('flush_size'), [0, 10, 20])
+
+    def testResetAndSet(self):
+        self.stats_collector.incrementCounter('events_filtered', 3)
+        self.stats_collector.resetCounter('events_filtered')
+        self.assertEqual(self.stats_collector.getCounter('events_filtered'), 0)
+        self.stats_collector.incrementCounter('events_filtered', 2)
+        self.assertEqual(self.stats_collector.getCounter('events_filtered'), 2)
+        self.stats_collector.setCounter('events_filtered', 7)
+        self.assertEqual(self.stats_collector.getCounter('events_filtered'), 7)
+        self.stats_collector.incrementCounter('evaluation_time', 0.5)
+        self.assertEqual(self.stats_collector.getCounter('evaluation_time'), 0.5)
+        self.assertEqual(self.stats_collector.getCounter('does_not_exist'), 0)
+
+    def testNameTooLong(self):
+        self.assertRaises(ValueError, self.stats_collector.registerCounter, 'x' * 1000)
+
+    def testFullCounterTable(self):
+        self.stats_collector.syncCounterNames()
+        # The collector is a singleton, so only pretend all counters are in use and restore the table afterwards.
+        self.addCleanup(setattr, self.stats_collector, 'counter_indices', dict(self.stats_collector.counter_indices))
+        self.addCleanup(setattr, self.stats_collector.counter_count, 'value', self.stats_collector.counter_count.value)
+        self.stats_collector.counter_count.value = self.stats_collector.max_counters
+        self.assertRaises(ValueError, self.stats_collector.registerCounter, 'module_events_in_Noop')
+        self.stats_collector.incrementCounter('module_events_in_Noop')
+        self.stats_collector.setCounter('module_events_out_Noop', 5)
+        self.assertEqual(self.stats_collector.getCounter('module_events_in_Noop'), 0)
+        self.assertEqual(self.stats_collector.getCounter('module_events_out_Noop'), 0)
@@ -0,0 +1,74 @@
+import mock
+import lumbermill.utils.DictUtils as DictUtils
+
+from tests.ModuleBaseTestCase import ModuleBaseTestCase, MockReceiver
+from lumbermill.misc import Noop
+
+
+class TestOutputRouter(ModuleBaseTestCase):
+
+    def setUp(self):
+        super(TestOutputRouter, self).setUp(Noop.Noop(mock.Mock()))
+        self.test_object.configure({})
+        self.routed_receivers = {}
+        for receiver_name, filter_string in [('AccessLog', "$(lumbermill.event_type) == 'httpd_access_log'"),
+                                             ('ErrorLog', "$(lumbermill.event_type) in ['httpd_error_log', 'php_error_log']"),
+                                             ('ServerError', "$(http_status) == 500 or $(http_status) == 503"),
+                                             ('GetRequest', "$(url).startswith('GET')")]:
+            self.routed_receivers[receiver_name] = MockReceiver()
+            self.test_object.addReceiver(receiver_name, self.routed_receivers[receiver_name])
+            self.test_object.addOutputFilter(receiver_name, filter_string)
+
+    def sendEvent(self, event_type, **fields):
+        event = DictUtils.getDefaultEventDict(fields, event_type=event_type)
+        self.test_object.receiveEvent(event)
+        return event
+
+    def getReceivedCounts(self):
+        return dict([(receiver_name, len(receiver.events)) for receiver_name, receiver in self.routed_receivers.items()])
+
+    def testEqualityFiltersUseLookupTables(self):
+        router = self.test_object.getOutputRouter()
+        self.assertEqual(router.static_receiver_names, ['MockReceiver'])
+        self.assertEqual([receiver_name for receiver_name, output_filter in router.filtered_receivers], ['GetRequest'])
+        self.assertEqual(len(router.lookup_tables), 2)
+
+    def testRouting(self):
+        self.sendEvent('httpd_access_log', url='GET /', http_status=200)
+        self.sendEvent('php_error_log', url='POST /', http_status=500)
+        self.sendEvent('unknown')
+        self.assertEqual(self.getReceivedCounts(), {'AccessLog': 1, 'ErrorLog': 1, 'ServerError': 1, 'GetRequest': 1})
+        self.assertEqual(len(self.receiver.events), 3)
+
+    def testFailingFilterSkipsReceiver(self):
+        # The url field is missing, so the startswith call fails.
+        self.sendEvent('httpd_access_log', http_status=503)
+        self.assertEqual(self.getReceivedCounts(), {'AccessLog': 1, 'ErrorLog': 0, 'ServerError': 1, 'GetRequest': 0})
+
+    def testUnhashableFieldValue(self):
+        self.sendEvent('unknown', http_status=[500])
+        self.assertEqual(self.getReceivedCounts(), {'AccessLog': 0, 'ErrorLog': 0, 'ServerError': 0, 'GetRequest': 0})
+
+    def testRoutesAreReused(self):
+        router = self.test_object.getOutputRouter()
+        first_route = router.route(DictUtils.getDefaultEventDict({}, event_type='httpd_access_log'))
+        second_route = router.route(DictUtils.getDefaultEventDict({}, event_type='httpd_access_log'))
+        self.assertIs(first_route, second_route)
+        self.assertEqual(sorted(first_route[0].keys()), ['AccessLog', 'MockReceiver'])
+
+    def testNewReceiverResetsRouter(self):
+        router = self.test_object.getOutputRouter()
+        self.test_object.addReceiver('SecondReceiver', MockReceiver())
+        self.assertIsNot(router, self.test_object.getOutputRouter())
+
+    def testLookupFiltersAreCounted(self):
+        self.sendEvent('httpd_access_log', url='GET /', http_status=200)
+        self.sendEvent('php_error_log', url='POST /', http_status=500)
+        self.sendEvent('httpd_access_log', url='GET /', http_status=200)
+        access_log_stats = self.test_object.output_filters['AccessLog'].resetStats()
+        self.assertEqual((access_log_stats['evaluations'], access_log_stats['matches']), (3, 2))
+        error_log_stats = self.test_object.output_filters['ErrorLog'].resetStats()
+        self.assertEqual((error_log_stats['evaluations'], error_log_stats['matches']), (3, 1))
+        self.sendEvent('unknown')
+        access_log_stats = self.test_object.output_filters['AccessLog'].resetStats()
+        self.assertEqual((access_log_stats['evaluations'], access_log_stats['matches']), (1, 0))
@@ -8,4 +8,8 @@ class TestParseDynaimcValue(unittest.TestCase):
         self.assertTrue(parseDynamicValue('Default type to string: $(bytes_send)')['value'] == 'Default type to string: %(bytes_send)s')
         self.assertTrue(parseDynamicValue('String: $(lumbermill.event_id)s')['value'] == 'String: %(lumbermill.event_id)s')
         self.assertTrue(parseDynamicValue('Integer: $(lumbermill.list.0)d')['value'] == 'Integer: %(lumbermill.list.0)d')
-        self.assertTrue(parseDynamicValue('Float: $(lumbermill.list.2.hovercraft)9.2f')['value'] == 'Float: %(lumbermill.list.2.hovercraft)9.2f')
\ No newline at end of file
+        self.assertTrue(parseDynamicValue('Float: $(lumbermill.list.2.hovercraft)9.2f')['value'] == 'Float: %(lumbermill.list.2.hovercraft)9.2f')
+    def testParseDynamicValuesWithMixedFormats(self):
+        self.assertEqual(parseDynamicValue('$(bytes_send)d of $(url)')['value'], '%(bytes_send)d of %(url)s')
+        self.assertEqual(parseDynamicValue('$(http_status) == 200 and $(url).startswith("GET")')['value'], '%(http_status)s == 200 and %(url)s.startswith("GET")')
+        self.assertEqual(parseDynamicValue('/tmp/$(host).log')['value'], '/tmp/%(host)s.log')
@@ -0,0 +1,46 @@
+import Queue
+import unittest
+import lumbermill.utils.DictUtils as DictUtils
+
+from lumbermill.utils.Buffers import BufferedQueue, PartitionedQueue
+
+
+class TestPartitionedQueue(unittest.TestCase):
+
+    def getQueue(self, partitions):
+        self.partition_index = 0
+        queues = []
+        for _ in range(0, partitions):
+            queue = BufferedQueue(queue=Queue.Queue(20), buffersize=1, serialize=False)
+            self.addCleanup(queue.buffer.stopInterval)
+            queues.append(queue)
+        return PartitionedQueue(queues, lambda event: event['key'], lambda: self.partition_index)
+
+    def getEventsOfPartition(self, queue, partition_index):
+        self.partition_index = partition_index
+        events = []
+        while queue.qsize():
+            events.extend(queue.get(timeout=1))
+        return events
+
+    def testEventsWithSameKeyGoToSamePartition(self):
+        queue = self.getQueue(3)
+        queue.extend([DictUtils.getDefaultEventDict({'key': 'key-%d' % (idx % 10), 'idx': idx}) for idx in range(0, 50)])
+        seen_keys = {}
+        event_count = 0
+        for partition_index in range(0, 3):
+            events = self.getEventsOfPartition(queue, partition_index)
+            event_count += len(events)
+            for event in events:
+                self.assertEqual(seen_keys.setdefault(event['key'], partition_index), partition_index)
+            # Order of events with the same key is kept.
+            indices = [event['idx'] for event in events]
+            self.assertEqual(indices, sorted(indices))
+        self.assertEqual(event_count, 50)
+        self.assertEqual(len(seen_keys), 10)
+
+    def testUnhashableKey(self):
+        queue = self.getQueue(2)
+        queue.put(DictUtils.getDefaultEventDict({'key': ['spam', 'eggs']}))
+        events = self.getEventsOfPartition(queue, 0) + self.getEventsOfPartition(queue, 1)
+        self.assertEqual(len(events), 1)
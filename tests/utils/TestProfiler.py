@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from lumbermill.utils.Profiler import SamplingProfiler, makeDirectory, writeProfile, readProfiles, waitForProfiles, mergeProfiles, formatProfile
+
+
+def busyLoop(stop_event):
+    while not stop_event.is_set():
+        sum(range(0, 100))
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.profile_directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.profile_directory)
+
+    def testSamplesAreAttributedToModules(self):
+        stop_event = threading.Event()
+        busy_thread = threading.Thread(target=busyLoop, args=(stop_event,))
+        busy_thread.start()
+        waiting_thread = threading.Thread(target=stop_event.wait)
+        waiting_thread.start()
+        profiler = SamplingProfiler({os.path.splitext(os.path.abspath(__file__))[0]: 'BusyModule'}, interval=0.001)
+        try:
+            profiler.sample(.2)
+        finally:
+            stop_event.set()
+            busy_thread.join()
+            waiting_thread.join()
+        profile = profiler.getProfile()
+        self.assertTrue(profile['modules']['BusyModule'] > 0)
+        self.assertTrue(profile['modules']['waiting'] > 0)
+        self.assertEqual(sum(profile['modules'].values()), profile['samples'])
+        self.assertTrue('busyLoop' in [name for filename, lineno, name, self_samples, cumulative_samples in profile['functions']])
+
+    def testMergeProfiles(self):
+        profiles = [{'samples': 10, 'interval': 0.005, 'modules': {'Spam': 6, 'waiting': 4}, 'functions': [['Spam.py', 1, 'run', 6, 6]]},
+                    {'samples': 10, 'interval': 0.005, 'modules': {'Spam': 2, 'other': 8}, 'functions': [['Spam.py', 1, 'run', 2, 2]]}]
+        profile_paths = []
+        makeDirectory(os.path.join(self.profile_directory, 'run'))
+        makeDirectory(os.path.join(self.profile_directory, 'run'))
+        for worker_index, profile in enumerate(profiles):
+            profile_paths.append(os.path.join(self.profile_directory, 'run', 'worker_%d.json' % worker_index))
+            writeProfile(profile, profile_paths[-1])
+        missing_path = os.path.join(self.profile_directory, 'run', 'worker_2.json')
+        profile_paths = waitForProfiles(profile_paths + [missing_path], timeout=.1)
+        self.assertEqual(len(profile_paths), 2)
+        merged_profile = mergeProfiles(readProfiles(profile_paths))
+        self.assertEqual(merged_profile['samples'], 20)
+        self.assertEqual(merged_profile['modules'], {'Spam': 8, 'waiting': 4, 'other': 8})
+        self.assertEqual(merged_profile['functions'], [['Spam.py', 1, 'run', 8, 8]])
+        summary = formatProfile(merged_profile)
+        # Busy percentages do not include waiting samples.
+        self.assertTrue("50.00" in [line.split()[-1] for line in summary.splitlines() if line.startswith('Spam ')])
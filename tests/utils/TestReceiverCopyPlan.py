@@ -0,0 +1,50 @@
+import mock
+import lumbermill.utils.DictUtils as DictUtils
+
+from tests.ModuleBaseTestCase import ModuleBaseTestCase, MockReceiver
+from lumbermill.modifier import AddDateTime
+from lumbermill.output import DevNullSink
+from lumbermill.misc import Noop
+
+
+class TestReceiverCopyPlan(ModuleBaseTestCase):
+
+    def setUp(self):
+        super(TestReceiverCopyPlan, self).setUp(Noop.Noop(mock.Mock()))
+        self.test_object.configure({})
+
+    def getDevNullSink(self, config={}):
+        sink = DevNullSink.DevNullSink(mock.Mock())
+        sink.configure(config)
+        return sink
+
+    def testReadOnlyReceiverSharesEvent(self):
+        sink = self.getDevNullSink()
+        sink.receiveEvent = mock.Mock()
+        self.test_object.addReceiver('DevNullSink', sink)
+        event = DictUtils.getDefaultEventDict({'data': 'spam'})
+        self.test_object.receiveEvent(event)
+        self.assertIs(sink.receiveEvent.call_args[0][0], event)
+        received_events = list(self.receiver.getEvent())
+        self.assertEqual(len(received_events), 1)
+        self.assertIsNot(received_events[0], event)
+
+    def testLastModifyingReceiverGetsOriginal(self):
+        second_receiver = MockReceiver()
+        self.test_object.addReceiver('SecondReceiver', second_receiver)
+        copy_plan = self.test_object.getReceiverCopyPlan(self.test_object.receivers)
+        self.assertEqual([copy_event for receiver, copy_event in copy_plan], [True, False])
+
+    def testReceiverWithCommonActionsModifiesEvents(self):
+        self.assertFalse(self.getDevNullSink().modifiesEvents())
+        self.assertTrue(self.getDevNullSink({'add_fields': {'spam': 'eggs'}}).modifiesEvents())
+
+    def testModifyingDownstreamReceiver(self):
+        noop = Noop.Noop(mock.Mock())
+        noop.configure({})
+        noop.addReceiver('DevNullSink', self.getDevNullSink())
+        self.assertFalse(noop.modifiesEvents())
+        add_date_time = AddDateTime.AddDateTime(mock.Mock())
+        add_date_time.configure({})
+        noop.addReceiver('AddDateTime', add_date_time)
+        self.assertTrue(noop.modifiesEvents())
@@ -0,0 +1,62 @@
+import time
+import threading
+import unittest
+
+from lumbermill.utils.Scheduler import getScheduler
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.values = []
+
+    def collectValue(self):
+        self.values.append(time.time())
+
+    def testTimedFunctionsShareOneThread(self):
+        getScheduler()
+        thread_count = threading.active_count()
+        timers = [getScheduler().startFunction(self.collectValue, .1) for _ in range(0, 10)]
+        time.sleep(.35)
+        for timer in timers:
+            timer.set()
+        self.assertEqual(threading.active_count(), thread_count)
+        # Each timer should run three times. Allow for a late or an early run on a busy machine.
+        self.assertGreaterEqual(len(self.values), 20)
+        self.assertLessEqual(len(self.values), 40)
+
+    def testStop(self):
+        timer = getScheduler().startFunction(self.collectValue, .05)
+        time.sleep(.12)
+        timer.set()
+        value_count = len(self.values)
+        time.sleep(.12)
+        self.assertEqual(len(self.values), value_count)
+        self.assertTrue(timer.is_set())
+
+    def testReschedule(self):
+        start_time = time.time()
+        timer = getScheduler().startFunction(self.collectValue, .1)
+        time.sleep(.05)
+        timer.reschedule()
+        # Rescheduled to run at .15 and .25, stop in between.
+        time.sleep(.15)
+        timer.set()
+        self.assertEqual(len(self.values), 1)
+        self.assertTrue(self.values[0] - start_time >= .15)
+
+    def testBlockingFunctionDoesNotDelayOtherTimers(self):
+        unblock = threading.Event()
+        blocking_calls = []
+        def blockingFunction():
+            blocking_calls.append(time.time())
+            unblock.wait(1)
+        blocking_timer = getScheduler().startFunction(blockingFunction, .01, blocking=True)
+        timer = getScheduler().startFunction(self.collectValue, .05)
+        time.sleep(.3)
+        unblock.set()
+        blocking_timer.set()
+        timer.set()
+        # Calls of the blocking function do not overlap.
+        self.assertEqual(len(blocking_calls), 1)
+        self.assertGreaterEqual(len(self.values), 3)
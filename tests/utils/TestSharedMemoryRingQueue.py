@@ -0,0 +1,85 @@
+import time
+import Queue
+import threading
+import multiprocessing
+import unittest
+
+from lumbermill.utils.Buffers import SharedMemoryRingQueue
+
+
+worker_index = 0
+
+
+def getWorkerIndex():
+    return worker_index
+
+
+def produceMessages(queue, count, index):
+    global worker_index
+    worker_index = index
+    for idx in range(0, count):
+        queue.put("message-%d" % idx)
+
+
+class TestSharedMemoryRingQueue(unittest.TestCase):
+
+    def testPutAndGet(self):
+        queue = SharedMemoryRingQueue(queue_max_size=5, ring_size=1024)
+        queue.put("spam")
+        queue.put("eggs")
+        self.assertEqual(queue.qsize(), 2)
+        self.assertEqual(queue.get(), "spam")
+        self.assertEqual(queue.get(), "eggs")
+        self.assertRaises(Queue.Empty, queue.get, True, .01)
+
+    def testWrapAround(self):
+        queue = SharedMemoryRingQueue(queue_max_size=5, ring_size=64)
+        for idx in range(0, 50):
+            message = "%d-%s" % (idx, "x" * (idx % 40))
+            queue.put(message)
+            self.assertEqual(queue.get(), message)
+
+    def testFullQueue(self):
+        queue = SharedMemoryRingQueue(queue_max_size=1, ring_size=64)
+        queue.put("spam")
+        self.assertRaises(Queue.Full, queue.put, "eggs", True, .01)
+        self.assertRaises(ValueError, queue.put, "x" * 64)
+
+    def testFullRing(self):
+        queue = SharedMemoryRingQueue(queue_max_size=10, ring_size=64)
+        queue.put("x" * 40)
+        # The message count is below queue_max_size, but the ring has not enough free bytes.
+        self.assertRaises(Queue.Full, queue.put, "y" * 40, False)
+        self.assertRaises(Queue.Full, queue.put, "y" * 40, True, .01)
+        self.assertEqual(queue.qsize(), 1)
+        put_done = threading.Event()
+        def putMessage():
+            queue.put("y" * 40)
+            put_done.set()
+        producer = threading.Thread(target=putMessage)
+        producer.daemon = True
+        producer.start()
+        time.sleep(.1)
+        self.assertFalse(put_done.is_set())
+        # Reading the first message frees up the ring and wakes up the waiting producer.
+        self.assertEqual(queue.get(), "x" * 40)
+        self.assertTrue(put_done.wait(.5))
+        self.assertEqual(queue.get(), "y" * 40)
+
+    def testRingByWorkerIndex(self):
+        queue = SharedMemoryRingQueue(queue_max_size=5, rings=3, ring_size=64, get_worker_index=lambda: 4)
+        queue.put("spam")
+        self.assertEqual(queue.getRingPositions(1)[0], queue.message_header.size + 4)
+        self.assertEqual(queue.getRingPositions(0)[0], 0)
+        self.assertEqual(queue.get(), "spam")
+
+    def testMultipleProducers(self):
+        queue = SharedMemoryRingQueue(queue_max_size=10, rings=3, ring_size=256, get_worker_index=getWorkerIndex)
+        producers = [multiprocessing.Process(target=produceMessages, args=(queue, 100, index)) for index in range(0, 3)]
+        for producer in producers:
+            producer.start()
+        messages = [queue.get(True, 5) for _ in range(0, 300)]
+        for producer in producers:
+            producer.join()
+        self.assertEqual(sorted(set(messages)), sorted(["message-%d" % idx for idx in range(0, 100)]))
+        self.assertEqual(len(messages), 300)